@@ -0,0 +1,5 @@
+-- race_results.idempotency_key for databases created from an older schema.sql
+-- (scraper outbox retries carry the same key and must not be stored twice)
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS idempotency_key TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_results_idempotency_key ON race_results(idempotency_key);
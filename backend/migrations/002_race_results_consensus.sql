@@ -0,0 +1,5 @@
+-- Multi-frame OCR consensus columns for databases created from an older schema.sql
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS confidence REAL;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS flagged BOOLEAN DEFAULT false;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS race_confidence REAL;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS disagreements JSONB;
@@ -0,0 +1,20 @@
+-- Per-position fields read by the scraper's layout parser, and the
+-- FORECAST/TRICAST dividends shown with the results
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS horse_name TEXT;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS jockey_name TEXT;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS odds TEXT;
+ALTER TABLE race_results ADD COLUMN IF NOT EXISTS ocr_horse_number INTEGER;
+
+CREATE TABLE IF NOT EXISTS race_result_dividends (
+  id SERIAL PRIMARY KEY,
+  race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+  video_race_time_uk TEXT,
+  kind TEXT NOT NULL,
+  combination TEXT,
+  dividend TEXT,
+  confidence REAL,
+  scraped_at TIMESTAMPTZ DEFAULT now(),
+  idempotency_key TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_dividends_race_id ON race_result_dividends(race_id);
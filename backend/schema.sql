@@ -42,7 +42,44 @@ CREATE TABLE race_results (
   raw_text TEXT,
   full_line TEXT,
 
-  scraped_at TIMESTAMPTZ DEFAULT now()
+  scraped_at TIMESTAMPTZ DEFAULT now(),
+
+  -- Columns added after the first release also have a migration in
+  -- backend/migrations (applied on server start) for existing databases
+  idempotency_key TEXT,
+
+  -- Multi-frame OCR consensus (0..1); flagged = below the scraper's threshold
+  confidence REAL,
+  flagged BOOLEAN DEFAULT false,
+
+  -- The whole payload's consensus (lowest position) and contested positions
+  -- ({position: {horse_number: weight}}), repeated on each of its rows
+  race_confidence REAL,
+  disagreements JSONB,
+
+  -- Layout parser fields; ocr_horse_number is the number as read when the
+  -- race card corrected it
+  horse_name TEXT,
+  jockey_name TEXT,
+  odds TEXT,
+  ocr_horse_number INTEGER
+);
+
+
+-- FORECAST/TRICAST dividends shown with the results (kind = forecast | tricast)
+CREATE TABLE race_result_dividends (
+  id SERIAL PRIMARY KEY,
+
+  race_id INTEGER NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+  video_race_time_uk TEXT,
+
+  kind TEXT NOT NULL,
+  combination TEXT,
+  dividend TEXT,
+  confidence REAL,
+
+  scraped_at TIMESTAMPTZ DEFAULT now(),
+  idempotency_key TEXT
 );
 
 
@@ -53,3 +90,7 @@ CREATE INDEX idx_runners_race_id ON race_runners(race_id);
 CREATE INDEX idx_results_scraped_at ON race_results(scraped_at DESC);
 
 CREATE INDEX idx_results_race_time_capture ON race_results(race_time_capture);
+
+CREATE INDEX idx_results_idempotency_key ON race_results(idempotency_key);
+
+CREATE INDEX idx_dividends_race_id ON race_result_dividends(race_id);
@@ -0,0 +1,25 @@
+const fs = require("fs");
+const path = require("path");
+const pool = require("./db");
+
+const MIGRATIONS_DIR = path.join(__dirname, "..", "..", "migrations");
+
+/**
+ * Apply backend/migrations/*.sql in name order.
+ * Every migration is idempotent (IF NOT EXISTS), so they all run on each start
+ * and an existing database catches up with schema.sql.
+ */
+async function migrate() {
+  const files = fs
+    .readdirSync(MIGRATIONS_DIR)
+    .filter((name) => name.endsWith(".sql"))
+    .sort();
+
+  for (const name of files) {
+    const sql = fs.readFileSync(path.join(MIGRATIONS_DIR, name), "utf8");
+    await pool.query(sql);
+    console.log(`✅ Migration applied: ${name}`);
+  }
+}
+
+module.exports = { migrate };
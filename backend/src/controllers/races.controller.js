@@ -9,6 +9,29 @@ async function insertRace(req, res, next) {
   }
 }
 
+async function insertRacesBatch(req, res, next) {
+  try {
+    const items = req.body && req.body.items;
+    if (!Array.isArray(items)) {
+      throw new Error("items array missing");
+    }
+
+    const results = [];
+    for (const item of items) {
+      try {
+        const race = await racesService.insertRace(item);
+        results.push({ idempotency_key: item.idempotency_key, ok: true, id: race.id });
+      } catch (err) {
+        results.push({ idempotency_key: item.idempotency_key, ok: false, error: err.message });
+      }
+    }
+
+    return res.status(201).json({ success: true, results });
+  } catch (err) {
+    next(err);
+  }
+}
+
 async function getDuplicates(req, res) {
   try {
     const raceId = req.params.id;
@@ -40,6 +63,7 @@ async function getRaceDetails(req,res){
 
 module.exports = {
   insertRace,
+  insertRacesBatch,
   getDuplicates,
   getUpcoming,
   getRaceDetails
@@ -14,4 +14,28 @@ async function insertResults(req, res, next) {
   }
 }
 
-module.exports = { insertResults };
+async function insertResultsBatch(req, res, next) {
+  try {
+    const items = req.body && req.body.items;
+    if (!Array.isArray(items)) {
+      throw new Error("items array missing");
+    }
+
+    const results = [];
+    for (const item of items) {
+      try {
+        const inserted = await resultsService.insertResults(item);
+        results.push({ idempotency_key: item.idempotency_key, ok: true, inserted });
+      } catch (err) {
+        results.push({ idempotency_key: item.idempotency_key, ok: false, error: err.message });
+      }
+    }
+
+    return res.status(201).json({ success: true, results });
+  } catch (err) {
+    console.error("❌ /api/results/batch ERROR:", err.message);
+    next(err);
+  }
+}
+
+module.exports = { insertResults, insertResultsBatch };
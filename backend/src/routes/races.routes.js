@@ -2,6 +2,7 @@ const router = require("express").Router();
 const racesController = require("../controllers/races.controller");
 
 router.post("/", racesController.insertRace);
+router.post("/batch", racesController.insertRacesBatch);
 router.get("/duplicates/:id", racesController.getDuplicates);
 router.get("/upcoming", racesController.getUpcoming);
 router.get("/:id", racesController.getRaceDetails);
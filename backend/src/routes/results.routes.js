@@ -2,5 +2,6 @@ const router = require("express").Router();
 const resultsController = require("../controllers/results.controller");
 
 router.post("/", resultsController.insertResults);
+router.post("/batch", resultsController.insertResultsBatch);
 
 module.exports = router;
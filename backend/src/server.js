@@ -1,6 +1,14 @@
 const app = require("./app");
 const env = require("./config/env");
+const { migrate } = require("./config/migrate");
 
-app.listen(env.PORT, () => {
-  console.log(`✅ Server running: http://localhost:${env.PORT}`);
-});
+migrate()
+  .then(() => {
+    app.listen(env.PORT, () => {
+      console.log(`✅ Server running: http://localhost:${env.PORT}`);
+    });
+  })
+  .catch((err) => {
+    console.error("❌ Migration failed:", err.message);
+    process.exit(1);
+  });
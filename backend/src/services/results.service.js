@@ -1,7 +1,10 @@
 const pool = require("../config/db");
 
 async function insertResults(payload) {
-  const { race_time_capture, video_race_time_uk, results, scraped_at } = payload;
+  const {
+    race_time_capture, video_race_time_uk, results, scraped_at, idempotency_key,
+    confidence, disagreements, flagged, dividends
+  } = payload;
 
   if (!Array.isArray(results) || results.length === 0) {
     throw new Error("Invalid results payload");
@@ -9,63 +12,137 @@ async function insertResults(payload) {
 
   const scrapedAt = scraped_at ? new Date(scraped_at) : new Date();
 
- // -----------------------------------
-// Find race that existed when result was scraped
-// -----------------------------------
-const raceLookup = await pool.query(
-  `
-  SELECT id
-  FROM races
-  WHERE race_time_uk = $1
-  ORDER BY scraped_at DESC
-  LIMIT 1
-`,
-  [video_race_time_uk]
-);
-
-if (!raceLookup.rows.length) {
-  console.warn("No race found for UK time:", video_race_time_uk);
-  return 0;
-}
+  // The key check and every row insert commit together, so a retry after a
+  // partial failure either finds the whole batch or none of it
+  const client = await pool.connect();
 
-const raceId = raceLookup.rows[0].id;
+  try {
+    await client.query("BEGIN");
 
+    // Retried submissions from the scraper outbox carry the same key;
+    // the lock serialises concurrent retries of one key until COMMIT
+    if (idempotency_key) {
+      await client.query(`SELECT pg_advisory_xact_lock(hashtext($1))`, [idempotency_key]);
+      const seen = await client.query(
+        `SELECT 1 FROM race_results WHERE idempotency_key = $1 LIMIT 1`,
+        [idempotency_key]
+      );
+      if (seen.rows.length) {
+        await client.query("COMMIT");
+        return 0;
+      }
+    }
 
+    // -----------------------------------
+    // Find race that existed when result was scraped
+    // -----------------------------------
+    const raceLookup = await client.query(
+      `
+      SELECT id
+      FROM races
+      WHERE race_time_uk = $1
+      ORDER BY scraped_at DESC
+      LIMIT 1
+    `,
+      [video_race_time_uk]
+    );
 
+    if (!raceLookup.rows.length) {
+      console.warn("No race found for UK time:", video_race_time_uk);
+      await client.query("COMMIT");
+      return 0;
+    }
 
-  let inserted = 0;
+    const raceId = raceLookup.rows[0].id;
 
-  for (const r of results) {
-    await pool.query(
-      `
-      INSERT INTO race_results (
-        race_id,
-        race_time_capture,
-        video_race_time_uk,
-        position,
-        horse_number,
-        raw_text,
-        full_line,
-        scraped_at
-      )
-      VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
-      `,
-      [
-        raceId,
-        race_time_capture ?? null,
-        video_race_time_uk ?? null,
-        Number(r.position),
-        r.horse_number ? Number(r.horse_number) : null,
-        r.raw_text ?? null,
-        r.full_line ?? null,
-        scrapedAt.toISOString()
-      ]
-    );
+    let inserted = 0;
 
-    inserted++;
-  }
+    for (const r of results) {
+      await client.query(
+        `
+        INSERT INTO race_results (
+          race_id,
+          race_time_capture,
+          video_race_time_uk,
+          position,
+          horse_number,
+          raw_text,
+          full_line,
+          scraped_at,
+          idempotency_key,
+          confidence,
+          flagged,
+          race_confidence,
+          disagreements,
+          horse_name,
+          jockey_name,
+          odds,
+          ocr_horse_number
+        )
+        VALUES ($1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17)
+        `,
+        [
+          raceId,
+          race_time_capture ?? null,
+          video_race_time_uk ?? null,
+          Number(r.position),
+          r.horse_number ? Number(r.horse_number) : null,
+          r.raw_text ?? null,
+          r.full_line ?? null,
+          scrapedAt.toISOString(),
+          idempotency_key ?? null,
+          r.confidence ?? null,
+          Boolean(flagged),
+          confidence ?? null,
+          disagreements ? JSON.stringify(disagreements) : null,
+          r.horse ?? null,
+          r.jockey ?? null,
+          r.odds ?? null,
+          r.ocr_horse_number ? Number(r.ocr_horse_number) : null
+        ]
+      );
+
+      inserted++;
+    }
+
+    // FORECAST/TRICAST dividends: {kind: {combination, dividend, conf}}
+    for (const [kind, d] of Object.entries(dividends || {})) {
+      await client.query(
+        `
+        INSERT INTO race_result_dividends (
+          race_id,
+          video_race_time_uk,
+          kind,
+          combination,
+          dividend,
+          confidence,
+          scraped_at,
+          idempotency_key
+        )
+        VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
+        `,
+        [
+          raceId,
+          video_race_time_uk ?? null,
+          kind,
+          d.combination ?? null,
+          d.dividend ?? null,
+          d.conf ?? null,
+          scrapedAt.toISOString(),
+          idempotency_key ?? null
+        ]
+      );
+    }
 
-  return inserted;
+    await client.query("COMMIT");
+    return inserted;
+
+  } catch (err) {
+    await client.query("ROLLBACK");
+    throw err;
+  } finally {
+    client.release();
+  }
 }
 
 module.exports = { insertResults };
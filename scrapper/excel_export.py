@@ -0,0 +1,160 @@
+"""
+Excel Export - Streaming writer for race_analysis.xlsx
+
+Building a fresh Workbook, writing every cell with its own PatternFill/Font
+and then re-reading every cell to auto-fit the columns takes longer than
+the gap between races once the history is large. SheetModel instead:
+1. Holds the rendered rows (value, style name) in memory, so a caller only
+   re-renders the rows that changed and appends new ones
+2. Keeps the column widths up to date as rows are set, so no second pass
+3. Saves with openpyxl's write-only mode, streaming rows to the file with
+   shared named styles instead of per-cell style objects
+4. Times each save and reports the process's peak memory (RSS; not
+   available on Windows)
+
+Requirements:
+    pip install openpyxl
+"""
+
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment
+from openpyxl.utils import get_column_letter
+
+
+# Widest auto-fitted column (characters)
+MAX_COLUMN_WIDTH = 30
+
+# Highlight colors for positions
+POSITION_COLORS = {
+    1: "FFD700",  # Gold for 1st
+    2: "C0C0C0",  # Silver for 2nd
+    3: "CD7F32",  # Bronze for 3rd
+    4: "90EE90",  # Light green for 4th
+}
+
+
+def _fill(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_named_styles():
+    """Styles shared by every cell that uses them (registered once per workbook)."""
+    styles = [
+        NamedStyle(name="header", fill=_fill("4472C4"), font=Font(bold=True, color="FFFFFF"),
+                   alignment=Alignment(horizontal='center')),
+        NamedStyle(name="legend_title", font=Font(bold=True)),
+    ]
+    for position, color in POSITION_COLORS.items():
+        styles.append(NamedStyle(name=f"place_{position}", fill=_fill(color), font=Font(bold=True)))
+        styles.append(NamedStyle(name=f"legend_{position}", fill=_fill(color)))
+    return styles
+
+
+LEGEND = [
+    [("Legend:", "legend_title")],
+    [("1st Place", "legend_1")],
+    [("2nd Place", "legend_2")],
+    [("3rd Place", "legend_3")],
+    [("4th Place", "legend_4")],
+]
+
+
+class SheetModel:
+    """Rendered rows of one sheet, saved by streaming."""
+
+    def __init__(self, headers, title="Race Analysis"):
+        self.title = title
+        self.headers = list(headers)
+        self.rows = []  # [[(value, style name or None)]]
+        self.widths = [0] * len(self.headers)
+        self._fit([(header, None) for header in self.headers])
+
+        # Stats
+        self.saves = 0
+        self.last_save_ms = 0.0
+        self.last_rows = 0
+        self.last_peak_mb = None
+
+    def _fit(self, cells):
+        widths = self.widths
+        for col, (value, _) in enumerate(cells):
+            if value is None or value == "":
+                continue
+            length = len(str(value))
+            if col >= len(widths):
+                widths.extend([0] * (col + 1 - len(widths)))
+            if length > widths[col]:
+                widths[col] = length
+
+    def set_row(self, index, cells):
+        """Replace row `index` (0-based, below the header) or append it when index == len(rows)."""
+        if index == len(self.rows):
+            self.rows.append(cells)
+        else:
+            self.rows[index] = cells
+        self._fit(cells)
+
+    def save(self, path, indexes=None, footer=LEGEND):
+        """
+        Stream the header, rows (all, or those at indexes) and footer
+        (after two blank rows) to path.
+        """
+        started = time.perf_counter()
+        wb = Workbook(write_only=True)
+        for style in build_named_styles():
+            wb.add_named_style(style)
+        ws = wb.create_sheet(self.title)
+        for col, width in enumerate(self.widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+        def write(cells):
+            row = []
+            for value, style in cells:
+                if style:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.style = style
+                    row.append(cell)
+                else:
+                    row.append(None if value == "" else value)
+            ws.append(row)
+
+        write([(header, "header") for header in self.headers])
+        for cells in self.rows if indexes is None else (self.rows[i] for i in indexes):
+            write(cells)
+        if footer:
+            ws.append([])
+            ws.append([])
+            for cells in footer:
+                write(cells)
+        wb.save(path)
+
+        self.last_rows = len(self.rows) if indexes is None else len(indexes)
+        self.last_peak_mb = peak_memory_mb()
+        self.last_save_ms = (time.perf_counter() - started) * 1000
+        self.saves += 1
+
+    def stats(self):
+        return {
+            "rows": len(self.rows),
+            "saved_rows": self.last_rows,
+            "save_ms": round(self.last_save_ms, 1),
+            "peak_mb": round(self.last_peak_mb, 1) if self.last_peak_mb is not None else None,
+        }
@@ -0,0 +1,499 @@
+"""
+Fake Site - Local stand-in for the virtuals page, the stream player and the backend
+
+Lets both scrapers run with no network, on an accelerated race clock:
+1. /horse-racing?tab=virtuals serves race tabs and runner cards with the
+   live site's markup (.virtuals-sport__tabs, .racing-runner, ...); the page
+   re-renders from /fake/state so tabs change and odds move like the real one
+2. /horsesflats.html is a player whose <video> plays a canvas stream:
+   racing, then a results overlay (or recorded frames from --frames) once
+   per race, one race every --race-seconds
+3. /api/races and /api/results (plus /batch) accept the scrapers' posts and
+   check received results against the simulated ones, or against the
+   ground truth of recorded frames (<name>.json beside <name>.png, as for
+   ocr_preprocess.py; frames without one are not scored); /fake/stats
+   reports throughput, accuracy and the memory of the scraper processes
+   running on this machine (with their OCR workers, geckodriver and
+   browser; Linux only)
+
+Race times step two minutes per race from the current UK time, so they run
+ahead of the wall clock when accelerated: run selenium_scraper.py with
+SCHEDULE_AWARE=0 for accelerated soak runs.
+
+Usage:
+    python fake_site.py [--port 8800] [--race-seconds 5] [--frames recorded_frames/]
+    PADDY_BASE_URL=http://localhost:8800 BACKEND_URL=http://localhost:8800 python scraper.py
+    SCHEDULE_AWARE=0 STREAM_BASE_URL=http://localhost:8800 BACKEND_URL=http://localhost:8800 python selenium_scraper.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from urllib.parse import urlparse, unquote
+
+from race_schedule import IST, UK
+
+
+# Race tabs shown at once
+TABS = 6
+
+# Processes whose memory /fake/stats reports
+SCRAPER_SCRIPTS = ("scraper.py", "selenium_scraper.py")
+
+# Share of each race cycle the results overlay is on screen
+RESULTS_SHARE = 0.4
+
+HORSE_WORDS = ["SILVER", "ARROW", "MIDNIGHT", "RUN", "JONNYS", "STREET", "CHOPSTICKS", "BLUE",
+               "MOON", "GOLDEN", "DAWN", "RED", "ROCKET", "LUCKY", "STAR", "DARK", "HORSE", "JAKE"]
+JOCKEY_NAMES = ["Brian Myers", "Declan Bark", "Tom Reed", "Sam Lee", "Paul Kane", "Ann Boyd",
+                "Joe Flynn", "Ian Hart", "Kate Dunn", "Luke Shaw"]
+ODDS = ["EVS", "2/1", "5/2", "3/1", "7/2", "4/1", "9/2", "6/1", "8/1", "10/1", "14/1", "20/1"]
+ORDINALS = ["1st", "2nd", "3rd", "4th"]
+
+
+class RaceClock:
+    """Deterministic simulated racing: race k starts k * race_seconds after start."""
+
+    def __init__(self, race_seconds=5.0, seed=0, start=None):
+        self.race_seconds = race_seconds
+        self.seed = seed
+        self.start = start if start is not None else time.time()
+        now = datetime.fromtimestamp(self.start, timezone.utc)
+        self.first_race = now.replace(minute=now.minute // 2 * 2, second=0, microsecond=0)  # race 0, UTC
+
+    def index(self, now=None):
+        return int(((now if now is not None else time.time()) - self.start) // self.race_seconds)
+
+    def phase(self, now=None):
+        """Position within the current race cycle, 0..1."""
+        elapsed = (now if now is not None else time.time()) - self.start
+        return (elapsed % self.race_seconds) / self.race_seconds
+
+    def race_time_uk(self, k):
+        return (self.first_race + timedelta(minutes=2 * k)).astimezone(UK).strftime("%H:%M")
+
+    def race_time_ist(self, k):
+        return (self.first_race + timedelta(minutes=2 * k)).astimezone(IST).strftime("%H:%M")
+
+    def card(self, k, now=None):
+        """Runners of race k; odds drift every half race cycle."""
+        rng = random.Random(f"{self.seed}:card:{k}")
+        runners = []
+        for number in range(1, rng.randint(8, 14) + 1):
+            runners.append({
+                "number": str(number),
+                "name": " ".join(rng.sample(HORSE_WORDS, rng.randint(1, 2))),
+                "jockey": rng.choice(JOCKEY_NAMES),
+            })
+        tick = int(((now if now is not None else time.time()) - self.start) // (self.race_seconds / 2))
+        odds_rng = random.Random(f"{self.seed}:odds:{k}:{tick}")
+        for runner in runners:
+            runner["odds"] = odds_rng.choice(ODDS)
+        return runners
+
+    def results(self, k):
+        """Top four of race k as [(position, number, name, jockey)]."""
+        runners = self.card(k, self.start + k * self.race_seconds)
+        finish = random.Random(f"{self.seed}:result:{k}").sample(runners, 4)
+        return [(position, r["number"], r["name"], r["jockey"]) for position, r in enumerate(finish, 1)]
+
+    def overlay_lines(self, k):
+        """Text of race k's results overlay, as the stream shows it."""
+        results = self.results(k)
+        odds = {r["number"]: r["odds"] for r in self.card(k, self.start + k * self.race_seconds)}
+        lines = [f"{self.race_time_uk(k)} GLENVIEW GARDENS"]
+        for position, number, name, jockey in results:
+            lines.append(f"{ORDINALS[position - 1]}  {number}  {name}  {jockey}  {odds[number]}")
+        rng = random.Random(f"{self.seed}:dividend:{k}")
+        numbers = [number for _, number, _, _ in results]
+        lines.append(f"FORECAST {numbers[0]}-{numbers[1]}  £{rng.randint(5, 90)}.{rng.randint(0, 99):02d}")
+        lines.append(f"TRICAST {numbers[0]}-{numbers[1]}-{numbers[2]}  £{rng.randint(20, 900)}.{rng.randint(0, 99):02d}")
+        return lines
+
+
+def load_truth(frames):
+    """Ground truth per recorded frame: sorted [(position, horse_number)] from <name>.json, else None."""
+    truths = []
+    for frame in frames:
+        label = frame.with_suffix(".json")
+        if not label.exists():
+            truths.append(None)
+            continue
+        with open(label, 'r', encoding='utf-8') as f:
+            truths.append(sorted((int(r["position"]), str(r["horse_number"]))
+                                 for r in json.load(f).get("results", [])))
+    return truths
+
+
+class Sink:
+    """
+    Counts what the scrapers post and scores results against the clock, or
+    against truths (load_truth(), one per recorded frame) when frames are played.
+    """
+
+    def __init__(self, clock, truths=None):
+        self.clock = clock
+        self.truths = truths
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.races = 0
+        self.results = 0
+        self.scored = 0
+        self.correct = 0
+        self.keys = set()
+        self.duplicates = 0
+        # UK race time -> race index, for scoring (recent races only)
+        self.recent = {}
+
+    def add(self, kind, item):
+        with self.lock:
+            key = item.get("idempotency_key")
+            if key and key in self.keys:
+                self.duplicates += 1
+                return
+            if key:
+                self.keys.add(key)
+            if kind == "races":
+                self.races += 1
+                return
+            self.results += 1
+            k = self._race_index(item.get("video_race_time_uk", ""))
+            expected = self._expected(k) if k is not None else None
+            if expected is not None:
+                got = sorted((int(r.get("position", 0)), str(r.get("horse_number")))
+                             for r in item.get("results", []) if r.get("horse_number") is not None)
+                self.scored += 1
+                self.correct += got == expected
+
+    def _expected(self, k):
+        """Results race k showed: the simulated ones, or its recorded frame's truth (None if unlabelled)."""
+        if self.truths:
+            return self.truths[k % len(self.truths)]
+        return [(p, n) for p, n, _, _ in self.clock.results(k)]
+
+    def _race_index(self, race_time_uk):
+        current = self.clock.index()
+        for k in range(current, max(-1, current - 50), -1):
+            if self.clock.race_time_uk(k) == race_time_uk:
+                return k
+        return None
+
+    def stats(self):
+        elapsed = time.time() - self.started
+        simulated = self.clock.index() + 1
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "races_simulated": simulated,
+            "race_posts": self.races,
+            "result_posts": self.results,
+            "results_scored": self.scored,
+            "results_correct": self.correct,
+            "results_coverage": round(self.results / simulated, 3) if simulated else 0.0,
+            "duplicates": self.duplicates,
+            "scrapers": scraper_memory(),
+        }
+
+
+def _processes():
+    """{pid: (ppid, argv, rss_kb)} for every readable process in /proc (Linux), else {}."""
+    processes = {}
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return processes
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat", encoding="utf-8") as f:
+                # Fields after the parenthesised command name: state, ppid, ...
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                argv = [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+            rss_kb = 0
+            with open(f"/proc/{pid}/status", encoding="utf-8") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss_kb = int(line.split()[1])
+                        break
+        except (OSError, ValueError, IndexError):
+            continue
+        processes[pid] = (ppid, argv, rss_kb)
+    return processes
+
+
+def scraper_memory():
+    """
+    Resident memory of each running scraper (SCRAPER_SCRIPTS):
+    [{script, pid, rss_mb, tree_rss_mb}], where tree_rss_mb adds every
+    descendant process (OCR workers, geckodriver, the browser).
+    Empty where /proc is unavailable.
+    """
+    processes = _processes()
+    children = {}
+    for pid, (ppid, _, _) in processes.items():
+        children.setdefault(ppid, []).append(pid)
+
+    scrapers = []
+    for pid, (_, argv, rss_kb) in sorted(processes.items()):
+        script = next((Path(arg).name for arg in argv[:2] if Path(arg).name in SCRAPER_SCRIPTS), None)
+        if script is None:
+            continue
+        tree_kb, stack = 0, [pid]
+        while stack:
+            current = stack.pop()
+            tree_kb += processes[current][2]
+            stack.extend(children.get(current, []))
+        scrapers.append({"script": script, "pid": pid, "rss_mb": round(rss_kb / 1024, 1),
+                         "tree_rss_mb": round(tree_kb / 1024, 1)})
+    return scrapers
+
+
+HOME_HTML = """<!doctype html>
+<html><head><title>Paddy Power (fake)</title></head>
+<body>
+<div id="onetrust-banner"><button id="onetrust-accept-btn-handler"
+  onclick="this.parentNode.remove()">Accept</button></div>
+<a href="/horse-racing?tab=virtuals">Virtuals</a>
+</body></html>
+"""
+
+VIRTUALS_HTML = """<!doctype html>
+<html><head><title>Virtual Horse Racing (fake)</title>
+<style>
+body { font-family: sans-serif; }
+.abc-tab { display: inline-block; padding: 6px 10px; margin: 2px; border: 1px solid #999; cursor: pointer; }
+.abc-tab.active { background: #004833; color: #fff; }
+.racing-runner { display: flex; gap: 12px; padding: 4px; border-bottom: 1px solid #ddd; }
+</style></head>
+<body>
+<div class="virtuals-sport__tabs"></div>
+<div class="virtuals-sport__card"></div>
+<script>
+let selected = null;
+let tabsKey = "";
+let cardKey = "";
+const esc = (s) => String(s).replace(/[&<>"]/g, (c) => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"}[c]));
+
+function render(state) {
+  const times = state.tabs.map((t) => t.time_ist);
+  if (selected === null || !times.includes(selected)) selected = times[times.length - 1];
+  const key = times.join(",") + "|" + selected;
+  if (key !== tabsKey) {
+    tabsKey = key;
+    document.querySelector(".virtuals-sport__tabs").innerHTML = times.map((t) =>
+      `<div class="abc-tab${t === selected ? " active" : ""}" data-time="${t}">` +
+      `<span class="tab__title">${t}</span></div>`).join("");
+    for (const tab of document.querySelectorAll(".abc-tab")) {
+      tab.onclick = () => { selected = tab.dataset.time; tabsKey = ""; cardKey = ""; refresh(); };
+    }
+  }
+  const tab = state.tabs.find((t) => t.time_ist === selected);
+  const html = tab.runners.map((r) =>
+    `<div class="racing-runner" data-runner-id="${esc(tab.time_ist)}-${r.number}">` +
+    `<span class="racing-runner__number">${r.number}</span>` +
+    `<span class="racing-runner__selection-name">${esc(r.name)}</span>` +
+    `<div class="racing-runner__item"><div class="label-value">` +
+    `<span class="label-value__label">Jockey</span><span class="label-value__value">${esc(r.jockey)}</span>` +
+    `</div></div>` +
+    `<button class="btn-odds"><span class="btn-odds__label">${r.odds}</span></button></div>`).join("");
+  if (html !== cardKey) {
+    cardKey = html;
+    document.querySelector(".virtuals-sport__card").innerHTML = html;
+  }
+}
+
+async function refresh() {
+  try { render(await (await fetch("/fake/state")).json()); } catch (e) {}
+}
+refresh();
+setInterval(refresh, 500);
+</script>
+</body></html>
+"""
+
+PLAYER_HTML = """<!doctype html>
+<html><head><title>Horses Flats (fake stream)</title>
+<style>body { margin: 0; background: #000; } video { width: 100vw; height: 100vh; object-fit: contain; }</style>
+</head>
+<body>
+<video autoplay muted playsinline></video>
+<script>
+const canvas = document.createElement("canvas");
+canvas.width = 1280; canvas.height = 720;
+const ctx = canvas.getContext("2d");
+const video = document.querySelector("video");
+video.srcObject = canvas.captureStream(10);
+video.play();
+
+let state = null;
+const frames = {};
+async function refresh() {
+  try { state = await (await fetch("/fake/state")).json(); } catch (e) {}
+}
+
+function drawRacing(now) {
+  ctx.fillStyle = "#2e7d32";
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+  for (let i = 0; i < 8; i++) {
+    const x = (now / 4 + i * 137) % canvas.width;
+    ctx.fillStyle = `hsl(${i * 45}, 70%, 50%)`;
+    ctx.fillRect(x, 200 + i * 50, 60, 30);
+  }
+}
+
+function drawResults(player) {
+  if (player.frame) {
+    let image = frames[player.frame];
+    if (!image) { image = frames[player.frame] = new Image(); image.src = player.frame; }
+    if (image.complete) { ctx.drawImage(image, 0, 0, canvas.width, canvas.height); return; }
+  }
+  ctx.fillStyle = "#1b2a49";
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+  ctx.fillStyle = "#0d47a1";
+  ctx.fillRect(240, 160, 800, 400);
+  ctx.fillStyle = "#ffffff";
+  ctx.font = "bold 30px sans-serif";
+  player.lines.forEach((line, i) => ctx.fillText(line, 270, 210 + i * 52));
+}
+
+function draw() {
+  const now = performance.now();
+  if (state && state.player.phase === "results") drawResults(state.player);
+  else drawRacing(now);
+  requestAnimationFrame(draw);
+}
+refresh();
+setInterval(refresh, 250);
+draw();
+</script>
+</body></html>
+"""
+
+
+class FakeSiteHandler(BaseHTTPRequestHandler):
+    clock = None
+    sink = None
+    frames = []
+
+    def log_message(self, format, *args):
+        pass  # Keep soak runs quiet
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8"):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, status, obj):
+        self._send(status, json.dumps(obj), "application/json")
+
+    def state(self):
+        clock, now = self.clock, time.time()
+        k = clock.index(now)
+        tabs = [{"time_ist": clock.race_time_ist(t), "runners": clock.card(t, now)}
+                for t in range(k + 1, k + 1 + TABS)]
+        player = {"phase": "racing", "race_time_uk": clock.race_time_uk(k)}
+        if k > 0 and clock.phase(now) < RESULTS_SHARE:
+            # Results of the race that just finished
+            player = {"phase": "results", "race_time_uk": clock.race_time_uk(k - 1),
+                      "lines": clock.overlay_lines(k - 1),
+                      "frame": f"/fake/frames/{self.frames[(k - 1) % len(self.frames)].name}" if self.frames else None}
+        return {"race": k, "tabs": tabs, "player": player}
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/":
+            self._send(200, HOME_HTML)
+        elif path == "/horse-racing":
+            self._send(200, VIRTUALS_HTML)
+        elif path == "/horsesflats.html":
+            self._send(200, PLAYER_HTML)
+        elif path == "/fake/state":
+            self._json(200, self.state())
+        elif path == "/fake/stats":
+            self._json(200, self.sink.stats())
+        elif path.startswith("/fake/frames/"):
+            name = Path(unquote(path.rsplit("/", 1)[1])).name
+            match = [f for f in self.frames if f.name == name]
+            if match:
+                self._send(200, match[0].read_bytes(), "image/png")
+            else:
+                self._send(404, "not found")
+        else:
+            self._send(404, "not found")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._json(400, {"error": "invalid JSON"})
+            return
+
+        parts = path.strip("/").split("/")
+        if len(parts) < 2 or parts[0] != "api" or parts[1] not in ("races", "results"):
+            self._json(404, {"error": "not found"})
+            return
+        kind = parts[1]
+        if parts[2:] == ["batch"]:
+            results = []
+            for item in body.get("items", []):
+                self.sink.add(kind, item)
+                results.append({"ok": True, "idempotency_key": item.get("idempotency_key")})
+            self._json(201, {"results": results})
+        else:
+            if "idempotency_key" not in body and self.headers.get("Idempotency-Key"):
+                body["idempotency_key"] = self.headers["Idempotency-Key"]
+            self.sink.add(kind, body)
+            self._json(201, {"ok": True})
+
+
+def serve(port=8800, race_seconds=5.0, frames_dir=None, seed=0, stats_every=60):
+    """Run the fake site until interrupted, printing /fake/stats every stats_every seconds."""
+    clock = RaceClock(race_seconds, seed)
+    FakeSiteHandler.clock = clock
+    FakeSiteHandler.frames = sorted(Path(frames_dir).glob("*.png")) if frames_dir else []
+    truths = load_truth(FakeSiteHandler.frames)
+    FakeSiteHandler.sink = Sink(clock, truths)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeSiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🏇 Fake site on http://127.0.0.1:{port} (one race every {race_seconds}s"
+          f"{f', {len(FakeSiteHandler.frames)} recorded frames' if frames_dir else ''})")
+    if frames_dir:
+        labelled = sum(truth is not None for truth in truths)
+        print(f"   Scoring {labelled}/{len(truths)} frames with ground truth" if labelled
+              else "   No ground truth (<name>.json) beside the frames: accuracy is not scored")
+    print(f"   Virtuals: http://127.0.0.1:{port}/horse-racing?tab=virtuals")
+    print(f"   Player:   http://127.0.0.1:{port}/horsesflats.html")
+    try:
+        while True:
+            time.sleep(stats_every)
+            print(f"📊 {FakeSiteHandler.sink.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(f"📊 {FakeSiteHandler.sink.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the virtuals site, stream and backend")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--race-seconds", type=float, default=5.0, help="simulated race cycle length")
+    parser.add_argument("--frames", help="directory of recorded results frames (*.png, with <name>.json truth) to play")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stats-every", type=int, default=60, help="seconds between stats lines")
+    args = parser.parse_args()
+    serve(args.port, args.race_seconds, args.frames, args.seed, args.stats_every)
+    sys.exit(0)
@@ -0,0 +1,344 @@
+"""
+Network Feed Capture - Reads race cards from the site's own XHR/WebSocket feed
+
+This module:
+1. Hooks fetch, XMLHttpRequest and WebSocket in the page (pinned as a
+   WebDriver BiDi preload script when available, so it is in place before
+   the site loads, and re-injected after every navigation)
+2. Buffers JSON responses that look like virtual race cards / odds
+3. Parses them straight into the race_data structure used by save_to_api()
+
+DOM scraping in scraper.py stays the fallback for races the feed misses.
+Absolute feed times (epoch or ISO with an offset) are converted explicitly to
+IST (race_time) and UK time (race_time_uk), per race_schedule's convention.
+
+Offline use (parse responses recorded with FEED_RECORD_DIR):
+    python feed_capture.py recorded_feed/
+
+Requirements:
+    pip install tzdata   # Windows only: zoneinfo needs the IANA database
+"""
+
+import os
+import re
+import sys
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from race_schedule import IST, UK
+
+
+# Only responses whose body mentions one of these are kept by the page hook
+FEED_KEYWORDS = ["runner", "selection", "jockey", "odds", "price"]
+
+# Cap on responses buffered in the page between drains
+FEED_BUFFER_LIMIT = 200
+
+# Installed into every page. Wraps fetch, XHR and WebSocket and keeps JSON
+# bodies that mention a race-card keyword in window.__feedCapture.
+FEED_HOOK_JS = """
+(keywords, limit) => {
+  if (window.__feedCapture) return;
+  const buffer = window.__feedCapture = [];
+  const keep = (kind, url, body) => {
+    if (typeof body !== "string" || body.length < 2) return;
+    const c = body[0];
+    if (c !== "{" && c !== "[") return;
+    const lower = body.toLowerCase();
+    if (!keywords.some((k) => lower.includes(k))) return;
+    buffer.push({kind: kind, url: String(url), body: body, at: Date.now()});
+    if (buffer.length > limit) buffer.shift();
+  };
+
+  const origFetch = window.fetch;
+  if (origFetch) {
+    window.fetch = function (...args) {
+      return origFetch.apply(this, args).then((res) => {
+        try { res.clone().text().then((t) => keep("fetch", res.url, t), () => {}); } catch (e) {}
+        return res;
+      });
+    };
+  }
+
+  const origOpen = XMLHttpRequest.prototype.open;
+  XMLHttpRequest.prototype.open = function (method, url, ...rest) {
+    this.addEventListener("load", () => {
+      try {
+        if (this.responseType === "" || this.responseType === "text") keep("xhr", url, this.responseText);
+        else if (this.responseType === "json") keep("xhr", url, JSON.stringify(this.response));
+      } catch (e) {}
+    });
+    return origOpen.call(this, method, url, ...rest);
+  };
+
+  const OrigWS = window.WebSocket;
+  if (OrigWS) {
+    window.WebSocket = function (url, protocols) {
+      const ws = protocols === undefined ? new OrigWS(url) : new OrigWS(url, protocols);
+      ws.addEventListener("message", (msg) => keep("ws", url, msg.data));
+      return ws;
+    };
+    window.WebSocket.prototype = OrigWS.prototype;
+    Object.assign(window.WebSocket, {CONNECTING: 0, OPEN: 1, CLOSING: 2, CLOSED: 3});
+  }
+}
+"""
+
+DRAIN_FEED_JS = "return window.__feedCapture ? window.__feedCapture.splice(0) : null;"
+
+# Keys that carry each runner field, tried in order
+NAME_KEYS = ["name", "horseName", "selectionName", "runnerName"]
+NUMBER_KEYS = ["number", "clothNumber", "saddleCloth", "runnerNumber", "draw"]
+JOCKEY_KEYS = ["jockey", "jockeyName", "rider"]
+ODDS_KEYS = ["odds", "price", "currentPrice", "winPrice", "fractional", "decimal"]
+TIME_KEYS = ["raceTime", "startTime", "time", "eventTime", "off"]
+
+TIME_PATTERN = re.compile(r'\b(\d{1,2}):(\d{2})\b')
+
+
+def install_feed_capture(driver):
+    """
+    Pin the network hook as a BiDi preload script (needs the webSocketUrl
+    capability), so it runs in every new document before the site's own
+    scripts and sees the very first requests. Call before the first
+    driver.get(). Returns the pinned script id, or None without BiDi; call
+    hook_current_page() after each driver.get() either way.
+    """
+    try:
+        return driver.script.pin(
+            f"() => ({FEED_HOOK_JS})({json.dumps(FEED_KEYWORDS)}, {FEED_BUFFER_LIMIT})"
+        )
+    except Exception as e:
+        print(f"⚠️ BiDi preload unavailable ({e}), hooking pages after they load")
+        return None
+
+
+def hook_current_page(driver):
+    """
+    Inject the hook into the loaded page. A no-op where the preload script
+    already installed it; otherwise it catches everything after the load.
+    """
+    driver.execute_script(f"({FEED_HOOK_JS})(arguments[0], arguments[1]);",
+                          FEED_KEYWORDS, FEED_BUFFER_LIMIT)
+
+
+def drain_feed(driver, record_dir=None):
+    """
+    Return the responses buffered in the page since the last drain.
+    Re-installs the hook if the page navigated and lost it.
+    When record_dir is set, each response is also written there as a fixture.
+    """
+    captured = driver.execute_script(DRAIN_FEED_JS)
+    if captured is None:
+        hook_current_page(driver)
+        return []
+
+    if record_dir and captured:
+        record_responses(captured, record_dir)
+    return captured
+
+
+def record_responses(responses, record_dir):
+    """Write captured responses to record_dir as JSON fixtures."""
+    record_dir = Path(record_dir)
+    record_dir.mkdir(parents=True, exist_ok=True)
+    for i, response in enumerate(responses):
+        path = record_dir / f"feed_{response.get('at', int(time.time() * 1000))}_{i}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(response, f)
+
+
+def load_recorded_responses(record_dir):
+    """Load fixtures written by record_responses(), oldest first."""
+    responses = []
+    for path in sorted(Path(record_dir).glob("*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            responses.append(json.load(f))
+    responses.sort(key=lambda r: r.get("at", 0))
+    return responses
+
+
+def _first(obj, keys):
+    """First non-empty value in obj for any of keys."""
+    for key in keys:
+        value = obj.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+
+def _text(value):
+    """Flatten a feed value to display text (handles {"name": ...} wrappers)."""
+    if isinstance(value, dict):
+        value = _first(value, ["name", "displayName", "value", "text"])
+    return str(value).strip() if value is not None else ""
+
+
+def format_odds(value):
+    """
+    Render a feed price the way the page shows it.
+    Accepts "5/2", 3.5, or {"numerator": 5, "denominator": 2} style objects.
+    """
+    if value is None:
+        return "N/A"
+    if isinstance(value, dict):
+        num = _first(value, ["numerator", "num", "fractionalNumerator"])
+        den = _first(value, ["denominator", "den", "fractionalDenominator"])
+        if num is not None and den is not None:
+            return "EVS" if str(num) == str(den) else f"{num}/{den}"
+        return format_odds(_first(value, ODDS_KEYS + ["decimalOdds", "value"]))
+    return str(value).strip() or "N/A"
+
+
+def race_datetime(value):
+    """
+    Timezone-aware datetime for an absolute feed time, else None.
+    Accepts epoch seconds / milliseconds and ISO timestamps with an offset or Z.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # Small numbers are not timestamps
+        if value < 1e9:
+            return None
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, tz=UK)
+
+    text = str(value).strip()
+    if 'T' in text:
+        try:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo is not None else None
+    return None
+
+
+def parse_race_time(value, zone=IST):
+    """
+    Turn a feed time into an HH:MM string.
+    Absolute times are converted to zone (IST by default, what the race tabs
+    show); anything else - naive ISO, free text - is searched for HH:MM as is.
+    """
+    if value is None:
+        return ""
+    moment = race_datetime(value)
+    if moment is not None:
+        return moment.astimezone(zone).strftime("%H:%M")
+    if isinstance(value, (int, float)):
+        return ""
+
+    text = str(value).strip()
+    if 'T' in text:
+        try:
+            return datetime.fromisoformat(text).strftime("%H:%M")
+        except ValueError:
+            pass
+
+    match = TIME_PATTERN.search(text)
+    if match:
+        hours, minutes = int(match.group(1)), int(match.group(2))
+        if 0 <= hours <= 23 and 0 <= minutes <= 59:
+            return f"{hours:02d}:{minutes:02d}"
+    return ""
+
+
+def _parse_runner(obj):
+    """Map one feed runner object to the scraper's runner dict, or None."""
+    if not isinstance(obj, dict):
+        return None
+    name = _text(_first(obj, NAME_KEYS))
+    number = _first(obj, NUMBER_KEYS)
+    if not name or number is None:
+        return None
+
+    known = set(NAME_KEYS + NUMBER_KEYS + JOCKEY_KEYS + ODDS_KEYS)
+    extra = {k: v for k, v in obj.items()
+             if k not in known and isinstance(v, (str, int, float, bool))}
+
+    return {
+        "number": str(number).strip(),
+        "name": name,
+        "jockey": _text(_first(obj, JOCKEY_KEYS)) or "N/A",
+        "odds": format_odds(_first(obj, ODDS_KEYS)),
+        "extra": extra,
+    }
+
+
+def _find_races(node, races, race_time="", race_time_uk=""):
+    """
+    Walk a decoded JSON document collecting race cards.
+    A race card is any object holding a list where every element parses as a
+    runner. The race time may sit on the object itself or on an ancestor
+    (e.g. event -> markets -> selections). race_time_uk is only known when
+    the feed time is absolute.
+    """
+    if isinstance(node, list):
+        for item in node:
+            _find_races(item, races, race_time, race_time_uk)
+        return
+    if not isinstance(node, dict):
+        return
+
+    for time_key in TIME_KEYS:
+        value = node.get(time_key)
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            own_time = parse_race_time(value)
+            if own_time:
+                race_time = own_time
+                moment = race_datetime(value)
+                race_time_uk = moment.astimezone(UK).strftime("%H:%M") if moment else ""
+                break
+
+    for value in node.values():
+        if isinstance(value, list) and len(value) >= 2 and race_time:
+            runners = [_parse_runner(item) for item in value]
+            if all(runners):
+                races.append({"race_time": race_time, "race_time_uk": race_time_uk,
+                              "runners": runners, "source": "network"})
+                continue
+        _find_races(value, races, race_time, race_time_uk)
+
+
+def parse_feed_payload(body):
+    """
+    Parse one captured response body into a list of race_data dicts.
+    Non-JSON or unrecognised payloads return [].
+    """
+    try:
+        document = json.loads(body) if isinstance(body, str) else body
+    except ValueError:
+        return []
+    races = []
+    _find_races(document, races)
+    return races
+
+
+def parse_feed_responses(responses):
+    """
+    Parse a sequence of captured responses.
+    Later responses for the same race_time replace earlier ones (latest odds win).
+    Returns {race_time: race_data}.
+    """
+    races = {}
+    for response in responses:
+        for race_data in parse_feed_payload(response.get("body")):
+            races[race_data["race_time"]] = race_data
+    return races
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or not os.path.isdir(sys.argv[1]):
+        print("Usage: python feed_capture.py <recorded_feed_dir>")
+        sys.exit(1)
+
+    recorded = load_recorded_responses(sys.argv[1])
+    parsed = parse_feed_responses(recorded)
+    print(f"Parsed {len(parsed)} races from {len(recorded)} recorded responses")
+    for race_time, race_data in sorted(parsed.items()):
+        uk = f", UK {race_data['race_time_uk']}" if race_data["race_time_uk"] else ""
+        print(f"\n{race_time}{uk} ({len(race_data['runners'])} runners)")
+        for runner in race_data["runners"]:
+            print(f"  {runner['number']:>2} {runner['name']:<24} {runner['jockey']:<20} {runner['odds']}")
@@ -0,0 +1,75 @@
+"""
+Frame Hash - Perceptual fingerprints to skip OCR on unchanged frames
+
+While a results overlay (or any static screen) is up, consecutive frames are
+near-identical and OCR'ing each one is wasted work. This module:
+1. Fingerprints a frame (ideally the results-panel crop) as a box-downscaled
+   FINGERPRINT_SIZE grayscale array, fine enough that panels of different
+   races - same layout, different text - differ in hundreds of cells
+2. Compares each frame only with the frame before it, so a panel is only
+   skipped while it stays on screen and the next race's panel is always OCR'd
+3. Reports a frame as a duplicate when at most MAX_CHANGED_CELLS cells moved
+   by more than CELL_DELTA grey levels (compression noise averages out)
+
+Requirements:
+    pip install pillow numpy
+"""
+
+import numpy as np
+from PIL import Image
+
+
+# Fingerprint resolution (width, height)
+FINGERPRINT_SIZE = (128, 64)
+
+# A cell counts as changed when it moves by more than this many grey levels...
+CELL_DELTA = 24
+# ...and a frame is a duplicate of the previous one with at most this many changed cells
+MAX_CHANGED_CELLS = 3
+
+
+def fingerprint(image, size=FINGERPRINT_SIZE):
+    """Grayscale NumPy array of the image box-downscaled to size (width, height)."""
+    return np.asarray(image.convert('L').resize(size, Image.BOX), dtype=np.int16)
+
+
+def changed_cells(a, b, delta=CELL_DELTA):
+    """Number of fingerprint cells that differ by more than delta."""
+    return int((np.abs(a - b) > delta).sum())
+
+
+class FrameDeduper:
+    """Previous-frame comparison with skip/hit accounting."""
+
+    def __init__(self, max_changed=MAX_CHANGED_CELLS, size=FINGERPRINT_SIZE):
+        self.max_changed = max_changed
+        self.size = size
+        self.previous = None
+
+        # Stats
+        self.frames = 0
+        self.skipped = 0
+
+    def check(self, image):
+        """
+        Fingerprint a frame and compare it with the previous one.
+        Returns (is_duplicate, changed cells or None for the first frame).
+        """
+        self.frames += 1
+        current = fingerprint(image, self.size)
+        previous, self.previous = self.previous, current
+        if previous is None or previous.shape != current.shape:
+            return False, None
+
+        changed = changed_cells(previous, current)
+        if changed <= self.max_changed:
+            self.skipped += 1
+            return True, changed
+        return False, changed
+
+    def reset(self):
+        """Forget the previous frame (e.g. after a navigation or a change of crop)."""
+        self.previous = None
+
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
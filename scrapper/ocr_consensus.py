@@ -0,0 +1,166 @@
+"""
+OCR Consensus - Multi-frame, confidence-weighted voting on race results
+
+A single misread horse_number maps the wrong winner. While the results
+overlay is up, this module:
+1. Grabs a short burst of extra frames right after the frame that looks like
+   a results screen (in the capture loop, so they show the same overlay) and
+   OCRs the group in parallel with image_to_data, so every line comes with
+   tesseract's word confidences
+2. Parses each frame into per-position (horse_number, name) readings
+3. Votes per position, weighting each reading by its line confidence
+4. Returns one consolidated result list with a per-position and overall
+   confidence, plus the positions where the frames disagreed
+
+Requirements:
+    pip install pytesseract pillow
+"""
+
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from results_region import ocr_words, words_to_text
+from results_layout import parse_results_layout
+
+
+# Frames OCR'd per results screen (including the one that detected it)
+CONSENSUS_FRAMES = 3
+# Gap between burst captures (seconds)
+BURST_GAP = 0.5
+
+# Weight given to a reading whose confidence is unknown (e.g. image_to_string text)
+DEFAULT_CONF = 50.0
+
+# Results below this overall confidence (0..1) are flagged
+MIN_CONFIDENCE = 0.6
+
+
+def line_confidences(words):
+    """Mean word confidence per rebuilt text line."""
+    lines = defaultdict(list)
+    order = []
+    for word in words:
+        if word["line"] not in lines:
+            order.append(word["line"])
+        lines[word["line"]].append(word)
+    confidences = {}
+    for key in order:
+        line_words = lines[key]
+        text = " ".join(w["text"] for w in line_words)
+        confidences[text.strip()] = sum(w["conf"] for w in line_words) / len(line_words)
+    return confidences
+
+
+def read_frame(image, parse, box=None, config="", preprocessor=None):
+    """
+    OCR one frame with confidences and parse it.
+    The layout parser (word boxes) is tried first; parse, the text parser
+    (parse_race_results), is the fallback. Each result gets a "conf" (0-100).
+    config is passed to tesseract (e.g. race_lexicon.user_words_config());
+    a preprocessor (ocr_preprocess.Preprocessor) cleans the crop and adds its config.
+    Returns (text, results, dividends).
+    """
+    if preprocessor:
+        image = preprocessor.apply(image, box)
+        config = f"{preprocessor.config} {config}".strip()
+    elif box:
+        image = image.crop(box)
+    words = ocr_words(image.convert('L'), config)
+    text = words_to_text(words)
+
+    results, dividends = parse_results_layout(words)
+    if results:
+        return text, results, dividends
+
+    confidences = line_confidences(words)
+    results = parse(text)
+    for result in results:
+        result["conf"] = confidences.get(result.get("full_line", "").strip(), DEFAULT_CONF)
+    return text, results, dividends
+
+
+def capture_burst(capture, count=CONSENSUS_FRAMES - 1, gap=BURST_GAP):
+    """
+    Grab count frames gap seconds apart using capture() (e.g. capture_frame(driver)).
+    Frames capture() could not read (None) are left out.
+    """
+    frames = []
+    for i in range(count):
+        if i:
+            time.sleep(gap)
+        frame = capture()
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+
+def read_frames(frames, parse, box=None, config="", preprocessor=None):
+    """
+    OCR frames in parallel (tesseract runs as a subprocess, so threads suffice).
+    Returns (readings, dividends): one result list per frame, and the
+    FORECAST/TRICAST dividends from the first frame that showed them.
+    """
+    if not frames:
+        return [], {}
+    with ThreadPoolExecutor(max_workers=len(frames)) as executor:
+        read = list(executor.map(lambda f: read_frame(f, parse, box, config, preprocessor), frames))
+    dividends = {}
+    for _, _, frame_dividends in read:
+        for kind, value in frame_dividends.items():
+            dividends.setdefault(kind, value)
+    return [results for _, results, _ in read], dividends
+
+
+def vote(readings):
+    """
+    Combine per-frame result lists into one.
+    readings is a list of result lists (each result: position, horse_number,
+    raw_text, full_line, optional conf). Returns (results, confidence, disagreements).
+    A position's confidence is the winning number's summed confidence over the
+    best possible (every frame that read any result reading it at 100), so it
+    drops with dissent, frames that missed the line, and low tesseract
+    confidence alike. Frames with no results at all (the overlay was already
+    gone) do not count against it.
+    The overall confidence is the lowest position's; disagreements maps
+    position -> {horse_number: weight} for contested positions.
+    """
+    tallies = defaultdict(lambda: defaultdict(float))
+    best = {}  # (position, horse_number) -> highest-confidence reading
+
+    for results in readings:
+        for result in results:
+            position = int(result.get("position", 0))
+            number = str(result.get("horse_number", "")).strip()
+            if not position or not number:
+                continue
+            conf = float(result.get("conf", DEFAULT_CONF))
+            tallies[position][number] += conf
+            key = (position, number)
+            if key not in best or conf > float(best[key].get("conf", DEFAULT_CONF)):
+                best[key] = result
+
+    frames = sum(1 for results in readings if results) or 1
+    consolidated = []
+    disagreements = {}
+    used_numbers = set()
+    for position in sorted(tallies):
+        # A horse can only finish in one place: prefer numbers not already placed
+        ranked = sorted(tallies[position].items(), key=lambda item: -item[1])
+        ranked = [item for item in ranked if item[0] not in used_numbers] or ranked
+        number, weight = ranked[0]
+        share = weight / (frames * 100)
+        if len(tallies[position]) > 1:
+            disagreements[position] = {n: round(w, 1) for n, w in tallies[position].items()}
+
+        used_numbers.add(number)
+        result = dict(best[(position, number)])
+        result["confidence"] = round(min(share, 1.0), 3)
+        result["votes"] = sum(1 for results in readings
+                              for r in results
+                              if int(r.get("position", 0)) == position
+                              and str(r.get("horse_number", "")).strip() == number)
+        consolidated.append(result)
+
+    confidence = min((r["confidence"] for r in consolidated), default=0.0)
+    return consolidated, confidence, disagreements
@@ -0,0 +1,226 @@
+"""
+OCR Preprocess - Vectorised image clean-up in front of tesseract
+
+The results overlay is white text on coloured bars. Handed a plain
+grayscale frame, tesseract spends time segmenting the background and
+still misreads digits. This module turns a frame into clean black-on-white
+text before OCR, all in NumPy:
+1. Crop (optional box) and grayscale
+2. Invert so text is dark on light, decided from the border pixels
+3. Binarise: global Otsu or adaptive local-mean threshold (integral image)
+4. Denoise: drop isolated specks (neighbour count) without thinning strokes
+5. Integer upscale of small text (pixel repeat)
+
+Upscaling is last. Inversion and Otsu only look at the histogram, which
+pixel repetition scales evenly, so they give the same result either way.
+The adaptive threshold and the denoise pass are window-based and do not
+commute with it: at native size their windows (ADAPTIVE_BLOCK, 3x3) cover
+a larger share of each glyph, so edge pixels can land differently than they
+would after upscaling. The text comes out essentially the same for a
+quarter of the work, and the windows are tuned at native size.
+
+Stages and the tesseract config (PSM) are bundled as PRESETS.
+
+Benchmark against a labelled frame set (<name>.png + <name>.json holding
+{"results": [{"position": 1, "horse_number": "4"}, ...], "box": [l, t, r, b]}):
+    python ocr_preprocess.py labelled_frames/ [preset ...]
+
+Requirements:
+    pip install pytesseract pillow numpy
+"""
+
+import sys
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+PRESETS = {
+    # What the scraper did before: grayscale only, automatic page segmentation
+    "raw": {"upscale": 1, "threshold": None, "invert": False, "denoise": False,
+            "config": "--psm 3"},
+    # Global threshold, one uniform block of text
+    "fast": {"upscale": 1, "threshold": "otsu", "invert": True, "denoise": False,
+             "config": "--psm 6"},
+    # Small text on the overlay bars: upscale, local threshold, speck removal
+    "overlay": {"upscale": 2, "threshold": "adaptive", "invert": True, "denoise": True,
+                "config": "--psm 6"},
+}
+
+DEFAULT_PRESET = "overlay"
+
+# Adaptive threshold: local-mean window (pixels, before upscaling) and offset below the mean
+ADAPTIVE_BLOCK = 15
+ADAPTIVE_OFFSET = 10
+
+# Dark pixels with fewer dark neighbours (of 8) than this are specks
+DENOISE_NEIGHBOURS = 2
+
+
+def to_gray(image, box=None):
+    """Crop and grayscale a PIL image into a uint8 array."""
+    if box:
+        image = image.crop(box)
+    return np.asarray(image.convert('L'), dtype=np.uint8)
+
+
+def upscale(pixels, factor):
+    """Integer upscale by pixel repetition."""
+    if factor <= 1:
+        return pixels
+    return pixels.repeat(factor, axis=0).repeat(factor, axis=1)
+
+
+def otsu_threshold(pixels):
+    """Global Otsu threshold: pixels above it become 255, the rest 0."""
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * np.arange(256))
+    total, total_mean = weight[-1], mean[-1]
+    background = weight[:-1]
+    foreground = total - background
+    valid = (background > 0) & (foreground > 0)
+    between = np.zeros(255)
+    between[valid] = (total_mean * background[valid] - total * mean[:-1][valid]) ** 2 \
+        / (background[valid] * foreground[valid])
+    level = int(np.argmax(between))
+    return np.where(pixels > level, 255, 0).astype(np.uint8)
+
+
+def adaptive_threshold(pixels, block=ADAPTIVE_BLOCK, offset=ADAPTIVE_OFFSET):
+    """Local-mean threshold over block x block windows, via an integral image."""
+    half = block // 2
+    padded = np.pad(pixels.astype(np.int32), half + 1, mode='edge')
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    height, width = pixels.shape
+    a = integral[block:block + height, block:block + width]
+    b = integral[:height, block:block + width]
+    c = integral[block:block + height, :width]
+    d = integral[:height, :width]
+    # pixel > local mean - offset, kept in integers: pixel * area > window sum - offset * area
+    area = block * block
+    window_sum = a - b - c + d
+    return np.where(pixels.astype(np.int32) * area > window_sum - offset * area, 255, 0).astype(np.uint8)
+
+
+def auto_invert(pixels):
+    """Make the background light: invert when the border pixels are mostly dark."""
+    border = np.concatenate([pixels[0], pixels[-1], pixels[:, 0], pixels[:, -1]])
+    return 255 - pixels if border.mean() < 128 else pixels
+
+
+def denoise(binary, min_neighbours=DENOISE_NEIGHBOURS):
+    """
+    Remove isolated dark specks (text is dark): a dark pixel with fewer than
+    min_neighbours dark pixels in its 3x3 neighbourhood turns white.
+    Unlike an opening this never thins strokes that are 1-2 pixels wide.
+    """
+    dark = (binary < 128).astype(np.uint8)
+    padded = np.pad(dark, 1)
+    height, width = dark.shape
+    neighbours = sum(padded[dy:dy + height, dx:dx + width] for dy in range(3) for dx in range(3)) - dark
+    return np.where(dark & (neighbours < min_neighbours), 255, binary).astype(np.uint8)
+
+
+class Preprocessor:
+    """Runs a preset's stages on frames and times each stage."""
+
+    def __init__(self, preset=DEFAULT_PRESET):
+        self.name = preset
+        self.settings = PRESETS[preset]
+        self.config = self.settings["config"]
+        self.stage_ms = {}
+        self.frames = 0
+
+    def _timed(self, stage, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stage_ms[stage] = self.stage_ms.get(stage, 0.0) + (time.perf_counter() - started) * 1000
+        return result
+
+    def apply(self, image, box=None):
+        """Preprocessed PIL 'L' image ready for tesseract."""
+        settings = self.settings
+        pixels = self._timed("gray", to_gray, image, box)
+        if settings["invert"]:
+            pixels = self._timed("invert", auto_invert, pixels)
+        if settings["threshold"] == "otsu":
+            pixels = self._timed("threshold", otsu_threshold, pixels)
+        elif settings["threshold"] == "adaptive":
+            pixels = self._timed("threshold", adaptive_threshold, pixels)
+        if settings["denoise"]:
+            pixels = self._timed("denoise", denoise, pixels)
+        if settings["upscale"] > 1:
+            pixels = self._timed("upscale", upscale, pixels, settings["upscale"])
+        self.frames += 1
+        return Image.fromarray(pixels)
+
+    def stats(self):
+        """Average milliseconds per stage."""
+        return {stage: round(ms / self.frames, 2) for stage, ms in self.stage_ms.items()} if self.frames else {}
+
+
+def benchmark(labelled_dir, presets=None):
+    """
+    Per-stage milliseconds, OCR milliseconds and accuracy for each preset.
+    Accuracy is the share of labelled (position, horse_number) pairs read
+    correctly by the layout parser.
+    """
+    from results_region import ocr_words
+    from results_layout import parse_results_layout
+
+    labelled_dir = Path(labelled_dir)
+    samples = []
+    for label_path in sorted(labelled_dir.glob("*.json")):
+        image_path = label_path.with_suffix(".png")
+        if not image_path.exists():
+            continue
+        with open(label_path, 'r', encoding='utf-8') as f:
+            label = json.load(f)
+        image = Image.open(image_path)
+        image.load()
+        expected = {(int(r["position"]), str(r["horse_number"])) for r in label.get("results", [])}
+        samples.append((image, label.get("box"), expected))
+
+    if not samples:
+        print(f"No labelled frames (<name>.png + <name>.json) in {labelled_dir}")
+        return []
+
+    rows = []
+    for preset in presets or PRESETS:
+        preprocessor = Preprocessor(preset)
+        ocr_ms, correct, total = 0.0, 0, 0
+        for image, box, expected in samples:
+            prepared = preprocessor.apply(image, box)
+            started = time.perf_counter()
+            words = ocr_words(prepared, preprocessor.config)
+            ocr_ms += (time.perf_counter() - started) * 1000
+            records, _ = parse_results_layout(words)
+            read = {(r["position"], r["horse_number"]) for r in records}
+            correct += len(expected & read)
+            total += len(expected)
+        stages = preprocessor.stats()
+        rows.append({
+            "preset": preset,
+            "prep_ms": round(sum(stages.values()), 2),
+            "stages": stages,
+            "ocr_ms": round(ocr_ms / len(samples), 1),
+            "accuracy": correct / total if total else 0.0,
+        })
+
+    print(f"{len(samples)} labelled frames")
+    print(f"{'preset':>8} {'prep ms':>8} {'OCR ms':>8} {'accuracy':>8}  stages")
+    for row in rows:
+        stages = " ".join(f"{stage}={ms}" for stage, ms in row["stages"].items())
+        print(f"{row['preset']:>8} {row['prep_ms']:>8.2f} {row['ocr_ms']:>8.1f} {row['accuracy']:>8.1%}  {stages}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python ocr_preprocess.py <labelled_frames_dir> [preset ...]")
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2:] or None)
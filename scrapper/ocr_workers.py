@@ -0,0 +1,183 @@
+"""
+OCR Workers - Long-lived OCR process pool fed by a bounded frame queue
+
+Keeps tesseract off the capture loop:
+1. Frames are submitted with their capture metadata and OCR'd in worker
+   processes that live for the whole session (each keeps its own cached
+   results-panel box when ROI OCR is on)
+2. At most max_pending frames are queued; when OCR falls behind, new frames
+   are dropped (and counted) instead of delaying the next capture
+3. Results are released strictly in submission order, together with the
+   metadata they were submitted with, so capture timestamps and
+   video_race_time assignment stay correct however the workers interleave
+4. When a frame turns out to be a results screen the worker also reads it
+   with word boxes (layout parser: horse, jockey, odds, dividends), together
+   with the burst of frames captured right after it, if any, for
+   ocr_consensus.vote()
+
+Requirements:
+    pip install pytesseract pillow
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytesseract
+from PIL import Image
+
+from results_region import ResultsRegion, frame_text
+from results_text import is_results_screen, parse_race_results
+from ocr_consensus import read_frames
+from ocr_preprocess import Preprocessor
+from race_lexicon import user_words_config
+
+
+# Per-process state, set up once by _init_worker
+_region = None
+_generation = 0  # OcrPool.generation the cached box belongs to
+_user_words = False
+_preprocessor = None
+
+
+def _init_worker(roi, tesseract_cmd, user_words, preset):
+    """Worker initializer: reuse the parent's tesseract path and set up the ROI cache."""
+    global _region, _user_words, _preprocessor
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    _region = ResultsRegion(user_words, preset) if roi else None
+    _user_words = user_words
+    _preprocessor = Preprocessor(preset) if preset else None
+
+
+def _ocr_job(size, data, generation=0, burst=()):
+    """
+    OCR one grayscale frame. Returns (text, ocr_ms, error, roi_box, readings, dividends).
+    A frame from a newer generation (OcrPool.reset_regions) drops the cached box first.
+    For a results screen, readings / dividends are ocr_consensus.read_frames()
+    over the frame plus burst ([(size, data)] captured after it), else None.
+    Errors are returned as strings: some pytesseract exceptions cannot be
+    pickled back to the parent and would break the pool.
+    """
+    global _generation
+    if _region is not None and generation != _generation:
+        _region.reset()
+    _generation = generation
+    image = Image.frombytes('L', size, data)
+    started = time.perf_counter()
+    try:
+        if _region is not None:
+            text = _region.ocr(image)
+        else:
+            # Same preprocessing and config as the inline extract_text_from_image()
+            text = frame_text(image, _preprocessor, user_words_config() if _user_words else "")
+        error = None
+    except Exception as e:
+        text, error = "", str(e)
+    box = _region.box if _region is not None else None
+
+    readings, dividends = None, None
+    if not error and is_results_screen(text):
+        frames = [image] + [Image.frombytes('L', burst_size, burst_data) for burst_size, burst_data in burst]
+        try:
+            readings, dividends = read_frames(frames, parse_race_results, box,
+                                              user_words_config() if _user_words else "",
+                                              _preprocessor if box else None)
+        except Exception as e:
+            error = str(e)
+    return text.strip(), (time.perf_counter() - started) * 1000, error, box, readings, dividends
+
+
+class OcrPool:
+    """Process pool that OCRs frames and hands results back in capture order."""
+
+    def __init__(self, workers=2, max_pending=4, roi=True, user_words=False, preset=None):
+        self.max_pending = max_pending
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(roi, pytesseract.pytesseract.tesseract_cmd, user_words, preset),
+        )
+        self.generation = 0  # bumped by reset_regions(); travels with every frame
+        self.inflight = {}  # seq -> (future, meta)
+        self.next_seq = 0
+        self.next_release = 0
+
+        # Stats
+        self.submitted = 0
+        self.dropped = 0
+        self.completed_count = 0
+        self.total_ocr_ms = 0.0
+        self.total_lag = 0.0
+
+    def submit(self, image, meta, burst=()):
+        """
+        Queue a frame for OCR. meta travels with it and comes back in completed().
+        burst frames (captured right after it) are read with it as one group.
+        Returns False (and drops the frame) when max_pending frames are already queued.
+        """
+        if len(self.inflight) >= self.max_pending:
+            self.dropped += 1
+            return False
+
+        gray = image.convert('L')
+        burst = [(g.size, g.tobytes()) for g in (frame.convert('L') for frame in burst)]
+        future = self.executor.submit(_ocr_job, gray.size, gray.tobytes(), self.generation, burst)
+        self.inflight[self.next_seq] = (future, dict(meta, submitted_at=time.time(), generation=self.generation))
+        self.next_seq += 1
+        self.submitted += 1
+        return True
+
+    def reset_regions(self):
+        """
+        Make every worker forget its cached results-panel box (e.g. the frame
+        source changed geometry). Workers can't be addressed one by one, so
+        each drops its box on the first frame it gets from the new generation.
+        """
+        self.generation += 1
+
+    def completed(self, block=False):
+        """
+        Return [(meta, text, ocr_ms), ...] for finished frames, oldest first.
+        meta["roi_box"] is the worker's cached results-panel box, if any (None
+        for frames submitted before the last reset_regions()); meta["readings"]
+        and meta["dividends"] are the word-box reading of a frame (plus its
+        burst) that showed results, else None.
+        A frame is only released once every earlier frame has been released.
+        With block=True, waits for everything currently queued.
+        """
+        released = []
+        while self.next_release in self.inflight:
+            future, meta = self.inflight[self.next_release]
+            if not block and not future.done():
+                break
+            try:
+                text, ocr_ms, error, meta["roi_box"], meta["readings"], meta["dividends"] = future.result()
+            except Exception as e:
+                text, ocr_ms, error, meta["roi_box"], meta["readings"], meta["dividends"] = \
+                    "", 0.0, str(e), None, None, None
+            if error:
+                print(f"Error extracting text: {error}")
+            if meta["generation"] != self.generation:
+                meta["roi_box"] = None
+
+            del self.inflight[self.next_release]
+            self.next_release += 1
+            self.completed_count += 1
+            self.total_ocr_ms += ocr_ms
+            self.total_lag += time.time() - meta["submitted_at"]
+            released.append((meta, text, ocr_ms))
+        return released
+
+    def shutdown(self):
+        """Stop the workers, abandoning queued frames."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Queue and latency numbers for logging."""
+        done = self.completed_count
+        return {
+            "pending": len(self.inflight),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "ocr_ms_avg": round(self.total_ocr_ms / done, 1) if done else 0.0,
+            "lag_s_avg": round(self.total_lag / done, 2) if done else 0.0,
+        }
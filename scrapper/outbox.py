@@ -0,0 +1,281 @@
+"""
+Outbox - Durable local queue between the scrapers and the backend API
+
+Both scrapers hand their payloads to an Outbox instead of posting inline:
+1. put() appends the payload to an on-disk journal (outbox/<kind>.jsonl)
+   and returns immediately, so capture never waits on the network
+2. A background sender drains the journal over a pooled requests.Session,
+   coalescing queued items into POST /api/<kind>/batch requests
+3. Transport errors and 5xx responses are retried with exponential backoff;
+   every item carries an idempotency key so a retried batch is not stored
+   twice. Items the backend rejects (4xx, or ok: false in a batch reply) are
+   dead-lettered at once: resending them cannot succeed
+4. Items still pending after a crash/restart are replayed from the journal
+
+Requirements:
+    pip install requests
+"""
+
+import json
+import time
+import uuid
+import random
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Configuration
+OUTBOX_DIR = Path(__file__).parent / "outbox"
+BACKEND_URL = "http://localhost:5000"   # change if deployed
+
+# Max items coalesced into one batch request
+BATCH_SIZE = 25
+
+# Retry backoff (seconds)
+BACKOFF_START = 1
+BACKOFF_MAX = 60
+
+# Items that keep failing are moved to <kind>.dead.jsonl after this many attempts
+# (rejected items go there straight away)
+MAX_ATTEMPTS = 20
+
+# Compact the journal once everything is acked and it has grown past this size
+COMPACT_BYTES = 1024 * 1024
+
+REQUEST_TIMEOUT = 15
+
+# 4xx statuses that are worth retrying (timeout, rate limit); other 4xx are permanent rejects
+RETRYABLE_4XX = (408, 429)
+
+
+def is_rejection(status_code):
+    """True for a client error that resending the same payload cannot fix."""
+    return 400 <= status_code < 500 and status_code not in RETRYABLE_4XX
+
+
+class Outbox:
+    """Append-only journal of payloads for one API resource ("races" or "results")."""
+
+    def __init__(self, kind, backend_url=BACKEND_URL, directory=OUTBOX_DIR):
+        self.kind = kind
+        self.backend_url = backend_url.rstrip('/')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.journal_path = self.directory / f"{kind}.jsonl"
+        self.dead_path = self.directory / f"{kind}.dead.jsonl"
+
+        self.pending = OrderedDict()  # id -> {"payload": ..., "queued_at": ..., "attempts": n}
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.thread = None
+        self.batch_supported = True
+
+        # Metrics
+        self.sent = 0
+        self.failed_attempts = 0
+        self.dead = 0
+        self.last_send_ms = 0.0
+        self.total_send_ms = 0.0
+        self.send_count = 0
+        self.last_queue_delay = 0.0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._replay()
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        """Rebuild the pending queue from the journal (put entries minus acks)."""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash
+                if entry.get("op") == "put":
+                    self.pending[entry["id"]] = {
+                        "payload": entry["payload"],
+                        "queued_at": entry.get("at", time.time()),
+                        "attempts": 0,
+                    }
+                elif entry.get("op") == "ack":
+                    self.pending.pop(entry["id"], None)
+        if self.pending:
+            print(f"📬 Outbox {self.kind}: {len(self.pending)} unsent items replayed from journal")
+
+    def _append(self, entry):
+        self.journal.write(json.dumps(entry) + "\n")
+        self.journal.flush()
+
+    def put(self, payload):
+        """Queue a payload for sending. Returns its idempotency key."""
+        item_id = uuid.uuid4().hex
+        now = time.time()
+        with self.cond:
+            self._append({"op": "put", "id": item_id, "at": now, "payload": payload})
+            self.pending[item_id] = {"payload": payload, "queued_at": now, "attempts": 0}
+            self.cond.notify()
+        return item_id
+
+    def _ack(self, item_ids):
+        with self.cond:
+            for item_id in item_ids:
+                if self.pending.pop(item_id, None) is not None:
+                    self._append({"op": "ack", "id": item_id})
+            if not self.pending and self.journal.tell() > COMPACT_BYTES:
+                self.journal.close()
+                self.journal = open(self.journal_path, 'w', encoding='utf-8')
+
+    def _bury(self, item_id, error):
+        """Move an item that keeps failing (or was rejected) to the dead-letter file."""
+        item = self.pending.get(item_id)
+        if item is None:
+            return
+        with open(self.dead_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"id": item_id, "error": str(error), "payload": item["payload"]}) + "\n")
+        self.dead += 1
+        print(f"☠️ Outbox {self.kind}: giving up on {item_id} after {item['attempts']} attempts ({error})")
+        self._ack([item_id])
+
+    def _post(self, path, body, key):
+        started = time.perf_counter()
+        res = self.session.post(f"{self.backend_url}{path}", json=body, timeout=REQUEST_TIMEOUT,
+                                headers={"Idempotency-Key": key})
+        elapsed = (time.perf_counter() - started) * 1000
+        self.last_send_ms = elapsed
+        self.total_send_ms += elapsed
+        self.send_count += 1
+        return res
+
+    def _send(self, batch):
+        """
+        Send a batch. Returns (delivered ids, {rejected id: error}).
+        Raises on transport errors and 5xx batch replies so the sender backs off.
+        """
+        items = [dict(item["payload"], idempotency_key=item_id) for item_id, item in batch]
+
+        if self.batch_supported and len(items) > 1:
+            res = self._post(f"/api/{self.kind}/batch", {"items": items}, items[0]["idempotency_key"])
+            if res.status_code == 404:
+                print(f"⚠️ Backend has no /api/{self.kind}/batch, sending items one by one")
+                self.batch_supported = False
+            elif res.status_code in (200, 201):
+                delivered, rejected = [], {}
+                for entry in res.json().get("results", []):
+                    if entry.get("ok"):
+                        delivered.append(entry.get("idempotency_key"))
+                    else:
+                        rejected[entry.get("idempotency_key")] = entry.get("error")
+                        print(f"❌ Outbox {self.kind}: item rejected | {entry.get('error')}")
+                return delivered, rejected
+            elif not is_rejection(res.status_code):
+                raise RuntimeError(f"Status: {res.status_code} | {res.text[:200]}")
+            # Batch rejected as a whole: send one by one so only the bad items are dead-lettered
+
+        delivered, rejected = [], {}
+        for item in items:
+            res = self._post(f"/api/{self.kind}", item, item["idempotency_key"])
+            if res.status_code in (200, 201):
+                delivered.append(item["idempotency_key"])
+            elif is_rejection(res.status_code):
+                rejected[item["idempotency_key"]] = f"Status: {res.status_code} | {res.text[:200]}"
+                print(f"❌ Outbox {self.kind}: item rejected | Status: {res.status_code} | {res.text[:200]}")
+            else:
+                print(f"❌ Outbox {self.kind}: failed to insert | Status: {res.status_code} | {res.text[:200]}")
+        return delivered, rejected
+
+    def _run(self):
+        backoff = BACKOFF_START
+        while True:
+            with self.cond:
+                while not self.pending and not self.stopped:
+                    self.cond.wait()
+                if self.stopped and not self.pending:
+                    return
+                batch = list(self.pending.items())[:BATCH_SIZE]
+
+            try:
+                delivered, rejected = self._send(batch)
+                delivered = set(delivered)
+            except Exception as e:
+                delivered, rejected = set(), {}
+                print(f"❌ Outbox {self.kind}: send failed ({e}), retrying in {backoff}s")
+
+            if rejected:
+                with self.cond:
+                    for item_id, error in rejected.items():
+                        self._bury(item_id, f"rejected: {error}")
+
+            if delivered:
+                self.last_queue_delay = time.time() - min(item["queued_at"] for _, item in batch)
+                self._ack(delivered)
+                self.sent += len(delivered)
+                print(f"✅ Outbox {self.kind}: delivered {len(delivered)} item(s) "
+                      f"in {self.last_send_ms:.0f} ms (queue depth {len(self.pending)})")
+
+            # Only transport / server failures back off; rejects never slow the queue
+            failed = [(item_id, item) for item_id, item in batch
+                      if item_id not in delivered and item_id not in rejected]
+            if not failed:
+                backoff = BACKOFF_START
+                continue
+
+            self.failed_attempts += 1
+            with self.cond:
+                for item_id, item in failed:
+                    item["attempts"] += 1
+                    if item["attempts"] >= MAX_ATTEMPTS:
+                        self._bury(item_id, "max attempts reached")
+                if self.stopped:
+                    return
+                # Jittered exponential backoff; stop() wakes us early
+                self.cond.wait(backoff * random.uniform(0.8, 1.2))
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    def start(self):
+        """Start the background sender (idempotent)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped = False
+            self.thread = threading.Thread(target=self._run, name=f"outbox-{self.kind}", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Stop the sender, giving it up to timeout seconds to flush. Unsent items stay journaled."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def stats(self):
+        """Queue depth and send latency for logging."""
+        with self.cond:
+            depth = len(self.pending)
+            oldest = min((item["queued_at"] for item in self.pending.values()), default=None)
+        return {
+            "queue_depth": depth,
+            "oldest_age_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "sent": self.sent,
+            "failed_attempts": self.failed_attempts,
+            "dead": self.dead,
+            "last_send_ms": round(self.last_send_ms, 1),
+            "avg_send_ms": round(self.total_send_ms / self.send_count, 1) if self.send_count else 0.0,
+            "last_queue_delay_s": round(self.last_queue_delay, 2),
+        }
+
+
+def format_stats(outbox):
+    """One-line summary of an outbox's stats."""
+    s = outbox.stats()
+    return (f"📬 Outbox {outbox.kind}: depth={s['queue_depth']} oldest={s['oldest_age_s']}s "
+            f"sent={s['sent']} dead={s['dead']} send={s['last_send_ms']}ms (avg {s['avg_send_ms']}ms)")
@@ -2,42 +2,61 @@
 Pattern Matcher - Watches race data and results, creates Excel with highlighted winners
 
 This script:
-1. Watches races.csv and race_results.csv for changes
+1. Watches the race store (races.db, see race_store.py) for changes
+   (or races.csv and race_results.csv with DATA_SOURCE = "csv"); bursts of
+   changes are coalesced into one rebuild on a background worker
+   (rebuild_scheduler.py), always including one after the last change
 2. When new results are found, matches winners to race data by horse name
-3. Creates/updates an Excel file with race data and highlighted winners
+3. Creates/updates an Excel file with race data and highlighted winners,
+   covering the last LIVE_WINDOW_HOURS; each closed day is written once to
+   its own workbook in ARCHIVE_DIR
+4. Reports near-duplicates of each new race (at least
+   NEAR_DUPLICATE_MIN_SHARED runner pairs in common, race_similarity.py;
+   store only)
 
 The matching is done by finding the horse name from OCR results in the race data.
 OCR results have combined name+jockey, so we extract just the horse name for matching.
 
 Requirements:
-    pip install openpyxl watchdog
+    pip install openpyxl watchdog numpy
 """
 
-import os
-import csv
 import time
 import re
-from datetime import datetime
+from bisect import insort
+from datetime import date, datetime
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+
+from race_lexicon import RaceLexicon
+from race_store import DB_FILE
+from race_feed import StoreFeed, CsvFeed
+from reconcile import ResultIndex, capture_seconds, timestamp_seconds, uk_seconds, FALLBACK_MINUTES
+from excel_export import SheetModel, POSITION_COLORS
+from race_signature import SignatureIndex, race_signature, row_runners
+from race_similarity import SimilarityIndex
+from rebuild_scheduler import RebuildScheduler
 
 
 # Configuration
+# "store" - read races and results from the SQLite store written by both scrapers
+# "csv"   - read the legacy races.csv / race_results.csv (e.g. a race_store.py export)
+DATA_SOURCE = "store"
 RACES_CSV = Path(__file__).parent / "races.csv"
 RESULTS_CSV = Path(__file__).parent / "race_results.csv"
 OUTPUT_EXCEL = Path(__file__).parent / "race_analysis.xlsx"
 
-# Highlight colors for positions
-POSITION_COLORS = {
-    1: PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid"),  # Gold for 1st
-    2: PatternFill(start_color="C0C0C0", end_color="C0C0C0", fill_type="solid"),  # Silver for 2nd
-    3: PatternFill(start_color="CD7F32", end_color="CD7F32", fill_type="solid"),  # Bronze for 3rd
-    4: PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid"),  # Light green for 4th
-}
+# OUTPUT_EXCEL only holds races scraped this many hours before the newest race
+LIVE_WINDOW_HOURS = 48
+
+# Closed days are written once to ARCHIVE_DIR/race_analysis_YYYY-MM-DD.xlsx and never rewritten
+ARCHIVE_DIR = Path(__file__).parent / "archive"
+# A day closes this many hours after midnight (newest race time), leaving room for late results
+ARCHIVE_GRACE_HOURS = 2
+
+# New races sharing at least this many horse:jockey pairs with a stored race are reported (None disables)
+NEAR_DUPLICATE_MIN_SHARED = 10
 
 
 def normalize_name(name):
@@ -49,14 +68,21 @@ def normalize_name(name):
     return ' '.join(name.upper().split())
 
 
-def extract_horse_name_from_ocr(ocr_text):
+def extract_horse_name_from_ocr(ocr_text, lexicon=None):
     """
     Extract horse name from OCR text which contains name + jockey combined.
-    Horse names are typically UPPERCASE, jockey names are mixed case.
+    With a lexicon (race_lexicon.RaceLexicon for the race), the text is
+    snapped to the closest runner on the card. Otherwise the name is guessed:
+    horse names are typically UPPERCASE, jockey names are mixed case.
     """
     if not ocr_text:
         return ""
     
+    if lexicon is not None:
+        match = lexicon.match_horse(ocr_text)
+        if match:
+            return normalize_name(match[1])
+    
     # Split into words
     words = ocr_text.split()
     
@@ -75,30 +101,35 @@ def extract_horse_name_from_ocr(ocr_text):
     return ' '.join(horse_words)
 
 
+_feed = None
+
+
+def get_feed():
+    """Incremental reader for DATA_SOURCE, created on first use (see race_feed.py)."""
+    global _feed
+    if _feed is None:
+        _feed = StoreFeed(DB_FILE) if DATA_SOURCE == "store" else CsvFeed(RACES_CSV, RESULTS_CSV)
+    return _feed
+
+
 def load_races():
-    """Load race data from races.csv."""
-    if not RACES_CSV.exists():
-        return []
-    
-    races = []
-    with open(RACES_CSV, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            races.append(row)
-    return races
+    """
+    Race data in the races.csv row shape (from the store, or races.csv).
+    Rows are kept between calls; only races added or updated since are read.
+    """
+    feed = get_feed()
+    feed.update()
+    return feed.races
 
 
 def load_results():
-    """Load race results from race_results.csv."""
-    if not RESULTS_CSV.exists():
-        return []
-    
-    results = []
-    with open(RESULTS_CSV, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            results.append(row)
-    return results
+    """
+    Race results in the race_results.csv row shape (from the store, or race_results.csv).
+    Rows are kept between calls; only results added since are read.
+    """
+    feed = get_feed()
+    feed.update()
+    return feed.results
 
 
 def extract_date_from_scraped_at(scraped_at):
@@ -123,58 +154,21 @@ def extract_date_from_scraped_at(scraped_at):
 def get_results_for_race(race_row, all_results):
     """
     Get results that belong to a specific race.
-    Uses video_race_time from results and race_time_uk from race for matching.
-    Also checks that both are from the same date (race times repeat every 24h).
+    all_results is a reconcile.ResultIndex (or a list of result rows, indexed on the spot).
     
     Matching logic:
-    1. Same date (from scraped_at)
-    2. video_race_time == race_time_uk
+    1. video_race_time == race_time_uk
+    2. Without a video_race_time: captured 0-3 minutes after race_time_uk
+       (the local IST capture stamp converted to UK time)
+    3. Captured between RESULT_EARLY before and RESULT_LAG after the race was
+       scraped (race times repeat every 24h), which also holds across midnight
     """
-    race_time_uk = race_row.get('race_time_uk', '')
-    if not race_time_uk:
-        return []
-    
-    # Get date from race data
-    race_date = extract_date_from_scraped_at(race_row.get('scraped_at', ''))
-    
-    # Find all results that match this race time AND date
-    matching_results = []
-    for result in all_results:
-        # First check: same date
-        result_date = extract_date_from_scraped_at(result.get('scraped_at', ''))
-        if race_date and result_date and race_date != result_date:
-            continue  # Different days, skip
-        
-        # Second check: matching time
-        video_time = result.get('video_race_time', '')
-        
-        if video_time:
-            # Direct match: video_race_time should equal race_time_uk
-            if video_time == race_time_uk:
-                matching_results.append(result)
-        else:
-            # Fallback: use timestamp-based matching
-            result_time = result.get('race_time', '')
-            if '_' in result_time:
-                try:
-                    time_part = result_time.split('_')[1]
-                    result_hour = time_part[0:2]
-                    result_min = time_part[2:4]
-                    
-                    race_parts = race_time_uk.split(':')
-                    if len(race_parts) == 2:
-                        race_minutes = int(race_parts[0]) * 60 + int(race_parts[1])
-                        result_minutes = int(result_hour) * 60 + int(result_min)
-                        
-                        if 0 <= result_minutes - race_minutes <= 3:
-                            matching_results.append(result)
-                except:
-                    pass
-    
-    return matching_results
+    if not isinstance(all_results, ResultIndex):
+        all_results = ResultIndex(all_results)
+    return all_results.for_race(race_row)
 
 
-def match_winners_to_race(race_row, all_results):
+def match_winners_to_race(race_row, all_results, results=None):
     """
     Match race results to runners in a race.
     Uses horse_number from results to directly map to runner in race.
@@ -182,13 +176,19 @@ def match_winners_to_race(race_row, all_results):
     Matching logic:
     - horse_number in results (e.g., 1, 5, 3) matches to name_1, name_5, name_3 in races.csv
     - This is more reliable than name matching since OCR can garble names
+    - If the number is not on the card, the OCR'd name is snapped to the
+      card instead (race_lexicon)
+    
+    results are the race's own results when already reconciled
+    (ResultIndex.reconcile), else they are looked up in all_results.
     
     Returns a dict mapping runner number to position (1st, 2nd, 3rd, 4th).
     """
     winner_positions = {}
     
     # Get results specific to this race (by time)
-    results = get_results_for_race(race_row, all_results)
+    if results is None:
+        results = get_results_for_race(race_row, all_results)
     
     if not results:
         return winner_positions
@@ -201,6 +201,8 @@ def match_winners_to_race(race_row, all_results):
             if race_row.get(key):  # Only if name is not empty
                 valid_runner_nums.add(runner_num)
     
+    lexicon = None
+    
     # Match by horse_number directly
     for result in results:
         position = int(result.get('position', 0))
@@ -213,6 +215,14 @@ def match_winners_to_race(race_row, all_results):
         # If horse_number exists in race, that's our match!
         if horse_number and horse_number in valid_runner_nums:
             winner_positions[horse_number] = position
+            continue
+        
+        # Number misread: fall back to the name
+        if lexicon is None:
+            lexicon = RaceLexicon.from_race_row(race_row)
+        match = lexicon.match_horse(result.get('raw_text', ''))
+        if match and match[0] not in winner_positions:
+            winner_positions[match[0]] = position
     
     return winner_positions
 
@@ -220,175 +230,311 @@ def match_winners_to_race(race_row, all_results):
 def get_race_signature(race_row):
     """
     Generate a unique signature for a race based on horses and jockeys.
-    Signature includes: horse name + jockey name (sorted alphabetically).
+    Signature includes: horse name + jockey name (sorted alphabetically),
+    normalised exactly like the backend's createRaceSignature().
     Ignores runner numbers and odds - same horses with same jockeys = duplicate.
     """
-    # Collect all horse:jockey pairs
-    runner_pairs = []
-    for i in range(1, 20):  # Max 20 runners
-        name = race_row.get(f'name_{i}', '')
-        jockey = race_row.get(f'jockey_{i}', '')
-        if name:  # Only if runner exists
-            runner_pairs.append(f"{name}:{jockey}")
-    
-    # Sort alphabetically so order doesn't matter, then join
-    return "|".join(sorted(runner_pairs))
+    return race_signature(row_runners(race_row))
 
 
-def create_excel_with_highlights():
-    """Create Excel file with race data and highlighted winners."""
-    races = load_races()
-    results = load_results()
-    
-    if not races:
-        print("No race data found in races.csv")
-        return
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Race Analysis"
-    
-    # Get original headers from first race
-    original_headers = list(races[0].keys())
-    
-    # Build new headers: date first, then original, then duplicate detection columns
-    headers = ['date'] + original_headers + ['duplicate_count', 'last_seen']
-    
-    # Pre-compute race signatures and track duplicates
-    race_signatures = {}  # signature -> list of (date_time, row_idx)
-    for idx, race in enumerate(races):
-        sig = get_race_signature(race)
-        race_date = extract_date_from_scraped_at(race.get('scraped_at', ''))
-        race_time = race.get('race_time', '')  # Get race_time for display
-        date_time = f"{race_date} {race_time}" if race_date and race_time else race_date
-        if sig not in race_signatures:
-            race_signatures[sig] = []
-        race_signatures[sig].append((date_time, idx))
-    
-    # Write headers with styling
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center')
-    
-    # Write race data
-    for row_idx, race in enumerate(races, 2):
-        # Match winners for this race
-        winner_positions = match_winners_to_race(race, results)
+def race_key(race_row):
+    """Identity of a race across matcher runs: scraped date + IST race time."""
+    return f"{extract_date_from_scraped_at(race_row.get('scraped_at', ''))}|{race_row.get('race_time', '')}"
+
+
+class RaceAnalysis:
+    """
+    Rendered race_analysis.xlsx rows, kept between watchdog events.
+    Only rows touched by new results, new races (and their duplicates) or
+    odds updates are re-rendered; the sheet is then streamed to disk.
+    """
+
+    def __init__(self):
+        self.races = None
+        self.results = None
+        self.result_index = ResultIndex()
+        self.sheet = None
+        self.signatures = SignatureIndex()  # digest -> occurrences; digests persist across runs
+        self.row_keys = []  # (signature digest, race_time_uk) per rendered race
+        self.previous = []  # row index of the previous race with the same signature, or None
+        self.time_rows = {}  # race_time_uk -> [row indexes]
+        self.row_seconds = []  # scraped_at per race (reconcile.timestamp_seconds)
+        self.day_rows = {}  # race date -> [row indexes]
+        self.latest = None  # newest scraped_at seen
+        self.archived = set()
+
+    def _reset(self, races, results, headers):
+        self.races = races
+        self.results = results
+        self.result_index = ResultIndex()
+        self.sheet = SheetModel(headers)
+        self.signatures.reset()
+        self.row_keys = []
+        self.previous = []
+        self.time_rows = {}
+        self.row_seconds = []
+        self.day_rows = {}
+        self.latest = None
+
+    def _register(self, idx):
+        """Index race idx by signature and time. Returns the rows sharing its signature."""
+        race = self.races[idx]
+        appended = idx == len(self.row_keys)
+        digest = self.signatures.digest_for(race_key(race), race, refresh=not appended)
+        key = (digest, race.get('race_time_uk', ''))
+        
+        if appended:
+            # Streaming pass: races arrive in order, so the previous occurrence is the last one so far
+            earlier = self.signatures.rows(digest)
+            self.previous.append(earlier[-1] if earlier else None)
+            occurrences = self.signatures.add(digest, idx)
+            self.row_keys.append(key)
+            self.time_rows.setdefault(key[1], []).append(idx)
+            seconds = timestamp_seconds(race.get('scraped_at', ''))
+            self.row_seconds.append(seconds)
+            if seconds is not None and (self.latest is None or seconds > self.latest):
+                self.latest = seconds
+            self.day_rows.setdefault(extract_date_from_scraped_at(race.get('scraped_at', '')), []).append(idx)
+            return occurrences
         
-        # Get race date and signature for duplicate detection
+        # Updated race (its runners may have changed): relink both signature chains
+        old_digest, old_time = self.row_keys[idx]
+        if old_time != key[1]:
+            self.time_rows[old_time].remove(idx)
+            self.time_rows.setdefault(key[1], []).append(idx)
+        if old_digest != digest:
+            self._relink(self.signatures.remove(old_digest, idx))
+            occurrences = self.signatures.occurrences.setdefault(digest, [])
+            insort(occurrences, idx)
+            self._relink(occurrences)
+        self.row_keys[idx] = key
+        return self.signatures.rows(digest)
+
+    def _relink(self, occurrences):
+        """Recompute previous-occurrence links along one signature's rows."""
+        for position, row in enumerate(occurrences):
+            self.previous[row] = occurrences[position - 1] if position else None
+
+    def _result_times(self, results):
+        """race_time_uk values a batch of new results can belong to."""
+        times = set()
+        for result in results:
+            video_time = result.get('video_race_time', '')
+            if video_time:
+                times.add(video_time)
+                continue
+            # Fallback matches: captured 0-3 minutes after the start; the
+            # capture stamp is local (IST) time, race_time_uk UK time
+            seconds = capture_seconds(result.get('race_time') or '')
+            if seconds is not None:
+                minutes = uk_seconds(seconds) // 60 % 1440
+                for back in range(FALLBACK_MINUTES + 1):
+                    start = (minutes - back) % 1440
+                    times.add(f"{start // 60:02d}:{start % 60:02d}")
+        return times
+
+    def render_row(self, idx, results=None):
+        """Cells (value, style) for race idx; results as match_winners_to_race()."""
+        race = self.races[idx]
+        winner_positions = match_winners_to_race(race, self.result_index, results)
         race_date = extract_date_from_scraped_at(race.get('scraped_at', ''))
-        signature = get_race_signature(race)
         
-        # Find duplicate info
-        sig_occurrences = race_signatures.get(signature, [])
-        duplicate_count = len(sig_occurrences)
+        # Duplicate info: every race with the same runners, and the last one before this
+        duplicate_count = len(self.signatures.rows(self.row_keys[idx][0]))
+        last_seen = ""
+        if self.previous[idx] is not None:
+            previous = self.races[self.previous[idx]]
+            previous_date = extract_date_from_scraped_at(previous.get('scraped_at', ''))
+            previous_time = previous.get('race_time', '')
+            last_seen = f"{previous_date} {previous_time}" if previous_date and previous_time else previous_date
+        
+        cells = [(race_date, None)]
+        for header in self.sheet.headers[1:-2]:
+            value = race.get(header, '')
+            # Highlight winners in the name columns
+            if header.startswith('name_'):
+                position = winner_positions.get(header.split('_')[1])
+                if position in POSITION_COLORS:
+                    cells.append((f"{value} (#{position})", f"place_{position}"))
+                    continue
+            cells.append((value, None))
+        cells.append((duplicate_count, None))
+        cells.append((last_seen, None))
+        return cells
+
+    def update(self, races, results, headers, updated=()):
+        """Re-render what changed since the last update. Returns the number of rows rendered."""
+        headers = ['date'] + list(headers) + ['duplicate_count', 'last_seen']
+        if (self.sheet is None or races is not self.races or results is not self.results
+                or headers != self.sheet.headers or len(results) < self.result_index.count):
+            self._reset(races, results, headers)
         
-        # Find last occurrence before this one (shows date + race_time)
-        current_idx = row_idx - 2  # Convert back to 0-based index
-        earlier_times = [dt for dt, i in sig_occurrences if i < current_idx]
-        last_seen = earlier_times[-1] if earlier_times else ""
+        dirty = set()
+        new_results = results[self.result_index.count:]
+        if new_results:
+            self.result_index.add(new_results)
+            for race_time in self._result_times(new_results):
+                dirty.update(self.time_rows.get(race_time, ()))
         
-        col_idx = 1
+        for idx in updated:
+            if idx < len(self.row_keys):
+                dirty.update(self.signatures.rows(self.row_keys[idx][0]))
+                dirty.update(self._register(idx))
         
-        # Write date column first
-        cell = ws.cell(row=row_idx, column=col_idx, value=race_date)
-        col_idx += 1
+        for idx in range(len(self.row_keys), len(races)):
+            # A new duplicate changes duplicate_count on every earlier occurrence
+            dirty.update(self._register(idx))
         
-        # Write original data
-        for header in original_headers:
-            value = race.get(header, '')
-            cell = ws.cell(row=row_idx, column=col_idx, value=value)
-            
-            # Check if this is a name column and if runner is a winner
-            if header.startswith('name_'):
-                runner_num = header.split('_')[1]
-                if runner_num in winner_positions:
-                    position = winner_positions[runner_num]
-                    if position in POSITION_COLORS:
-                        cell.fill = POSITION_COLORS[position]
-                        cell.font = Font(bold=True)
-                        cell.value = f"{value} (#{position})"
-            col_idx += 1
+        self.signatures.save()
         
-        # Write duplicate detection columns
-        ws.cell(row=row_idx, column=col_idx, value=duplicate_count)
-        col_idx += 1
-        ws.cell(row=row_idx, column=col_idx, value=last_seen)
-    
-    # Auto-fit columns
-    for col in range(1, len(headers) + 1):
-        max_length = 0
-        column_letter = get_column_letter(col)
-        for row in range(1, len(races) + 2):
-            cell = ws.cell(row=row, column=col)
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 30)
-        ws.column_dimensions[column_letter].width = adjusted_width
+        # Match every dirty race in one merge join (all of them on a cold start)
+        rows = sorted(dirty)
+        for idx, results in zip(rows, self.result_index.reconcile([self.races[idx] for idx in rows])):
+            self.sheet.set_row(idx, self.render_row(idx, results))
+        return len(rows)
+
+    def live_rows(self, hours=LIVE_WINDOW_HOURS):
+        """Indexes of races scraped within `hours` of the newest race (walks back from the end)."""
+        if self.latest is None:
+            return list(range(len(self.row_seconds)))
+        cutoff = self.latest - hours * 3600
+        start = len(self.row_seconds)
+        while start > 0 and (self.row_seconds[start - 1] is None or self.row_seconds[start - 1] >= cutoff):
+            start -= 1
+        return list(range(start, len(self.row_seconds)))
+
+    def closed_days(self, grace_hours=ARCHIVE_GRACE_HOURS):
+        """Race dates that ended more than grace_hours before the newest race and are not archived yet."""
+        if self.latest is None:
+            return []
+        open_day = date.fromordinal((self.latest - grace_hours * 3600) // 86400).isoformat()
+        return sorted(day for day in self.day_rows if day and day < open_day and day not in self.archived)
+
+    def write_archives(self, archive_dir=ARCHIVE_DIR):
+        """Write each newly closed day to its own workbook, once. Returns [(path, race count)] written."""
+        written = []
+        for day in self.closed_days():
+            path = Path(archive_dir) / f"race_analysis_{day}.xlsx"
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self.sheet.save(path, self.day_rows[day])
+                written.append((path, len(self.day_rows[day])))
+            self.archived.add(day)
+        return written
+
+
+_analysis = None
+_reported_races = None
+
+
+def report_near_duplicates(feed):
+    """Print near-duplicates of races appended since the last call (the initial load is skipped)."""
+    global _reported_races
+    if NEAR_DUPLICATE_MIN_SHARED is None or not isinstance(feed, StoreFeed) or feed.store is None:
+        return
+    if _reported_races is None or _reported_races > len(feed.race_ids):
+        _reported_races = len(feed.race_ids)
+        return
+    index = SimilarityIndex(feed.store)
+    for race_id in feed.race_ids[_reported_races:]:
+        matches = index.similar_to_race(race_id, NEAR_DUPLICATE_MIN_SHARED)
+        if matches:
+            race = feed.races[feed.positions[race_id]]
+            print(f"🔁 Race {race.get('race_time')} resembles {len(matches)} earlier race(s):")
+            for match in matches[:5]:
+                print(f"   {match['scraped_at']} {match['race_time']} - {match['shared']} runners in common")
+    _reported_races = len(feed.race_ids)
+
+
+def create_excel_with_highlights():
+    """Create Excel file with race data and highlighted winners."""
+    global _analysis
+    races = load_races()
+    results = load_results()
     
-    # Add legend
-    legend_row = len(races) + 4
-    ws.cell(row=legend_row, column=1, value="Legend:").font = Font(bold=True)
-    ws.cell(row=legend_row + 1, column=1, value="1st Place").fill = POSITION_COLORS[1]
-    ws.cell(row=legend_row + 2, column=1, value="2nd Place").fill = POSITION_COLORS[2]
-    ws.cell(row=legend_row + 3, column=1, value="3rd Place").fill = POSITION_COLORS[3]
-    ws.cell(row=legend_row + 4, column=1, value="4th Place").fill = POSITION_COLORS[4]
+    if not races:
+        print(f"No race data found in {DB_FILE.name if DATA_SOURCE == 'store' else RACES_CSV.name}")
+        return
     
-    # Save workbook
-    wb.save(OUTPUT_EXCEL)
-    print(f"✅ Excel file updated: {OUTPUT_EXCEL}")
+    if _analysis is None:
+        _analysis = RaceAnalysis()
+    started = time.perf_counter()
+    # Original headers: races.csv column order over every race read so far
+    rendered = _analysis.update(races, results, get_feed().race_columns, get_feed().pop_updated())
+    render_ms = (time.perf_counter() - started) * 1000
+    
+    # Stream the live window (write-only mode, named styles)
+    sheet = _analysis.sheet
+    sheet.save(OUTPUT_EXCEL, _analysis.live_rows())
+    stats = sheet.stats()
+    print(f"✅ Excel file updated: {OUTPUT_EXCEL} ({stats['saved_rows']} races in the last {LIVE_WINDOW_HOURS}h)")
     print(f"   Races: {len(races)}, Results matched: {len(results)}")
+    print(f"   Rows rendered: {rendered}/{len(races)} in {render_ms:.0f} ms, "
+          f"save {stats['save_ms']:.0f} ms, peak memory {stats['peak_mb']} MB")
+    
+    for path, count in _analysis.write_archives():
+        print(f"🗄️ Archived {path.name} ({count} races)")
+
+    report_near_duplicates(get_feed())
+
+
+# What each watched file's changes mean, for the rebuild log line
+CHANGE_MESSAGES = {
+    "store": "🏇 Race store updated",
+    "results": "🏇 New results detected",
+    "races": "🏁 New race detected",
+}
+
+
+def rebuild(reasons):
+    """Scheduler work: one Excel rebuild for every change coalesced since the last one."""
+    messages = ", ".join(CHANGE_MESSAGES[reason] for reason in CHANGE_MESSAGES if reason in reasons)
+    print(f"\n{messages} at {datetime.now().strftime('%H:%M:%S')}")
+    create_excel_with_highlights()
 
 
 class ResultsFileHandler(FileSystemEventHandler):
-    """Handler for file system events on race_results.csv and races.csv."""
+    """
+    Handler for file system events on the race store (or race_results.csv and
+    races.csv). Only notifies the scheduler, so the observer thread never waits
+    on a rebuild and no event is dropped.
+    """
     
-    def __init__(self):
-        self.last_update = 0
-        self.debounce_seconds = 2
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
     
     def on_modified(self, event):
+        # In WAL mode commits land in races.db-wal; races.db only changes on checkpoint
+        if DATA_SOURCE == "store" and event.src_path.endswith((DB_FILE.name, f"{DB_FILE.name}-wal")):
+            self.scheduler.notify("store")
         # Watch both results and races files
-        if event.src_path.endswith('race_results.csv'):
-            current_time = time.time()
-            if current_time - self.last_update > self.debounce_seconds:
-                self.last_update = current_time
-                print(f"\n🏇 New results detected at {datetime.now().strftime('%H:%M:%S')}")
-                create_excel_with_highlights()
+        elif event.src_path.endswith('race_results.csv'):
+            self.scheduler.notify("results")
         elif event.src_path.endswith('races.csv'):
-            current_time = time.time()
-            if current_time - self.last_update > self.debounce_seconds:
-                self.last_update = current_time
-                print(f"\n🏁 New race detected at {datetime.now().strftime('%H:%M:%S')}")
-                create_excel_with_highlights()
+            self.scheduler.notify("races")
 
 
 def watch_for_results():
-    """Watch for changes to race_results.csv and races.csv, update Excel."""
+    """Watch for changes to the race store (or race_results.csv and races.csv), update Excel."""
     print("=" * 60)
     print("Pattern Matcher - Watching for race data...")
     print("=" * 60)
-    print(f"Watching: {RACES_CSV}")
-    print(f"Watching: {RESULTS_CSV}")
+    if DATA_SOURCE == "store":
+        print(f"Watching: {DB_FILE}")
+    else:
+        print(f"Watching: {RACES_CSV}")
+        print(f"Watching: {RESULTS_CSV}")
     print(f"Output:   {OUTPUT_EXCEL}")
     print("\nPress Ctrl+C to stop\n")
     
     # Create initial Excel if races exist
-    if RACES_CSV.exists():
+    if (DB_FILE if DATA_SOURCE == "store" else RACES_CSV).exists():
         print("Creating initial Excel file...")
         create_excel_with_highlights()
     
-    # Setup file watcher
-    event_handler = ResultsFileHandler()
+    # Setup file watcher; rebuilds run on the scheduler's worker, one at a time
+    scheduler = RebuildScheduler(rebuild, name="excel-rebuild", verbose=True).start()
+    event_handler = ResultsFileHandler(scheduler)
     observer = Observer()
     observer.schedule(event_handler, str(Path(__file__).parent), recursive=False)
     observer.start()
@@ -401,6 +547,7 @@ def watch_for_results():
         observer.stop()
     
     observer.join()
+    scheduler.stop()
     print("Pattern matcher stopped.")
 
 
@@ -0,0 +1,188 @@
+"""
+Race Feed - Incremental reads of races and results for pattern_matcher.py
+
+Re-reading every race and result on each change makes an update cost
+O(history). The feeds here keep the parsed rows in memory and only read
+what was added since the last update:
+1. CsvTail remembers the byte offset, file identity (device, inode) and
+   header line of a CSV; it parses only the complete lines appended since,
+   and reloads from scratch when the file was replaced, truncated or its
+   header rewritten
+2. StoreFeed asks the race store for races whose version moved (new races
+   and odds updates) and results past the last row id
+3. CsvFeed pairs two CsvTails for races.csv / race_results.csv
+
+Both feeds expose .races, .results and .race_columns in the old CSV shapes.
+The lists are extended in place; a reload replaces them with new lists.
+"""
+
+import io
+import os
+import csv
+from pathlib import Path
+
+from race_store import RaceStore, race_columns
+
+
+class CsvTail:
+    """Rows of one append-only CSV, parsed incrementally."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.rows = []
+        self.fieldnames = []
+        self.identity = None
+        self.offset = 0
+        self.header = b""
+
+        # Stats
+        self.reloads = 0
+        self.appended = 0
+
+    def _reset(self):
+        self.rows = []
+        self.fieldnames = []
+        self.offset = 0
+        self.header = b""
+
+    def _rewritten(self, f, size):
+        """True if the file no longer continues what was read (truncated or header changed)."""
+        if size < self.offset:
+            return True
+        if self.header:
+            f.seek(0)
+            return f.read(len(self.header)) != self.header
+        return False
+
+    def update(self):
+        """Parse rows appended since the last call. Returns the new rows."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._reset()
+            self.identity = None
+            return []
+
+        with open(self.path, 'rb') as f:
+            identity = (stat.st_dev, stat.st_ino)
+            if identity != self.identity or self._rewritten(f, stat.st_size):
+                if self.identity is not None:
+                    self.reloads += 1
+                self._reset()
+                self.identity = identity
+            if stat.st_size <= self.offset:
+                return []
+            f.seek(self.offset)
+            chunk = f.read(stat.st_size - self.offset)
+
+        # Only complete lines; a half-written row is picked up next time
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return []
+        chunk = chunk[:end + 1]
+        self.offset += len(chunk)
+
+        if not self.fieldnames:
+            header_end = chunk.find(b"\n") + 1
+            self.header, chunk = chunk[:header_end], chunk[header_end:]
+            self.fieldnames = next(csv.reader([self.header.decode('utf-8-sig')]), [])
+
+        new_rows = list(csv.DictReader(io.StringIO(chunk.decode('utf-8'), newline=''), fieldnames=self.fieldnames))
+        self.rows.extend(new_rows)
+        self.appended += len(new_rows)
+        return new_rows
+
+
+class CsvFeed:
+    """races.csv and race_results.csv, tailed."""
+
+    def __init__(self, races_csv, results_csv):
+        self.race_tail = CsvTail(races_csv)
+        self.result_tail = CsvTail(results_csv)
+
+    def update(self):
+        """Read what was appended. Returns (new or changed races, new results)."""
+        return len(self.race_tail.update()), len(self.result_tail.update())
+
+    @property
+    def races(self):
+        return self.race_tail.rows
+
+    @property
+    def results(self):
+        return self.result_tail.rows
+
+    @property
+    def race_columns(self):
+        return self.race_tail.fieldnames
+
+    def pop_updated(self):
+        """CSV rows are only ever appended."""
+        return set()
+
+    def stats(self):
+        return {"races": len(self.races), "results": len(self.results),
+                "reloads": self.race_tail.reloads + self.result_tail.reloads}
+
+
+class StoreFeed:
+    """Races and results from the race store, read by version / row id cursors."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.store = None
+        self.identity = None
+        self._reset()
+        self.reloads = 0
+
+    def _reset(self):
+        self.races = []
+        self.positions = {}  # race id -> index in self.races
+        self.race_ids = []  # index in self.races -> race id
+        self.updated = set()  # indexes of races updated in place since pop_updated()
+        self.results = []
+        self.race_version = -1
+        self.result_id = 0
+        self.race_columns = race_columns([])
+
+    def update(self):
+        """Read what was added or updated. Returns (new or changed races, new results)."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return 0, 0
+
+        identity = (stat.st_dev, stat.st_ino)
+        if identity != self.identity:
+            if self.store is not None:
+                self.store.close()
+                self.reloads += 1
+            self._reset()
+            self.store = RaceStore(self.path)
+            self.identity = identity
+
+        changed, self.race_version = self.store.races_since(self.race_version)
+        for race_id, row in changed.items():
+            position = self.positions.get(race_id)
+            if position is None:
+                self.positions[race_id] = len(self.races)
+                self.races.append(row)
+                self.race_ids.append(race_id)
+            else:
+                self.races[position] = row
+                self.updated.add(position)
+        new_results, self.result_id = self.store.results_since(self.result_id)
+        self.results.extend(new_results)
+        if changed:
+            columns = race_columns(changed.values())
+            if len(columns) > len(self.race_columns):
+                self.race_columns = columns
+        return len(changed), len(new_results)
+
+    def pop_updated(self):
+        """Indexes of races updated in place (odds moves) since the last call."""
+        updated, self.updated = self.updated, set()
+        return updated
+
+    def stats(self):
+        return {"races": len(self.races), "results": len(self.results), "reloads": self.reloads}
@@ -0,0 +1,328 @@
+"""
+Race Lexicon - Snaps OCR'd result names to the runners on the race card
+
+When a results screen appears the runners are already known: scraper.py
+scraped the card minutes earlier. This module:
+1. Lets scraper.py publish each card to race_cards.json (falling back to
+   the runners of the latest races in the race store when it is missing)
+2. Builds a per-race trigram index of horse and jockey names and snaps an
+   OCR'd name to the closest runner (bounded edit distance on the few
+   trigram candidates)
+3. Cross-checks the snapped runner against the OCR'd horse_number and
+   reports when number and name disagree
+4. Writes the names of the upcoming races to race_words.txt, which is
+   passed to tesseract as --user-words
+
+Cards are keyed by race_time_uk (see race_schedule for the time convention).
+"""
+
+import os
+import json
+import re
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from race_store import RaceStore, DB_FILE, store_mtime
+
+
+# Configuration
+CARDS_FILE = Path(__file__).parent / "race_cards.json"
+USER_WORDS_FILE = Path(__file__).parent / "race_words.txt"
+
+# Cards kept in race_cards.json
+MAX_CARDS = 50
+
+# Minimum similarity (1 - edit distance / length) for a name to be snapped
+MIN_SIMILARITY = 0.6
+# Similarity at which the name overrides a conflicting OCR'd horse_number
+STRONG_SIMILARITY = 0.8
+
+# Candidates (by shared trigrams) checked with the full edit distance
+MAX_CANDIDATES = 4
+
+
+def normalize(name):
+    """Uppercase, letters/digits/spaces only, single-spaced (as pattern_matcher.normalize_name)."""
+    return ' '.join(re.sub(r'[^A-Za-z0-9\s]', '', name or '').upper().split())
+
+
+def trigrams(text):
+    """Set of padded character trigrams of a normalized name."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early and returns limit + 1 once it is exceeded."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class LexiconIndex:
+    """Trigram index over a small set of names, each tagged with a runner number."""
+
+    def __init__(self, entries):
+        """entries: iterable of (name, runner_number)."""
+        self.names = {}  # normalized name -> runner number
+        self.spelling = {}  # normalized name -> name as on the card
+        self.postings = defaultdict(set)  # trigram -> names
+        for name, number in entries:
+            key = normalize(name)
+            if key:
+                self.names[key] = str(number)
+                self.spelling[key] = name.strip()
+                for gram in trigrams(key):
+                    self.postings[gram].add(key)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, text):
+        """
+        Closest name to text.
+        Returns (card name, runner_number, similarity) or None if nothing reaches MIN_SIMILARITY.
+        """
+        query = normalize(text)
+        if not query or not self.names:
+            return None
+        if query in self.names:
+            return self.spelling[query], self.names[query], 1.0
+
+        shared = defaultdict(int)
+        for gram in trigrams(query):
+            for name in self.postings.get(gram, ()):
+                shared[name] += 1
+        candidates = sorted(shared, key=lambda n: -shared[n])[:MAX_CANDIDATES]
+
+        best = None
+        for name in candidates:
+            length = max(len(name), len(query))
+            limit = int(length * (1 - MIN_SIMILARITY))
+            distance = edit_distance(query, name, limit)
+            if distance > limit:
+                continue
+            similarity = 1 - distance / length
+            if best is None or similarity > best[2]:
+                best = (self.spelling[name], self.names[name], similarity)
+        return best
+
+
+class RaceLexicon:
+    """Horse and jockey indexes for one race card."""
+
+    def __init__(self, runners):
+        """runners: [{number, name, jockey}] as scraped by scraper.py."""
+        self.runners = {str(r["number"]): r for r in runners if r.get("name")}
+        self.horses = LexiconIndex((r["name"], n) for n, r in self.runners.items())
+        self.jockeys = LexiconIndex((r.get("jockey", ""), n) for n, r in self.runners.items())
+
+    @classmethod
+    def from_race_row(cls, row):
+        """Build from a races.csv row (name_N / jockey_N columns)."""
+        runners = []
+        for key, value in row.items():
+            if key.startswith('name_') and value:
+                number = key.split('_', 1)[1]
+                runners.append({"number": number, "name": value, "jockey": row.get(f'jockey_{number}', '')})
+        return cls(runners)
+
+    def words(self):
+        """Every word of every horse and jockey name."""
+        words = set()
+        for runner in self.runners.values():
+            words.update(normalize(runner["name"]).split())
+            words.update(normalize(runner.get("jockey", "")).split())
+        return words
+
+    def match_horse(self, text):
+        """
+        Snap OCR'd text (horse name, or horse + jockey run together) to a runner.
+        Leading word spans are tried so the jockey's words can trail the horse's.
+        Returns (runner_number, horse, similarity, remainder) or None.
+        """
+        words = normalize(text).split()
+        best = None
+        for end in range(len(words), 0, -1):
+            found = self.horses.lookup(' '.join(words[:end]))
+            if found and (best is None or found[2] > best[2]):
+                best = (found[1], found[0], found[2], ' '.join(words[end:]))
+                if found[2] == 1.0:
+                    break
+        return best
+
+    def correct(self, result):
+        """
+        Snap one parsed result to the card and cross-check its horse_number.
+        Adds horse/jockey (card spelling) and a "lexicon" dict with the
+        similarity, the card's number and whether it agrees with the OCR'd one.
+        A strong name match overrides a conflicting or unknown number; the
+        OCR'd number is kept as ocr_horse_number. Returns the corrected copy.
+        """
+        result = dict(result)
+        number = str(result.get("horse_number", "")).strip()
+
+        if result.get("horse"):
+            match = self.match_horse(result["horse"])
+            jockey_text = result.get("jockey", "")
+        else:
+            match = self.match_horse(result.get("raw_text", ""))
+            jockey_text = match[3] if match else ""
+
+        if not match:
+            result["lexicon"] = {"similarity": 0.0, "card_number": None,
+                                 "number_agrees": number in self.runners}
+            return result
+
+        card_number, horse, similarity, _ = match
+        jockey = self.jockeys.lookup(jockey_text) if jockey_text else None
+        jockey_agrees = jockey is not None and jockey[1] == card_number
+
+        result["horse"] = horse
+        if jockey_agrees:
+            result["jockey"] = jockey[0]
+        result["lexicon"] = {
+            "similarity": round(similarity, 3),
+            "card_number": card_number,
+            "number_agrees": card_number == number,
+            "jockey_agrees": jockey_agrees,
+        }
+        if card_number != number and (similarity >= STRONG_SIMILARITY or jockey_agrees or number not in self.runners):
+            result["ocr_horse_number"] = number
+            result["horse_number"] = card_number
+        return result
+
+    def correct_results(self, results):
+        """
+        Correct a parsed result list.
+        Returns (results, mismatches): mismatches lists the positions where
+        the OCR'd number and the snapped name disagreed.
+        """
+        corrected = [self.correct(r) for r in results]
+        return corrected, find_mismatches(corrected)
+
+
+def find_mismatches(results):
+    """Positions of corrected results whose OCR'd number disagreed with the snapped name."""
+    return [
+        {"position": r.get("position"), "ocr_number": r.get("ocr_horse_number", r.get("horse_number")),
+         "card_number": r["lexicon"]["card_number"], "horse": r.get("horse")}
+        for r in results
+        if r.get("lexicon", {}).get("card_number") and not r["lexicon"]["number_agrees"]
+    ]
+
+
+def write_race_card(race_time_uk, runners, path=CARDS_FILE):
+    """Publish a race card ({number, name, jockey} runners); written atomically."""
+    cards = _read_cards(path)
+    cards.pop(race_time_uk, None)
+    cards[race_time_uk] = [{"number": str(r.get("number", "")), "name": r.get("name", ""),
+                            "jockey": r.get("jockey", "")} for r in runners]
+    for stale in list(cards)[:-MAX_CARDS]:
+        del cards[stale]
+
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"updated_at": time.time(), "cards": cards}, f)
+    os.replace(tmp, path)
+
+
+def _read_cards(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("cards", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def load_race_cards(cards_file=CARDS_FILE, store_file=DB_FILE, store_rows=200):
+    """
+    Race cards as {race_time_uk: [runners]}.
+    Reads race_cards.json, else the last store_rows races in the race store.
+    """
+    cards = _read_cards(cards_file) if Path(cards_file).exists() else {}
+    if not cards and Path(store_file).exists():
+        store = RaceStore(store_file)
+        try:
+            cards = store.recent_cards(store_rows)
+        finally:
+            store.close()
+    return cards
+
+
+def user_words_config(path=USER_WORDS_FILE):
+    """tesseract config passing the race-card words as --user-words (empty if none yet)."""
+    return f"--user-words {path}" if Path(path).exists() else ""
+
+
+class RaceCards:
+    """Lexicons for recently published race cards, reloaded when the source changes."""
+
+    def __init__(self, cards_file=CARDS_FILE, store_file=DB_FILE, user_words=USER_WORDS_FILE):
+        self.cards_file = Path(cards_file)
+        self.store_file = Path(store_file)
+        self.user_words = Path(user_words) if user_words else None
+        self.lexicons = {}
+        self.mtime = None
+
+        # Stats
+        self.lines = 0
+        self.correct_ms = 0.0
+        self.mismatches = 0
+
+        self.refresh()
+
+    def refresh(self):
+        """Reload the cards (and rewrite the user-words file) if their source changed."""
+        if self.cards_file.exists():
+            mtime = self.cards_file.stat().st_mtime
+        else:
+            mtime = store_mtime(self.store_file)
+        if mtime is None or mtime == self.mtime:
+            return
+        self.mtime = mtime
+        self.lexicons = {t: RaceLexicon(r) for t, r in load_race_cards(self.cards_file, self.store_file).items()}
+
+        if self.user_words and self.lexicons:
+            words = set()
+            for lexicon in list(self.lexicons.values())[-10:]:
+                words |= lexicon.words()
+            tmp = Path(f"{self.user_words}.tmp")
+            tmp.write_text("\n".join(sorted(words)) + "\n", encoding='utf-8')
+            os.replace(tmp, self.user_words)
+
+    def get(self, race_time_uk):
+        """Lexicon for a race, or None if its card is unknown."""
+        self.refresh()
+        return self.lexicons.get(race_time_uk)
+
+    def correct_results(self, race_time_uk, results):
+        """Correct results against the race's card; unchanged (and no mismatches) if it is unknown."""
+        lexicon = self.get(race_time_uk)
+        if lexicon is None:
+            return results, []
+        started = time.perf_counter()
+        corrected, mismatches = lexicon.correct_results(results)
+        self.correct_ms += (time.perf_counter() - started) * 1000
+        self.lines += len(results)
+        self.mismatches += len(mismatches)
+        return corrected, mismatches
+
+    def stats(self):
+        return {
+            "cards": len(self.lexicons),
+            "lines": self.lines,
+            "mismatches": self.mismatches,
+            "ms_per_line": round(self.correct_ms / self.lines, 3) if self.lines else 0.0,
+        }
@@ -0,0 +1,192 @@
+"""
+Race Schedule - Schedule-aware capture timing for the results scraper
+
+scraper.py already knows when every upcoming race starts (the race tabs).
+This module:
+1. Lets scraper.py publish those start times to race_schedule.json
+   (falling back to race_time_uk of the latest races in the race store)
+2. Tells selenium_scraper.py how long to wait before the next frame:
+   slow mid-race, a burst every BURST_INTERVAL seconds around each
+   expected results window, and the fixed interval when no schedule is known
+3. Names the race whose results window a frame falls in, which replaces
+   the "previous + 2 minutes" guess when the OCR'd race time is unreadable
+
+Race time convention, shared by every module: the race tabs show IST
+(race_time); race_time_uk, the schedule, the race cards and the results
+overlay on the stream are UK wall-clock time (Europe/London: GMT in winter,
+BST in summer). ist_to_uk() converts between them by time zone, never by a
+fixed offset.
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from race_store import RaceStore, DB_FILE, store_mtime
+
+
+# Race tabs show IST; race_time_uk is UK wall-clock time
+IST = ZoneInfo("Asia/Kolkata")
+UK = ZoneInfo("Europe/London")
+
+# Configuration
+SCHEDULE_FILE = Path(__file__).parent / "race_schedule.json"
+
+# Results are expected this many seconds after the scheduled start
+RESULT_WINDOW = (40, 150)
+
+# Capture interval inside a results window (seconds)
+BURST_INTERVAL = 2
+# Longest wait between frames outside a results window (seconds)
+SLOW_INTERVAL = 20
+
+# Ignore a schedule that has no race within this many seconds of now
+SCHEDULE_HORIZON = 15 * 60
+
+DAY = 24 * 60 * 60
+
+
+def write_schedule(race_times_uk, path=SCHEDULE_FILE):
+    """Publish upcoming race start times (UK HH:MM); written atomically."""
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"updated_at": time.time(), "race_times_uk": sorted(set(race_times_uk))}, f)
+    os.replace(tmp, path)
+
+
+def _seconds_of_day(hhmm):
+    """'14:05' -> 50700, or None if unparseable."""
+    try:
+        hours, minutes = hhmm.strip().split(':')
+        return int(hours) * 3600 + int(minutes) * 60
+    except (ValueError, AttributeError):
+        return None
+
+
+def _format(seconds):
+    seconds %= DAY
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+def _offset(now, start):
+    """Seconds since start, wrapped across midnight into [-12h, 12h)."""
+    return (now - start + DAY // 2) % DAY - DAY // 2
+
+
+def ist_to_uk(hhmm, timestamp=None):
+    """
+    UK HH:MM for an IST HH:MM race tab time, taken on the IST day of
+    timestamp (now by default) so the UK offset is that day's GMT/BST one.
+    Anything that is not HH:MM is returned unchanged.
+    """
+    seconds = _seconds_of_day(hhmm)
+    if seconds is None or seconds >= DAY:
+        return hhmm
+    day = datetime.fromtimestamp(timestamp if timestamp is not None else time.time(), IST)
+    moment = day.replace(hour=seconds // 3600, minute=seconds % 3600 // 60, second=0, microsecond=0)
+    return moment.astimezone(UK).strftime("%H:%M")
+
+
+def now_uk_seconds(timestamp=None):
+    """Seconds of day on the race_time_uk clock for a time.time() value."""
+    moment = datetime.fromtimestamp(timestamp if timestamp is not None else time.time(), UK)
+    return moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+def load_schedule(schedule_file=SCHEDULE_FILE, store_file=DB_FILE, store_rows=200):
+    """
+    Scheduled start times as seconds of day.
+    Reads race_schedule.json, else race_time_uk of the last store_rows races in the store.
+    """
+    times = []
+    if Path(schedule_file).exists():
+        try:
+            with open(schedule_file, 'r', encoding='utf-8') as f:
+                times = json.load(f).get("race_times_uk", [])
+        except (OSError, ValueError):
+            times = []
+
+    if not times and Path(store_file).exists():
+        store = RaceStore(store_file)
+        try:
+            times = list(store.recent_cards(store_rows))
+        finally:
+            store.close()
+
+    return sorted({s for s in (_seconds_of_day(t) for t in times) if s is not None})
+
+
+class CaptureScheduler:
+    """Picks the next capture interval from the race schedule."""
+
+    def __init__(self, default_interval, schedule_file=SCHEDULE_FILE, store_file=DB_FILE):
+        self.default_interval = default_interval
+        self.schedule_file = Path(schedule_file)
+        self.store_file = Path(store_file)
+        self.starts = []
+        self.done = set()  # start times whose results were captured
+        self.mtime = None
+        self.refresh()
+
+    def refresh(self):
+        """Reload the schedule if its source file changed."""
+        if self.schedule_file.exists():
+            mtime = self.schedule_file.stat().st_mtime
+        else:
+            mtime = store_mtime(self.store_file)
+        if mtime is None:
+            return
+        if mtime != self.mtime:
+            self.mtime = mtime
+            self.starts = load_schedule(self.schedule_file, self.store_file)
+
+    def has_schedule(self, now=None):
+        """
+        True if some scheduled race is within SCHEDULE_HORIZON of now. Reloads a
+        changed schedule first, so schedule mode comes back once the file (or
+        the store) is written again after being missing or stale.
+        """
+        self.refresh()
+        now = now_uk_seconds(now)
+        return any(abs(_offset(now, start)) <= SCHEDULE_HORIZON for start in self.starts)
+
+    def next_interval(self, now=None):
+        """Seconds to wait before the next frame, and why."""
+        now_s = now_uk_seconds(now)
+        if not self.has_schedule(now):
+            return self.default_interval, "no schedule"
+
+        # Forget finished races once their window has passed (times repeat daily)
+        self.done = {start for start in self.done if _offset(now_s, start) <= RESULT_WINDOW[1]}
+
+        wait = None
+        for start in self.starts:
+            if start in self.done:
+                continue
+            offset = _offset(now_s, start)
+            if RESULT_WINDOW[0] <= offset <= RESULT_WINDOW[1]:
+                return BURST_INTERVAL, f"results window for {_format(start)}"
+            if offset < RESULT_WINDOW[0]:
+                until = RESULT_WINDOW[0] - offset
+                wait = until if wait is None else min(wait, until)
+
+        if wait is None:
+            return SLOW_INTERVAL, "mid-race"
+        return max(BURST_INTERVAL, min(SLOW_INTERVAL, wait)), "mid-race"
+
+    def expected_race(self, timestamp=None):
+        """Race time (UK HH:MM) whose results window contains timestamp, or ""."""
+        now_s = now_uk_seconds(timestamp)
+        for start in self.starts:
+            if RESULT_WINDOW[0] <= _offset(now_s, start) <= RESULT_WINDOW[1]:
+                return _format(start)
+        return ""
+
+    def mark_done(self, race_time_uk):
+        """Stop bursting for a race once its results are in."""
+        start = _seconds_of_day(race_time_uk)
+        if start is not None:
+            self.done.add(start)
@@ -0,0 +1,148 @@
+"""
+Race Signature - Duplicate-race detection shared with the backend
+
+A race repeats when the same horses run with the same jockeys, whatever
+their numbers and odds. This module:
+1. Builds the signature exactly like createRaceSignature() in
+   backend/src/utils/signature.js (uppercase, drop everything but A-Z, 0-9
+   and whitespace, trim, collapse whitespace; "HORSE:JOCKEY" pairs for
+   runners with a horse name, sorted, joined with "|"), using JavaScript's
+   definition of whitespace
+2. Reduces it to a 64-bit digest (signed, so it fits an SQLite INTEGER)
+3. Keeps SignatureIndex: digest -> occurrences in race order, so a new
+   race's duplicate count and previous occurrence are O(1) lookups.
+   Rows from the race store carry the signature it stored with the race,
+   which is always current. For CSV rows the digest is persisted in
+   signature_index.db together with a cheap fingerprint of the row's raw
+   runner fields, and reused by the next matcher run only while that
+   fingerprint still matches (a race rewritten while the matcher was
+   stopped is recomputed)
+"""
+
+import re
+import sqlite3
+import hashlib
+from pathlib import Path
+
+
+# Configuration
+INDEX_FILE = Path(__file__).parent / "signature_index.db"
+
+# JavaScript's \s (and String.prototype.trim) - not the same set as Python's str.isspace
+_JS_SPACE = " \t\n\v\f\r\u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+_STRIP = re.compile(f"[^A-Z0-9{_JS_SPACE}]")
+_TRIM = re.compile(f"^[{_JS_SPACE}]+|[{_JS_SPACE}]+$")
+_SPACES = re.compile(f"[{_JS_SPACE}]+")
+
+
+def normalize(text):
+    """Port of normalize() in backend/src/utils/signature.js."""
+    if not text:
+        return ""
+    text = _STRIP.sub("", text.upper())
+    return _SPACES.sub(" ", _TRIM.sub("", text))
+
+
+def race_signature(runners):
+    """Port of createRaceSignature(): runners are dicts with name and jockey."""
+    pairs = []
+    for runner in runners:
+        horse = normalize(runner.get("name"))
+        if horse:
+            pairs.append(f"{horse}:{normalize(runner.get('jockey'))}")
+    # Pairs are ASCII after normalize(), so this sorts like Array.prototype.sort
+    return "|".join(sorted(pairs))
+
+
+def row_runners(race_row):
+    """Runners of a races.csv-shaped row (name_N / jockey_N columns)."""
+    return [{"name": value, "jockey": race_row.get(f"jockey_{key[5:]}", "")}
+            for key, value in race_row.items() if key.startswith("name_") and value]
+
+
+def signature_digest(signature):
+    """64-bit digest of a signature, as a signed integer."""
+    return int.from_bytes(hashlib.blake2b(signature.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def row_fingerprint(race_row):
+    """64-bit hash of a row's raw name_N / jockey_N values (no normalisation), as a signed integer."""
+    raw = "\x1f".join(f"{key}={value}" for key, value in race_row.items()
+                      if key.startswith(("name_", "jockey_")))
+    return signature_digest(raw)
+
+
+class SignatureIndex:
+    """
+    Occurrences of each signature digest in race order, plus a persisted
+    race key -> (digest, row fingerprint) table so unchanged races need no
+    signature rebuild.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.occurrences = {}  # digest -> [row indexes], ascending
+        self.conn = None
+        self.known = {}  # race key -> (digest, row fingerprint), from earlier runs
+        self._unsaved = {}
+        if path:
+            self.conn = sqlite3.connect(str(path))
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS signature_index "
+                "(race_key TEXT PRIMARY KEY, digest INTEGER NOT NULL, fingerprint INTEGER)")
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(signature_index)")}
+            if "fingerprint" not in columns:
+                # Digests saved without a fingerprint can't be checked: they are recomputed once
+                self.conn.execute("ALTER TABLE signature_index ADD COLUMN fingerprint INTEGER")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_signature_digest ON signature_index (digest)")
+            self.known = {race_key: (digest, fingerprint) for race_key, digest, fingerprint in
+                          self.conn.execute("SELECT race_key, digest, fingerprint FROM signature_index")}
+
+    def reset(self):
+        """Forget the in-memory occurrences (the persisted digests stay)."""
+        self.occurrences = {}
+
+    def digest_for(self, race_key, race_row, refresh=False):
+        """
+        Digest of a race. A race store row's own "signature" is used as is;
+        otherwise the persisted digest, unless refresh (its runners changed)
+        or the row no longer matches the fingerprint saved with it.
+        """
+        signature = race_row.get("signature")
+        if signature is not None:
+            return signature_digest(signature)
+
+        fingerprint = row_fingerprint(race_row)
+        known = None if refresh else self.known.get(race_key)
+        if known is not None and known[1] == fingerprint:
+            return known[0]
+        digest = signature_digest(race_signature(row_runners(race_row)))
+        if self.known.get(race_key) != (digest, fingerprint):
+            self.known[race_key] = (digest, fingerprint)
+            self._unsaved[race_key] = (digest, fingerprint)
+        return digest
+
+    def add(self, digest, idx):
+        """Record an occurrence (idx after every earlier one). Returns the digest's occurrence list."""
+        rows = self.occurrences.setdefault(digest, [])
+        rows.append(idx)
+        return rows
+
+    def remove(self, digest, idx):
+        rows = self.occurrences.get(digest, [])
+        if idx in rows:
+            rows.remove(idx)
+        return rows
+
+    def rows(self, digest):
+        return self.occurrences.get(digest, [])
+
+    def save(self):
+        """Persist digests computed since the last save."""
+        if self.conn is None or not self._unsaved:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO signature_index (race_key, digest, fingerprint) VALUES (?, ?, ?)",
+                [(race_key, digest, fingerprint) for race_key, (digest, fingerprint) in self._unsaved.items()])
+        self._unsaved = {}
@@ -0,0 +1,241 @@
+"""
+Race Similarity - Near-duplicate races by MinHash/LSH over horse:jockey pairs
+
+An exact signature only matches when the whole field repeats. The virtual
+race generator mostly reuses a field with one or two substitutions, so this
+module finds races sharing at least k runner pairs with a given one:
+1. Each race is the set of its normalised "HORSE:JOCKEY" pairs (the same
+   normalisation as race_signature.py / the backend)
+2. NUM_PERM MinHash values per race (vectorised multiply-shift hashing), cut into
+   BANDS bands of ROWS values; each band is hashed to a 64-bit key
+3. RaceStore.save_race() writes the band keys to the race_lsh table as
+   scraper.py ingests races, so the index is always current and nothing
+   is rebuilt on start-up
+4. A query looks up the races sharing any band key (indexed), then keeps
+   those whose exact shared pair count is >= k, so there are no false
+   positives. The banding is tuned to the default k = MIN_SHARED = 10 of
+   ~12 runners (Jaccard ~0.7): with 16 bands of 4 rows such a race is found
+   with probability ~0.99, while unrelated races (Jaccard ~0.1) collide
+   with probability ~0.002, so a query verifies few candidates however
+   long the history. Smaller k still works but with lower recall (~0.6 at
+   Jaccard 0.5, ~0.25 at 0.4); measure it with "recall"
+5. The banding parameters are stored with the keys; keys written with other
+   parameters are rebuilt the first time a SimilarityIndex opens the store
+
+Usage:
+    python race_similarity.py backfill                        # index races stored before this existed
+    python race_similarity.py similar <race_id> [min_shared]  # near-duplicates of a stored race
+    python race_similarity.py recall [min_shared] [samples]   # LSH recall against a brute-force scan
+
+Requirements:
+    pip install numpy
+"""
+
+import sys
+import time
+import hashlib
+
+import numpy as np
+
+from race_signature import normalize
+
+
+# MinHash length and LSH banding (NUM_PERM = BANDS * ROWS). Changing any of
+# these, or SEED, invalidates the stored band keys (rebuilt automatically).
+NUM_PERM = 64
+BANDS = 16
+ROWS = 4
+SEED = 20240601
+LSH_PARAMS = f"minhash-ms64/{NUM_PERM}/{BANDS}x{ROWS}/{SEED}"
+
+# Default "near-duplicate": at least this many runner pairs in common
+MIN_SHARED = 10
+
+# Multiply-shift hashing: (a * x + b) mod 2^64 (uint64 arithmetic wraps), top 32 bits.
+# a must be odd; a small a without the wrap-around would keep every permutation
+# in the order of x, so all NUM_PERM minimums would land on the same pair.
+_SHIFT = np.uint64(32)
+_rng = np.random.default_rng(SEED)
+_A = (_rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1))[:, None]
+_B = _rng.integers(0, 1 << 63, size=NUM_PERM, dtype=np.uint64)[:, None] * np.uint64(2)
+
+
+def runner_pairs(runners):
+    """Set of normalised "HORSE:JOCKEY" pairs for runners with a horse name."""
+    pairs = set()
+    for runner in runners:
+        horse = normalize(runner.get("name"))
+        if horse:
+            pairs.add(f"{horse}:{normalize(runner.get('jockey'))}")
+    return pairs
+
+
+def minhash(pairs):
+    """NUM_PERM MinHash values (uint64) of a pair set, or None for an empty set."""
+    if not pairs:
+        return None
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(p.encode("utf-8"), digest_size=8).digest(), "big") for p in pairs),
+        dtype=np.uint64, count=len(pairs))
+    with np.errstate(over="ignore"):
+        return ((_A * hashes[None, :] + _B) >> _SHIFT).min(axis=1)
+
+
+def band_keys(signature):
+    """One signed 64-bit key per band (band number included, so bands never collide)."""
+    if signature is None:
+        return []
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS:(band + 1) * ROWS].tobytes() + band.to_bytes(2, "big")
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True))
+    return keys
+
+
+def race_band_keys(runners):
+    """Band keys for a race card."""
+    return band_keys(minhash(runner_pairs(runners)))
+
+
+class SimilarityIndex:
+    """Near-duplicate queries over the race_lsh table of a RaceStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.conn = store.conn
+        self._check_params()
+
+    def _check_params(self):
+        """Rebuild the band keys if they were written with other LSH parameters."""
+        row = self.conn.execute("SELECT params FROM race_lsh_params WHERE id = 1").fetchone()
+        if row is not None and row["params"] == LSH_PARAMS:
+            return
+        if row is not None or self.conn.execute("SELECT 1 FROM race_lsh LIMIT 1").fetchone():
+            print(f"🔁 LSH parameters changed ({row['params'] if row else 'unknown'} -> {LSH_PARAMS}), "
+                  f"rebuilding band keys...")
+            print(f"   Indexed {self.backfill(rebuild=True)} races")
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO race_lsh_params (id, params) VALUES (1, ?)", (LSH_PARAMS,))
+
+    def _race_pairs(self, race_ids):
+        """{race id: pair set} for the given races."""
+        pairs = {race_id: set() for race_id in race_ids}
+        ids = list(race_ids)
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            for row in self.conn.execute(
+                    f"SELECT race_id, name, jockey FROM runners WHERE race_id IN ({','.join('?' * len(chunk))})",
+                    chunk):
+                horse = normalize(row["name"])
+                if horse:
+                    pairs[row["race_id"]].add(f"{horse}:{normalize(row['jockey'])}")
+        return pairs
+
+    def similar(self, runners, min_shared=MIN_SHARED, exclude=()):
+        """
+        Stored races sharing >= min_shared runner pairs with runners, most
+        shared first: [{race_id, shared, race_time, race_time_uk, scraped_at}].
+        """
+        pairs = runner_pairs(runners)
+        keys = band_keys(minhash(pairs))
+        if not keys or len(pairs) < min_shared:
+            return []
+
+        candidates = {row[0] for row in self.conn.execute(
+            f"SELECT DISTINCT race_id FROM race_lsh WHERE band_key IN ({','.join('?' * len(keys))})", keys)}
+        candidates.difference_update(exclude)
+        matches = []
+        for race_id, other in self._race_pairs(candidates).items():
+            shared = len(pairs & other)
+            if shared >= min_shared:
+                matches.append((race_id, shared))
+        return self._describe(matches)
+
+    def similar_to_race(self, race_id, min_shared=MIN_SHARED):
+        """Near-duplicates of a stored race (excluding itself)."""
+        runners = [{"name": row["name"], "jockey": row["jockey"]} for row in self.conn.execute(
+            "SELECT name, jockey FROM runners WHERE race_id = ?", (race_id,))]
+        return self.similar(runners, min_shared, exclude=(race_id,))
+
+    def brute_force(self, race_id, min_shared=MIN_SHARED):
+        """Same answer as similar_to_race() by scanning every race (for measuring LSH recall)."""
+        all_pairs = self._race_pairs([row[0] for row in self.conn.execute("SELECT id FROM races")])
+        pairs = all_pairs.pop(race_id, set())
+        shared = ((other_id, len(pairs & other)) for other_id, other in all_pairs.items())
+        return self._describe([(other_id, count) for other_id, count in shared if count >= min_shared])
+
+    def _describe(self, matches):
+        if not matches:
+            return []
+        shared = dict(matches)
+        ids = list(shared)
+        rows = []
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            rows.extend(self.conn.execute(
+                f"SELECT id, race_time, race_time_uk, scraped_at FROM races WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk))
+        found = [{"race_id": row["id"], "shared": shared[row["id"]], "race_time": row["race_time"],
+                  "race_time_uk": row["race_time_uk"], "scraped_at": row["scraped_at"]} for row in rows]
+        found.sort(key=lambda match: (-match["shared"], match["race_id"]))
+        return found
+
+    def backfill(self, rebuild=False):
+        """Write band keys for races that have none (or for every race with rebuild). Returns races indexed."""
+        if rebuild:
+            with self.conn:
+                self.conn.execute("DELETE FROM race_lsh")
+        missing = [row[0] for row in self.conn.execute(
+            "SELECT id FROM races WHERE id NOT IN (SELECT DISTINCT race_id FROM race_lsh)")]
+        for start in range(0, len(missing), 900):
+            chunk = self._race_pairs(missing[start:start + 900])
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO race_lsh (band_key, race_id) VALUES (?, ?)",
+                    [(key, race_id) for race_id, pairs in chunk.items() for key in band_keys(minhash(pairs))])
+        return len(missing)
+
+
+def recall(index, min_shared=MIN_SHARED, samples=50):
+    """Share of brute-force near-duplicates the LSH query also finds, over sample races."""
+    ids = [row[0] for row in index.conn.execute("SELECT id FROM races ORDER BY RANDOM() LIMIT ?", (samples,))]
+    expected = found = 0
+    query_ms = 0.0
+    for race_id in ids:
+        truth = {m["race_id"] for m in index.brute_force(race_id, min_shared)}
+        started = time.perf_counter()
+        got = {m["race_id"] for m in index.similar_to_race(race_id, min_shared)}
+        query_ms += (time.perf_counter() - started) * 1000
+        expected += len(truth)
+        found += len(truth & got)
+    print(f"{len(ids)} races, {expected} near-duplicates (>= {min_shared} shared pairs) by brute force")
+    print(f"LSH found {found} ({found / expected:.1%})" if expected else "LSH found none to compare")
+    print(f"Average query: {query_ms / max(len(ids), 1):.1f} ms")
+
+
+if __name__ == "__main__":
+    from race_store import RaceStore
+
+    commands = ("backfill", "similar", "recall")
+    if len(sys.argv) < 2 or sys.argv[1] not in commands or (sys.argv[1] == "similar" and len(sys.argv) < 3):
+        print("Usage: python race_similarity.py backfill [--rebuild]")
+        print("       python race_similarity.py similar <race_id> [min_shared]")
+        print("       python race_similarity.py recall [min_shared] [samples]")
+        sys.exit(1)
+
+    store = RaceStore()
+    index = SimilarityIndex(store)
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "backfill":
+        print(f"Indexed {index.backfill(rebuild='--rebuild' in args)} races")
+    elif command == "similar":
+        started = time.perf_counter()
+        matches = index.similar_to_race(int(args[0]), int(args[1]) if len(args) > 1 else MIN_SHARED)
+        elapsed = (time.perf_counter() - started) * 1000
+        for match in matches:
+            print(f"  race {match['race_id']:>6}  {match['scraped_at']}  {match['race_time']} "
+                  f"(UK {match['race_time_uk']})  {match['shared']} shared")
+        print(f"{len(matches)} near-duplicates in {elapsed:.1f} ms")
+    elif command == "recall":
+        recall(index, int(args[0]) if args else MIN_SHARED, int(args[1]) if len(args) > 1 else 50)
+    store.close()
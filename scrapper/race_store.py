@@ -0,0 +1,395 @@
+"""
+Race Store - Local SQLite store shared by the three scripts
+
+Replaces the races.csv / race_results.csv hand-off:
+1. scraper.py writes each race card (races + runners tables), upserting
+   the runners when odds move; selenium_scraper.py appends results
+2. pattern_matcher.py reads races back in the old races.csv row shape
+   (race_time, race_time_uk, runner_count, scraped_at, name_N, jockey_N,
+   odds_N) and results in the race_results.csv shape, plus the horse,
+   jockey and odds the layout parser read for each position
+3. The database runs in WAL mode, so the readers never block the writers
+   across processes; races are indexed on (race_date, race_time_uk) and on
+   signature (the backend's createRaceSignature format, race_signature.py),
+   results on (result_date, video_race_time)
+4. Each race's MinHash/LSH band keys go to race_lsh as it is saved, for
+   near-duplicate queries (race_similarity.py)
+5. FORECAST/TRICAST dividends shown with a capture's results go to
+   result_dividends, keyed like the results by scraped_at
+
+Import existing CSVs, or export on demand:
+    python race_store.py import [races.csv] [race_results.csv]
+    python race_store.py export-csv <dir>
+    python race_store.py export-xlsx <file.xlsx>
+    python race_store.py stats
+
+Requirements:
+    pip install numpy
+    pip install openpyxl   (export-xlsx only)
+"""
+
+import sys
+import csv
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from race_signature import race_signature
+from race_similarity import race_band_keys, LSH_PARAMS
+
+
+# Configuration
+DB_FILE = Path(__file__).parent / "races.db"
+RACES_CSV = Path(__file__).parent / "races.csv"
+RESULTS_CSV = Path(__file__).parent / "race_results.csv"
+
+# Seconds a writer waits for another process's lock before failing
+BUSY_TIMEOUT = 10
+
+RACE_COLUMNS = ["race_time", "race_time_uk", "runner_count", "scraped_at"]
+RESULT_COLUMNS = ["race_time", "video_race_time", "position", "horse_number", "raw_text", "full_line", "scraped_at",
+                  "horse", "jockey", "odds", "ocr_horse_number"]
+# Result columns added after the first release: (name, SQL type), migrated by ALTER TABLE
+RESULT_DETAIL_COLUMNS = [("horse", "TEXT NOT NULL DEFAULT ''"), ("jockey", "TEXT NOT NULL DEFAULT ''"),
+                         ("odds", "TEXT NOT NULL DEFAULT ''"), ("ocr_horse_number", "TEXT NOT NULL DEFAULT ''")]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    id INTEGER PRIMARY KEY,
+    race_date TEXT NOT NULL,
+    race_time TEXT NOT NULL,
+    race_time_uk TEXT NOT NULL,
+    runner_count INTEGER NOT NULL DEFAULT 0,
+    scraped_at TEXT NOT NULL,
+    signature TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (race_date, race_time)
+);
+CREATE INDEX IF NOT EXISTS idx_races_date_time_uk ON races (race_date, race_time_uk);
+CREATE INDEX IF NOT EXISTS idx_races_signature ON races (signature);
+
+CREATE TABLE IF NOT EXISTS runners (
+    race_id INTEGER NOT NULL REFERENCES races (id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    jockey TEXT NOT NULL DEFAULT '',
+    odds TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (race_id, number)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    race_time TEXT NOT NULL DEFAULT '',
+    video_race_time TEXT NOT NULL DEFAULT '',
+    result_date TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    horse_number TEXT NOT NULL DEFAULT '',
+    raw_text TEXT NOT NULL DEFAULT '',
+    full_line TEXT NOT NULL DEFAULT '',
+    scraped_at TEXT NOT NULL,
+    confidence REAL,
+    horse TEXT NOT NULL DEFAULT '',
+    jockey TEXT NOT NULL DEFAULT '',
+    odds TEXT NOT NULL DEFAULT '',
+    ocr_horse_number TEXT NOT NULL DEFAULT '',
+    UNIQUE (scraped_at, position)
+);
+CREATE INDEX IF NOT EXISTS idx_results_date_time ON results (result_date, video_race_time);
+
+CREATE TABLE IF NOT EXISTS result_dividends (
+    scraped_at TEXT NOT NULL,
+    video_race_time TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    combination TEXT NOT NULL DEFAULT '',
+    dividend TEXT NOT NULL DEFAULT '',
+    confidence REAL,
+    PRIMARY KEY (scraped_at, kind)
+);
+
+-- MinHash/LSH band keys per race (race_similarity.py)
+CREATE TABLE IF NOT EXISTS race_lsh (
+    band_key INTEGER NOT NULL,
+    race_id INTEGER NOT NULL REFERENCES races (id) ON DELETE CASCADE,
+    PRIMARY KEY (band_key, race_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_race_lsh_race ON race_lsh (race_id);
+CREATE TABLE IF NOT EXISTS race_lsh_params (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    params TEXT NOT NULL
+);
+"""
+
+
+def _date_of(scraped_at):
+    """YYYY-MM-DD from "2025-12-13 21:00:00" or "2025-12-13T21:00:00.123"."""
+    return (scraped_at or "").replace("T", " ").split(" ")[0]
+
+
+def _runner_number(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def race_columns(rows):
+    """races.csv column order: base columns, then name_N/jockey_N/odds_N for N = 1 .. highest runner number."""
+    highest = max((int(key.split('_', 1)[1]) for row in rows for key in row if key.startswith("name_")), default=0)
+    return RACE_COLUMNS + [f"{field}_{number}" for number in range(1, highest + 1)
+                           for field in ("name", "jockey", "odds")]
+
+
+def pad_race_rows(rows):
+    """Give every row every column of race_columns(rows), empty where the race had no such runner."""
+    columns = race_columns(rows)
+    return [{column: row.get(column, "") for column in columns} for row in rows]
+
+
+def store_mtime(path=DB_FILE):
+    """Latest modification time of the database or its WAL, or None if neither exists."""
+    times = []
+    for candidate in (Path(path), Path(f"{path}-wal")):
+        try:
+            times.append(candidate.stat().st_mtime)
+        except OSError:
+            pass
+    return max(times) if times else None
+
+
+class RaceStore:
+    """Connection to the shared SQLite store (one per process)."""
+
+    def __init__(self, path=DB_FILE):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Bring databases created by older versions up to the current schema."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(races)")}
+        result_columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(results)")}
+        with self.conn:
+            if "version" not in columns:
+                self.conn.execute("ALTER TABLE races ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            for name, definition in RESULT_DETAIL_COLUMNS:
+                if name not in result_columns:
+                    self.conn.execute(f"ALTER TABLE results ADD COLUMN {name} {definition}")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_races_version ON races (version)")
+            # An empty near-duplicate index is current by definition; older keys are
+            # checked (and rebuilt if needed) by race_similarity.SimilarityIndex
+            if self.conn.execute("SELECT 1 FROM race_lsh LIMIT 1").fetchone() is None:
+                self.conn.execute("INSERT OR IGNORE INTO race_lsh_params (id, params) VALUES (1, ?)", (LSH_PARAMS,))
+
+    def close(self):
+        self.conn.close()
+
+    # Writers
+
+    def save_race(self, race_time, race_time_uk, runners, scraped_at=None):
+        """
+        Insert a race card, or update its runners (odds moves, non-runners
+        dropped) if the race is already stored for that date. Returns the race id.
+        """
+        scraped_at = scraped_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        race_date = _date_of(scraped_at)
+        runners = [r for r in runners if _runner_number(r.get("number")) is not None]
+        signature = race_signature(runners)
+        with self.conn:
+            previous = self.conn.execute("SELECT signature FROM races WHERE race_date = ? AND race_time = ?",
+                                         (race_date, race_time)).fetchone()
+            self.conn.execute(
+                """INSERT INTO races (race_date, race_time, race_time_uk, runner_count, scraped_at, signature, version)
+                   VALUES (?, ?, ?, ?, ?, ?, (SELECT COALESCE(MAX(version), 0) + 1 FROM races))
+                   ON CONFLICT (race_date, race_time) DO UPDATE SET
+                       runner_count = excluded.runner_count, signature = excluded.signature,
+                       version = excluded.version""",
+                (race_date, race_time, race_time_uk, len(runners), scraped_at, signature))
+            race_id = self.conn.execute("SELECT id FROM races WHERE race_date = ? AND race_time = ?",
+                                        (race_date, race_time)).fetchone()[0]
+            self.conn.executemany(
+                """INSERT INTO runners (race_id, number, name, jockey, odds) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (race_id, number) DO UPDATE SET
+                       name = excluded.name, jockey = excluded.jockey, odds = excluded.odds""",
+                [(race_id, _runner_number(r["number"]), r.get("name", ""), r.get("jockey", ""), r.get("odds", ""))
+                 for r in runners])
+            # Non-runners withdrawn since the last save
+            numbers = [_runner_number(r["number"]) for r in runners]
+            self.conn.execute(
+                f"DELETE FROM runners WHERE race_id = ? AND number NOT IN ({', '.join('?' * len(numbers))})",
+                [race_id] + numbers)
+            # Near-duplicate index: only when the field changed (odds moves keep the same keys)
+            if previous is None or previous["signature"] != signature:
+                self.conn.execute("DELETE FROM race_lsh WHERE race_id = ?", (race_id,))
+                self.conn.executemany("INSERT OR IGNORE INTO race_lsh (band_key, race_id) VALUES (?, ?)",
+                                      [(key, race_id) for key in race_band_keys(runners)])
+        return race_id
+
+    def save_results(self, results, race_time, video_race_time="", scraped_at=None, dividends=None):
+        """
+        Append one capture's results (positions are unique per scraped_at) and
+        its dividends ({"forecast": {combination, dividend, conf}, ...}).
+        """
+        scraped_at = scraped_at or datetime.now().isoformat()
+        text = lambda value: str(value) if value is not None else ""
+        with self.conn:
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO results
+                   (race_time, video_race_time, result_date, position, horse_number,
+                    raw_text, full_line, scraped_at, confidence, horse, jockey, odds, ocr_horse_number)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(race_time, video_race_time, _date_of(scraped_at), int(r.get("position", 0)),
+                  str(r.get("horse_number", "") or ""), r.get("raw_text", ""), r.get("full_line", ""),
+                  scraped_at, r.get("confidence"), text(r.get("horse")), text(r.get("jockey")),
+                  text(r.get("odds")), text(r.get("ocr_horse_number")))
+                 for r in results])
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO result_dividends
+                   (scraped_at, video_race_time, kind, combination, dividend, confidence)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(scraped_at, video_race_time, kind, d.get("combination", ""), d.get("dividend", ""), d.get("conf"))
+                 for kind, d in (dividends or {}).items()])
+
+    # Readers
+
+    def load_races(self):
+        """All races as races.csv-shaped rows (every row has every name_N/jockey_N/odds_N column)."""
+        rows, _ = self.races_since(-1)
+        return pad_race_rows(list(rows.values()))
+
+    def load_results(self):
+        """All results as race_results.csv-shaped rows."""
+        return self.results_since(0)[0]
+
+    def races_since(self, version):
+        """
+        Races inserted or updated after version, as ({race id: races.csv-shaped row}, latest version).
+        Rows only carry the name_N/jockey_N/odds_N columns of their own runners, plus
+        the stored "signature" (not a races.csv column; see race_signature.py).
+        """
+        races = self.conn.execute(
+            "SELECT id, race_time, race_time_uk, runner_count, scraped_at, signature, version FROM races "
+            "WHERE version > ? ORDER BY id", (version,)).fetchall()
+        rows = {}
+        for race in races:
+            rows[race["id"]] = {column: str(race[column]) for column in RACE_COLUMNS}
+            if race["signature"] is not None:
+                rows[race["id"]]["signature"] = race["signature"]
+            version = max(version, race["version"])
+        if rows:
+            marks = ",".join("?" * len(rows))
+            for runner in self.conn.execute(
+                    f"SELECT race_id, number, name, jockey, odds FROM runners WHERE race_id IN ({marks}) "
+                    "ORDER BY race_id, number", list(rows)):
+                row, number = rows[runner["race_id"]], runner["number"]
+                row[f"name_{number}"] = runner["name"]
+                row[f"jockey_{number}"] = runner["jockey"]
+                row[f"odds_{number}"] = runner["odds"]
+        return rows, version
+
+    def results_since(self, last_id):
+        """Results stored after row id last_id, as ([race_results.csv-shaped rows], latest id)."""
+        rows = []
+        for row in self.conn.execute(
+                f"SELECT id, {', '.join(RESULT_COLUMNS)} FROM results WHERE id > ? ORDER BY id", (last_id,)):
+            rows.append({column: str(row[column]) for column in RESULT_COLUMNS})
+            last_id = row["id"]
+        return rows, last_id
+
+    def recent_cards(self, limit=200):
+        """{race_time_uk: [{number, name, jockey, odds}]} for the latest races."""
+        cards = {}
+        races = self.conn.execute("SELECT id, race_time_uk FROM races ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        for race in reversed(races):
+            cards[race["race_time_uk"]] = [
+                {"number": str(r["number"]), "name": r["name"], "jockey": r["jockey"], "odds": r["odds"]}
+                for r in self.conn.execute(
+                    "SELECT number, name, jockey, odds FROM runners WHERE race_id = ? ORDER BY number",
+                    (race["id"],))]
+        return cards
+
+    def stats(self):
+        count = lambda table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return {"races": count("races"), "runners": count("runners"), "results": count("results"),
+                "dividends": count("result_dividends")}
+
+    # Import / export
+
+    def import_csv(self, races_csv=RACES_CSV, results_csv=RESULTS_CSV):
+        """Load existing CSVs; re-importing the same files adds nothing. Returns (races, results) read."""
+        races_read = results_read = 0
+        if Path(races_csv).exists():
+            with open(races_csv, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    runners = [{"number": key.split('_', 1)[1], "name": value,
+                                "jockey": row.get(f"jockey_{key.split('_', 1)[1]}", ""),
+                                "odds": row.get(f"odds_{key.split('_', 1)[1]}", "")}
+                               for key, value in row.items() if key.startswith("name_") and value]
+                    self.save_race(row.get("race_time", ""), row.get("race_time_uk", ""), runners,
+                                   row.get("scraped_at") or None)
+                    races_read += 1
+
+        if Path(results_csv).exists():
+            with open(results_csv, 'r', encoding='utf-8') as f:
+                captures = {}
+                for row in csv.DictReader(f):
+                    captures.setdefault((row.get("scraped_at", ""), row.get("race_time", ""),
+                                         row.get("video_race_time", "")), []).append(row)
+                    results_read += 1
+            for (scraped_at, race_time, video_race_time), rows in captures.items():
+                self.save_results(rows, race_time, video_race_time, scraped_at or None)
+        return races_read, results_read
+
+    def export_csv(self, directory):
+        """Write races.csv and race_results.csv (the old layouts) into directory."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, rows, columns in (("races.csv", self.load_races(), None),
+                                    ("race_results.csv", self.load_results(), RESULT_COLUMNS)):
+            columns = columns or (list(rows[0].keys()) if rows else RACE_COLUMNS)
+            with open(directory / name, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+            print(f"Exported {len(rows)} rows to {directory / name}")
+
+    def export_xlsx(self, path):
+        """Write a workbook with Races and Results sheets."""
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for title, rows, columns in (("Races", self.load_races(), None),
+                                     ("Results", self.load_results(), RESULT_COLUMNS)):
+            ws = wb.create_sheet(title)
+            columns = columns or (list(rows[0].keys()) if rows else RACE_COLUMNS)
+            ws.append(columns)
+            for row in rows:
+                ws.append([row.get(column, "") for column in columns])
+        wb.save(path)
+        print(f"Exported store to {path}")
+
+
+if __name__ == "__main__":
+    commands = ("import", "export-csv", "export-xlsx", "stats")
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("Usage: python race_store.py import [races.csv] [race_results.csv]")
+        print("       python race_store.py export-csv <dir>")
+        print("       python race_store.py export-xlsx <file.xlsx>")
+        print("       python race_store.py stats")
+        sys.exit(1)
+
+    store = RaceStore()
+    command, args = sys.argv[1], sys.argv[2:]
+    if command == "import":
+        races_read, results_read = store.import_csv(*(args or [RACES_CSV, RESULTS_CSV]))
+        print(f"Imported {races_read} race rows and {results_read} result rows into {store.path}")
+    elif command == "export-csv":
+        store.export_csv(args[0] if args else Path(__file__).parent)
+    elif command == "export-xlsx":
+        store.export_xlsx(args[0] if args else Path(__file__).parent / "races_export.xlsx")
+    print(store.stats())
+    store.close()
@@ -0,0 +1,159 @@
+"""
+Rebuild Scheduler - Coalesced background rebuilds for file watchers
+
+A watchdog handler that rebuilds inline blocks the observer thread, and a
+"skip events within N seconds of the last rebuild" debounce drops the change
+that arrives just after one (e.g. a race written right after a result) until
+some later event happens. RebuildScheduler instead:
+1. Takes notify() calls from any thread and only records them (never blocks)
+2. Runs the rebuild on its own worker thread once events have been quiet for
+   QUIET_SECONDS, or MAX_DELAY_SECONDS after the first pending event if they
+   keep coming, so a burst becomes one rebuild
+3. Never runs two rebuilds at once; events arriving during a rebuild mark it
+   pending again, so there is always a trailing rebuild after the last change
+4. Tracks rebuild lag (first pending event -> rebuild finished), duration
+   and how many events each rebuild absorbed
+"""
+
+import time
+import threading
+
+
+# Rebuild once events have stopped for this long...
+QUIET_SECONDS = 0.5
+# ...or this long after the first pending event, whichever comes first
+MAX_DELAY_SECONDS = 5.0
+
+
+class RebuildScheduler:
+    """Runs work() on a worker thread after notify(), coalescing bursts."""
+
+    def __init__(self, work, quiet=QUIET_SECONDS, max_delay=MAX_DELAY_SECONDS, name="rebuild", verbose=False):
+        self.work = work
+        self.verbose = verbose
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.name = name
+
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.thread = None
+        self.first_event = None  # monotonic time of the oldest pending event, None when idle
+        self.last_event = None
+        self.reasons = {}  # reason -> pending event count
+        self.running = False
+
+        # Metrics
+        self.events = 0
+        self.rebuilds = 0
+        self.errors = 0
+        self.last_events = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self.last_run_ms = 0.0
+
+    def notify(self, reason="change"):
+        """Record a change; the rebuild happens later on the worker, as work({reason: events})."""
+        now = time.monotonic()
+        with self.cond:
+            if self.first_event is None:
+                self.first_event = now
+            self.last_event = now
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+            self.events += 1
+            self.cond.notify_all()
+
+    def _due(self, now):
+        """Seconds until the pending rebuild should run (<= 0: now)."""
+        return min(self.last_event + self.quiet, self.first_event + self.max_delay) - now
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.stopped:
+                    if self.first_event is None:
+                        self.cond.wait()
+                        continue
+                    wait = self._due(time.monotonic())
+                    if wait <= 0:
+                        break
+                    self.cond.wait(wait)
+                if self.stopped:
+                    return
+                first_event, reasons = self.first_event, self.reasons
+                self.first_event, self.last_event, self.reasons = None, None, {}
+                self.running = True
+
+            started = time.monotonic()
+            try:
+                self.work(reasons)
+            except Exception as e:
+                # Keep the worker alive; the next change retries
+                self.errors += 1
+                print(f"⚠️ {self.name} failed: {e}")
+            finished = time.monotonic()
+
+            with self.cond:
+                self.running = False
+                self.rebuilds += 1
+                self.last_events = sum(reasons.values())
+                self.last_run_ms = (finished - started) * 1000
+                self.last_lag_ms = (finished - first_event) * 1000
+                self.max_lag_ms = max(self.max_lag_ms, self.last_lag_ms)
+                self.total_lag_ms += self.last_lag_ms
+                self.cond.notify_all()
+            if self.verbose:
+                print(format_stats(self))
+
+    def start(self):
+        """Start the worker (idempotent)."""
+        if self.thread is None or not self.thread.is_alive():
+            self.stopped = False
+            self.thread = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Stop the worker after the rebuild in progress (pending changes are dropped)."""
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def wait_idle(self, timeout=None):
+        """Block until nothing is pending or running. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while self.first_event is not None or self.running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.cond.wait(remaining)
+        return True
+
+    def stats(self):
+        """Rebuild counts and lag for logging."""
+        with self.cond:
+            pending_s = time.monotonic() - self.first_event if self.first_event is not None else 0.0
+            return {
+                "events": self.events,
+                "rebuilds": self.rebuilds,
+                "coalesced": self.events - self.rebuilds,
+                "errors": self.errors,
+                "pending_s": round(pending_s, 2),
+                "last_events": self.last_events,
+                "last_run_ms": round(self.last_run_ms, 1),
+                "last_lag_ms": round(self.last_lag_ms, 1),
+                "max_lag_ms": round(self.max_lag_ms, 1),
+                "avg_lag_ms": round(self.total_lag_ms / self.rebuilds, 1) if self.rebuilds else 0.0,
+            }
+
+
+def format_stats(scheduler):
+    """One-line summary of a scheduler's stats."""
+    s = scheduler.stats()
+    return (f"⏱️ Rebuild lag {s['last_lag_ms']:.0f} ms (avg {s['avg_lag_ms']:.0f}, max {s['max_lag_ms']:.0f}), "
+            f"run {s['last_run_ms']:.0f} ms, {s['last_events']} event(s) -> 1 rebuild "
+            f"({s['rebuilds']} rebuilds / {s['events']} events)")
@@ -0,0 +1,272 @@
+"""
+Reconcile - Indexed matching of OCR'd results to scraped races
+
+get_results_for_race() used to scan every result for every race, parsing
+dates and splitting race_time each time (O(races x results)). ResultIndex
+parses each result group once and:
+1. Hashes results by video_race_time, each bucket two parallel arrays
+   (capture seconds, result rows) sorted by capture time, so a race's
+   results are a dict lookup plus a bisect
+2. Files results without a video_race_time under each UK start minute they
+   can belong to (captured 0-3 minutes after it); their capture stamp is
+   local (IST) time and is converted to UK time by time zone first
+3. Accepts results captured from RESULT_EARLY before to RESULT_LAG after
+   the race was scraped instead of requiring the same calendar date, so a
+   race scraped before midnight still finds results captured after it, and
+   a race_time_uk on the other side of midnight from the local (IST) clock
+   still matches. Race times repeat every 24 hours, so the window never
+   reaches the same race time on another day
+4. Reconciles a batch of races (a cold start) as a merge join: the races
+   of each race_time_uk, sorted by scraped_at, walk cursors forward through
+   that time's buckets
+
+Benchmark the index on synthetic data:
+    python reconcile.py [races]
+"""
+
+import sys
+import time
+import random
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+from race_schedule import IST, UK
+
+
+# Results are accepted from this many seconds before the race was scraped...
+RESULT_EARLY = 10 * 60
+# ...until this many after (well under the 24 hours after which race times repeat)
+RESULT_LAG = 12 * 3600
+
+# Fallback for results without a video_race_time: captured this many minutes after the start
+FALLBACK_MINUTES = 3
+
+
+@lru_cache(maxsize=4096)
+def _day_number(iso_date):
+    return date.fromisoformat(iso_date).toordinal()
+
+
+def timestamp_seconds(value):
+    """
+    Seconds since the proleptic Gregorian epoch for "2025-12-13 21:00:00" or
+    "2025-12-13T21:00:00.123456", else None. Integers keep the bisects cheap.
+    """
+    if not isinstance(value, str) or len(value) < 19:
+        return None
+    try:
+        moment = datetime.fromisoformat(value[:19])
+    except ValueError:
+        return None
+    return moment.toordinal() * 86400 + moment.hour * 3600 + moment.minute * 60 + moment.second
+
+
+def capture_seconds(race_time):
+    """Seconds (as timestamp_seconds) for the results scraper's "YYYYMMDD_HHMMSS" capture stamp, else None."""
+    try:
+        day = _day_number(f"{race_time[0:4]}-{race_time[4:6]}-{race_time[6:8]}")
+        return day * 86400 + int(race_time[9:11]) * 3600 + int(race_time[11:13]) * 60 + int(race_time[13:15])
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=65536)
+def _uk_lag(half_hour):
+    """Seconds the UK clock is behind IST in a local half hour (timestamp_seconds // 1800)."""
+    local = (datetime.fromordinal(half_hour // 48) + timedelta(minutes=30 * (half_hour % 48))).replace(tzinfo=IST)
+    return int((local.utcoffset() - local.astimezone(UK).utcoffset()).total_seconds())
+
+
+def uk_seconds(seconds):
+    """A local (IST) timestamp_seconds / capture_seconds value on the UK clock (GMT or BST)."""
+    return seconds - _uk_lag(seconds // 1800)
+
+
+@lru_cache(maxsize=4096)
+def clock_minutes(hhmm):
+    """Minutes of day for "HH:MM", else None."""
+    try:
+        hours, minutes = hhmm.split(':')
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+class ResultIndex:
+    """Results indexed for per-race lookup; add() new rows as they arrive."""
+
+    def __init__(self, results=()):
+        self.by_time = {}   # video_race_time -> ([capture seconds], [result]), sorted by capture
+        self.undated = {}   # video_race_time -> [result] without a parseable scraped_at
+        # Results without a video_race_time, under every UK start minute of day
+        # they can belong to: minute -> ([capture minute], [result]), sorted
+        self.fallback = {}
+        self.count = 0
+        self._pending = {}  # video_race_time or start minute -> ([key], [result]) not yet merged
+        self.add(results)
+
+    def add(self, results):
+        """Index more result rows (in file / store order)."""
+        pending, undated = self._pending, self.undated
+        # The placings of one race arrive together with the same scraped_at and
+        # video_race_time (or capture stamp): parse the stamp and find the
+        # bucket(s) once per group
+        last_stamp = last_seconds = None
+        last_time = keys = rows = None
+        last_capture = capture_minute = None
+        starts = []
+        for result in results:
+            video_time = result.get('video_race_time', '')
+            if video_time:
+                stamp = result.get('scraped_at', '')
+                if stamp != last_stamp:
+                    last_stamp, last_seconds = stamp, timestamp_seconds(stamp)
+                if last_seconds is None:
+                    undated.setdefault(video_time, []).append(result)
+                    continue
+                if video_time != last_time:
+                    last_time = video_time
+                    keys, rows = pending.get(video_time) or pending.setdefault(video_time, ([], []))
+                keys.append(last_seconds)
+                rows.append(result)
+            else:
+                capture = result.get('race_time', '')
+                if capture != last_capture:
+                    last_capture, seconds = capture, capture_seconds(capture)
+                    starts = []
+                    if seconds is not None:
+                        # The stamp is on the local (IST) clock, race_time_uk on the UK clock
+                        capture_minute, uk_minute = seconds // 60, uk_seconds(seconds) // 60
+                        for back in range(FALLBACK_MINUTES + 1):
+                            start = (uk_minute - back) % 1440
+                            starts.append(pending.get(start) or pending.setdefault(start, ([], [])))
+                for start_keys, start_rows in starts:
+                    start_keys.append(capture_minute)
+                    start_rows.append(result)
+        self.count += len(results)
+
+    def prepare(self):
+        """Merge rows added since the last lookup into the sorted buckets."""
+        for key, (new_keys, new_rows) in self._pending.items():
+            target = self.fallback if isinstance(key, int) else self.by_time
+            keys, rows = target.setdefault(key, ([], []))
+            start = len(keys)
+            keys += new_keys
+            rows += new_rows
+            # Captures usually arrive in order; otherwise a stable sort keeps
+            # equal capture times in arrival order
+            if (start and new_keys[0] < keys[start - 1]) or new_keys != sorted(new_keys):
+                order = sorted(range(len(keys)), key=keys.__getitem__)
+                keys[:] = [keys[i] for i in order]
+                rows[:] = [rows[i] for i in order]
+        self._pending = {}
+
+    def for_race(self, race_row):
+        """Results belonging to a race (races.csv row): undated ones first, then in capture order."""
+        race_time_uk = race_row.get('race_time_uk', '')
+        if not race_time_uk:
+            return []
+        if self._pending:
+            self.prepare()
+
+        keys, rows = self.by_time.get(race_time_uk, ([], []))
+        scraped = timestamp_seconds(race_row.get('scraped_at', ''))
+        if scraped is None:
+            # Undated race: every result for its time, as before
+            matches = list(rows)
+        else:
+            low, high = scraped - RESULT_EARLY, scraped + RESULT_LAG
+            matches = rows[bisect_left(keys, low):bisect_right(keys, high)]
+
+            # Fallback: captured 0-3 minutes after the start, within the same window
+            minutes, window_rows = self.fallback.get(clock_minutes(race_time_uk), ([], []))
+            if minutes:
+                matches += window_rows[bisect_left(minutes, low // 60):bisect_right(minutes, high // 60)]
+
+        undated = self.undated.get(race_time_uk)
+        return undated + matches if undated else matches
+
+    def reconcile(self, races):
+        """
+        for_race() for a whole list of races (a cold start), same order, as a
+        merge join: the races of one race_time_uk, in scraped_at order, only
+        move their cursors forward through that time's buckets.
+        """
+        if self._pending:
+            self.prepare()
+        matched = [None] * len(races)
+        scraped = [timestamp_seconds(race.get('scraped_at', '')) for race in races]
+        # One sort by scraped_at, then grouping by race_time_uk keeps each group in order
+        dated = [idx for idx, seconds in enumerate(scraped) if seconds is not None]
+        dated.sort(key=scraped.__getitem__)
+        groups = {}
+        for idx in dated:
+            groups.setdefault(races[idx].get('race_time_uk', ''), []).append(idx)
+
+        early, lag, no_bucket = RESULT_EARLY, RESULT_LAG, ([], [])
+        search_left, search_right = bisect_left, bisect_right
+        for race_time_uk, indexes in groups.items():
+            if not race_time_uk:
+                for idx in indexes:
+                    matched[idx] = []
+                continue
+            keys, rows = self.by_time.get(race_time_uk, no_bucket)
+            minutes, window_rows = self.fallback.get(clock_minutes(race_time_uk), no_bucket)
+            undated = self.undated.get(race_time_uk)
+            lo = hi = window_lo = window_hi = 0
+            for idx in indexes:
+                low = scraped[idx] - early
+                high = low + early + lag
+                lo = search_left(keys, low, lo)
+                hi = search_right(keys, high, hi)
+                matches = rows[lo:hi]
+                if minutes:
+                    window_lo = search_left(minutes, low // 60, window_lo)
+                    window_hi = search_right(minutes, high // 60, window_hi)
+                    matches += window_rows[window_lo:window_hi]
+                matched[idx] = undated + matches if undated else matches
+
+        if len(dated) < len(races):
+            # Undated races: every result for their time
+            for idx, seconds in enumerate(scraped):
+                if seconds is None:
+                    matched[idx] = self.for_race(races[idx])
+        return matched
+
+
+def synthetic_history(races, runners=12, seed=1):
+    """Races and results for a run of `races` races, one every 2 minutes, stamped on the local (IST) clock."""
+    rng = random.Random(seed)
+    started = datetime(2025, 1, 1, 6, 0, tzinfo=timezone.utc)
+    race_rows, result_rows = [], []
+    for i in range(races):
+        start = started + timedelta(minutes=2 * i)
+        local, uk = start.astimezone(IST), start.astimezone(UK).strftime("%H:%M")
+        scraped = local - timedelta(minutes=rng.randint(1, 20))
+        race_rows.append({"race_time": local.strftime("%H:%M"), "race_time_uk": uk,
+                          "scraped_at": scraped.strftime("%Y-%m-%d %H:%M:%S")})
+        captured = local + timedelta(seconds=rng.randint(40, 150))
+        video_time = uk if rng.random() > 0.05 else ""
+        for position, number in enumerate(rng.sample(range(1, runners + 1), 4), 1):
+            result_rows.append({"race_time": captured.strftime("%Y%m%d_%H%M%S"), "video_race_time": video_time,
+                                "position": str(position), "horse_number": str(number),
+                                "scraped_at": captured.replace(tzinfo=None).isoformat()})
+    return race_rows, result_rows
+
+
+def benchmark(races=100000):
+    race_rows, result_rows = synthetic_history(races)
+    started = time.perf_counter()
+    index = ResultIndex(result_rows)
+    index.prepare()
+    built = time.perf_counter()
+    matched = sum(len(results) >= 4 for results in index.reconcile(race_rows))
+    finished = time.perf_counter()
+    print(f"{races} races, {len(result_rows)} results")
+    print(f"Index build: {(built - started) * 1000:.0f} ms")
+    print(f"Reconcile:   {(finished - built) * 1000:.0f} ms ({matched / races:.1%} races with all 4 placings)")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,315 @@
+"""
+Replay Bench - Offline replay and benchmark of the results OCR pipeline
+
+Measures the results pipeline without a VPN or a live stream:
+1. Replays a corpus of recorded frames (<name>.png) through preprocessing,
+   OCR, results detection, race-time extraction and both parsers. A
+   <name>.txt next to the frame holds recorded OCR text and replaces the
+   OCR stages, so parser-only runs need neither tesseract nor images
+2. Scores each frame against its ground truth (<name>.json):
+       {"is_results": true, "video_race_time": "14:00",
+        "results": [{"position": 1, "horse_number": "4", "horse": "CHOPSTICKS",
+                     "jockey": "Brian Myers"}, ...]}
+3. Fuzzes the text parsers with synthetic races run through a seeded
+   OCR-noise generator (character confusions, dropped/extra symbols,
+   broken spacing)
+4. Reports frames/sec, per-stage latency percentiles and accuracy (exact
+   top-4 match, race-time extraction rate, results detection), and can
+   compare against a saved baseline to gate regressions
+
+Everything is seeded and offline, so runs are repeatable.
+
+Usage:
+    python replay_bench.py --corpus replay_frames/ [--preset overlay]
+    python replay_bench.py --synthetic 500 --noise 0.02,0.05,0.1
+    python replay_bench.py --synthetic 500 --save-baseline bench_baseline.json
+    python replay_bench.py --synthetic 500 --baseline bench_baseline.json
+
+Requirements:
+    pip install pytesseract pillow numpy   (only for frame corpora without .txt)
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+from results_text import is_results_screen, extract_race_time_from_ocr, parse_race_results
+from results_layout import parse_results_layout
+
+
+# Allowed drop before --baseline fails the run
+MAX_ACCURACY_DROP = 0.01  # absolute
+MAX_SPEED_DROP = 0.20  # fraction of the baseline frames/sec
+
+# Characters tesseract commonly confuses on the overlay font
+CONFUSIONS = {
+    "O": "0D", "0": "OD", "D": "0O", "I": "1l|", "1": "Il|", "l": "1I|",
+    "S": "5$", "5": "S", "B": "8", "8": "B3", "G": "6C", "6": "G",
+    "Z": "2", "2": "Z", "E": "F", "F": "E", "3": "8", ":": ". ", "/": "7|",
+}
+# Junk tesseract produces from borders and icons
+JUNK = "|/\\°[]{}~`«»"
+
+HORSE_WORDS = ["SILVER", "ARROW", "MIDNIGHT", "RUN", "JONNYS", "STREET", "CHOPSTICKS", "BLUE",
+               "MOON", "GOLDEN", "DAWN", "RED", "ROCKET", "LUCKY", "STAR", "DARK", "HORSE", "JAKE"]
+JOCKEY_NAMES = ["Brian Myers", "Declan Bark", "Tom Reed", "Sam Lee", "Paul Kane", "Ann Boyd",
+                "Joe Flynn", "Ian Hart", "Kate Dunn", "Luke Shaw"]
+ODDS = ["EVS", "2/1", "5/2", "3/1", "7/2", "4/1", "9/2", "6/1", "8/1", "10/1", "14/1", "20/1"]
+ORDINALS = ["1st", "2nd", "3rd", "4th"]
+
+
+def ocr_noise(text, rate, rng):
+    """
+    Degrade text the way OCR does. rate is the per-character probability of an
+    error: a confusion, a dropped character, junk inserted, or a broken space.
+    """
+    out = []
+    for char in text:
+        if char == "\n" or rng.random() >= rate:
+            out.append(char)
+            continue
+        roll = rng.random()
+        if roll < 0.5 and char in CONFUSIONS:
+            out.append(rng.choice(CONFUSIONS[char]))
+        elif roll < 0.65:
+            continue  # dropped
+        elif roll < 0.85:
+            out.append(char + rng.choice(JUNK))
+        elif char == " ":
+            out.append(rng.choice(["", "  "]))
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def synthetic_race(rng):
+    """A random results screen: (ocr_text, ground_truth)."""
+    runners = rng.randint(6, 12)
+    numbers = rng.sample(range(1, runners + 1), 4)
+    race_time = f"{rng.randint(0, 23):02d}:{rng.choice(range(0, 60, 2)):02d}"
+    lines = [f"{race_time} GLENVIEW GARDENS"]
+    results = []
+    for position, number in enumerate(numbers, 1):
+        horse = " ".join(rng.sample(HORSE_WORDS, rng.randint(1, 2)))
+        jockey = rng.choice(JOCKEY_NAMES)
+        lines.append(f"{ORDINALS[position - 1]} {number} {horse} {jockey} {rng.choice(ODDS)}")
+        results.append({"position": position, "horse_number": str(number), "horse": horse, "jockey": jockey})
+    lines.append(f"FORECAST {numbers[0]}-{numbers[1]} £{rng.randint(5, 90)}.{rng.randint(0, 99):02d}")
+    lines.append(f"TRICAST {numbers[0]}-{numbers[1]}-{numbers[2]} £{rng.randint(20, 900)}.{rng.randint(0, 99):02d}")
+    truth = {"is_results": True, "video_race_time": race_time, "results": results}
+    return "\n".join(lines), truth
+
+
+def percentiles(values):
+    """p50/p90/p99 of a list of milliseconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.50), 3), "p90": round(pick(0.90), 3), "p99": round(pick(0.99), 3)}
+
+
+class Scorer:
+    """Stage timings and accuracy counters over a replay run."""
+
+    def __init__(self):
+        self.stage_ms = defaultdict(list)
+        self.frames = 0
+        self.elapsed = 0.0
+        self.detect = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+        self.time_frames = 0
+        self.time_hits = 0
+        self.result_frames = 0
+        self.exact_text = 0
+        self.exact_layout = 0
+        self.layout_frames = 0
+
+    def timed(self, stage, func, *args):
+        started = time.perf_counter()
+        value = func(*args)
+        self.stage_ms[stage].append((time.perf_counter() - started) * 1000)
+        return value
+
+    def score(self, truth, detected, race_time, results, layout_results=None):
+        is_results = truth.get("is_results", bool(truth.get("results")))
+        key = ("tp" if detected else "fn") if is_results else ("fp" if detected else "tn")
+        self.detect[key] += 1
+        if not is_results:
+            return
+
+        if truth.get("video_race_time"):
+            self.time_frames += 1
+            self.time_hits += race_time == truth["video_race_time"]
+
+        expected = top4(truth.get("results", []))
+        self.result_frames += 1
+        self.exact_text += top4(results) == expected
+        if layout_results is not None:
+            self.layout_frames += 1
+            self.exact_layout += top4(layout_results) == expected
+
+    def report(self):
+        d = self.detect
+        ratio = lambda a, b: round(a / b, 4) if b else None
+        return {
+            "frames": self.frames,
+            "frames_per_sec": round(self.frames / self.elapsed, 1) if self.elapsed else 0.0,
+            "stages_ms": {stage: percentiles(values) for stage, values in self.stage_ms.items()},
+            "detect_precision": ratio(d["tp"], d["tp"] + d["fp"]),
+            "detect_recall": ratio(d["tp"], d["tp"] + d["fn"]),
+            "time_extraction_rate": ratio(self.time_hits, self.time_frames),
+            "exact_top4": ratio(self.exact_text, self.result_frames),
+            "exact_top4_layout": ratio(self.exact_layout, self.layout_frames),
+        }
+
+
+def top4(results):
+    """[(position, horse_number)] of the first four places."""
+    return sorted((int(r.get("position", 0)), str(r.get("horse_number", "")).strip())
+                  for r in results if 1 <= int(r.get("position", 0)) <= 4)
+
+
+def _parse_text(scorer, text):
+    detected = scorer.timed("detect", is_results_screen, text)
+    race_time = scorer.timed("race_time", extract_race_time_from_ocr, text)
+    results = scorer.timed("parse", parse_race_results, text)
+    return detected, race_time, results
+
+
+def replay_corpus(corpus, preset=None):
+    """Replay recorded frames (or their recorded OCR text) against ground truth."""
+    corpus = Path(corpus)
+    scorer = Scorer()
+    preprocessor = None
+
+    for truth_path in sorted(corpus.glob("*.json")):
+        with open(truth_path, 'r', encoding='utf-8') as f:
+            truth = json.load(f)
+        text_path, image_path = truth_path.with_suffix(".txt"), truth_path.with_suffix(".png")
+
+        started = time.perf_counter()
+        layout_results = None
+        if text_path.exists():
+            text = scorer.timed("load", text_path.read_text, 'utf-8')
+        elif image_path.exists():
+            from PIL import Image
+            from results_region import ocr_words, words_to_text
+            from ocr_preprocess import Preprocessor
+            if preset and preprocessor is None:
+                preprocessor = Preprocessor(preset)
+
+            image = scorer.timed("load", Image.open, image_path)
+            image.load()
+            box = truth.get("box")
+            if preprocessor:
+                prepared = scorer.timed("preprocess", preprocessor.apply, image, box)
+                config = preprocessor.config
+            else:
+                prepared = scorer.timed("preprocess", lambda: (image.crop(box) if box else image).convert('L'))
+                config = ""
+            words = scorer.timed("ocr", ocr_words, prepared, config)
+            text = words_to_text(words)
+            layout_results = scorer.timed("layout", lambda: parse_results_layout(words)[0])
+        else:
+            continue
+
+        detected, race_time, results = _parse_text(scorer, text)
+        scorer.elapsed += time.perf_counter() - started
+        scorer.frames += 1
+        scorer.score(truth, detected, race_time, results, layout_results)
+
+    return scorer.report()
+
+
+def replay_synthetic(count, noise_rates, seed=0):
+    """Fuzz the text parsers with synthetic races at each noise rate. Returns {rate: report}."""
+    reports = {}
+    for rate in noise_rates:
+        rng = random.Random(f"{seed}:{rate}")
+        scorer = Scorer()
+        for _ in range(count):
+            text, truth = synthetic_race(rng)
+            text = ocr_noise(text, rate, rng)
+            started = time.perf_counter()
+            detected, race_time, results = _parse_text(scorer, text)
+            scorer.elapsed += time.perf_counter() - started
+            scorer.frames += 1
+            scorer.score(truth, detected, race_time, results)
+        reports[str(rate)] = scorer.report()
+    return reports
+
+
+def print_report(name, report):
+    print(f"\n== {name} ==")
+    print(f"{report['frames']} frames, {report['frames_per_sec']} frames/sec")
+    for stage, p in report["stages_ms"].items():
+        print(f"  {stage:>10}: p50 {p['p50']:.3f} ms  p90 {p['p90']:.3f} ms  p99 {p['p99']:.3f} ms")
+    for key in ("detect_precision", "detect_recall", "time_extraction_rate", "exact_top4", "exact_top4_layout"):
+        if report[key] is not None:
+            print(f"  {key}: {report[key]:.1%}")
+
+
+def check_baseline(reports, baseline):
+    """Regressions of these reports against a saved baseline, as messages."""
+    failures = []
+    for name, report in reports.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("detect_recall", "time_extraction_rate", "exact_top4", "exact_top4_layout"):
+            if base.get(key) is not None and report.get(key) is not None \
+                    and report[key] < base[key] - MAX_ACCURACY_DROP:
+                failures.append(f"{name}: {key} {report[key]:.1%} < baseline {base[key]:.1%}")
+        if base.get("frames_per_sec") and report["frames_per_sec"] < base["frames_per_sec"] * (1 - MAX_SPEED_DROP):
+            failures.append(f"{name}: {report['frames_per_sec']} frames/sec < baseline {base['frames_per_sec']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline replay benchmark for the results OCR pipeline")
+    parser.add_argument("--corpus", help="directory of <name>.png/.txt frames with <name>.json ground truth")
+    parser.add_argument("--preset", help="ocr_preprocess preset for frame OCR")
+    parser.add_argument("--synthetic", type=int, default=0, help="synthetic races per noise rate")
+    parser.add_argument("--noise", default="0,0.02,0.05,0.1", help="comma-separated OCR error rates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="fail if accuracy or speed regress against this report")
+    parser.add_argument("--save-baseline", help="write this run's reports as a baseline")
+    args = parser.parse_args()
+
+    reports = {}
+    if args.corpus:
+        reports["corpus"] = replay_corpus(args.corpus, args.preset)
+    if args.synthetic:
+        rates = [float(r) for r in args.noise.split(",") if r]
+        for rate, report in replay_synthetic(args.synthetic, rates, args.seed).items():
+            reports[f"synthetic@{rate}"] = report
+    if not reports:
+        parser.print_help()
+        return 1
+
+    for name, report in reports.items():
+        print_report(name, report)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            failures = check_baseline(reports, json.load(f))
+        if failures:
+            print("\n❌ Regressions against baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            return 1
+        print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Results Detector - Fast first-stage gate in front of full OCR
+
+Most frames show horses running, yet is_results_screen() can only decide
+after OCR. This module adds a first stage that runs in a few milliseconds:
+1. Each frame's results-panel area is box-downscaled to a small grayscale
+   signature (zero-mean, unit-norm NumPy vector)
+2. The signature is correlated with a prototype learned from frames that
+   full OCR confirmed as results screens
+3. Only frames scoring at or above the threshold go on to OCR; every
+   AUDIT_EVERY-th rejected frame is OCR'd anyway to estimate recall
+
+Until enough positives have been seen the gate lets every frame through.
+The prototype is saved to results_gate.npz, with its panel box and the frame
+size they were learned at, so it survives restarts; frames of another size
+(video vs screenshot geometry) start the learning over.
+
+Tuning against a labelled frame set (<dir>/results/*.png, <dir>/other/*.png):
+    python results_detector.py labelled_frames/ [left,top,right,bottom]
+
+Requirements:
+    pip install pillow numpy
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+# Configuration
+GATE_FILE = Path(__file__).parent / "results_gate.npz"
+
+# Signature resolution (width, height)
+SIGNATURE_SIZE = (48, 32)
+
+# Correlation with the prototype needed to send a frame to OCR
+GATE_THRESHOLD = 0.6
+
+# Confirmed results frames needed before the gate starts rejecting
+MIN_POSITIVES = 3
+
+# OCR every Nth rejected frame anyway so missed results can be measured
+AUDIT_EVERY = 10
+
+# Cap on the running-mean weight so the prototype keeps adapting to drift
+MAX_PROTOTYPE_WEIGHT = 50
+
+# Panel boxes overlapping less than this (intersection over union) count as a move
+MIN_BOX_IOU = 0.8
+
+
+def frame_signature(image, box=None):
+    """Zero-mean, unit-norm vector of the (cropped) frame at SIGNATURE_SIZE."""
+    if box:
+        image = image.crop(box)
+    pixels = np.asarray(image.convert('L').resize(SIGNATURE_SIZE, Image.BOX), dtype=np.float32).ravel()
+    pixels -= pixels.mean()
+    norm = np.linalg.norm(pixels)
+    return pixels / norm if norm else pixels
+
+
+def box_iou(a, b):
+    """Intersection over union of two (left, top, right, bottom) boxes."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    inter = width * height
+    area = lambda box: (box[2] - box[0]) * (box[3] - box[1])
+    return inter / (area(a) + area(b) - inter)
+
+
+def signature_score(signature, prototype):
+    """Correlation between a signature and the prototype (-1..1)."""
+    norm = np.linalg.norm(prototype)
+    return float(signature @ prototype / norm) if norm else 0.0
+
+
+class ResultsGate:
+    """Learned results-overlay detector with online precision/recall accounting."""
+
+    def __init__(self, threshold=GATE_THRESHOLD, path=GATE_FILE):
+        self.threshold = threshold
+        self.path = Path(path) if path else None
+        self.box = None
+        self.frame_size = None  # (width, height) of the frames box and prototype belong to
+        self.prototype = None
+        self.positives = 0
+        self.rejected = 0
+
+        # Confusion counts from frames that were OCR'd (rejected ones only via audits)
+        self.tp = 0
+        self.fp = 0
+        self.fn = 0
+        self.tn = 0
+        self.gate_ms = 0.0
+        self.frames = 0
+
+        self.load()
+
+    def load(self):
+        if self.path and self.path.exists():
+            try:
+                data = np.load(self.path)
+                if "frame_size" not in data:
+                    print("🚦 Results gate file has no frame size, relearning")
+                    return
+                self.frame_size = tuple(int(v) for v in data["frame_size"])
+                self.prototype = data["prototype"]
+                self.positives = int(data["positives"])
+                box = tuple(int(v) for v in data["box"])
+                self.box = box if any(box) else None
+                print(f"🚦 Results gate loaded ({self.positives} positives)")
+            except Exception as e:
+                print(f"⚠️ Could not load results gate: {e}")
+
+    def save(self):
+        if self.path and self.prototype is not None:
+            np.savez(self.path, prototype=self.prototype, positives=self.positives,
+                     box=np.array(self.box or (0, 0, 0, 0)), frame_size=np.array(self.frame_size or (0, 0)))
+
+    def reset(self):
+        """Forget the box and prototype (e.g. the frame source changed geometry)."""
+        self.box = None
+        self.frame_size = None
+        self.prototype = None
+        self.positives = 0
+
+    def ready(self):
+        return self.prototype is not None and self.positives >= MIN_POSITIVES
+
+    def set_box(self, box):
+        """
+        Use the results-panel box for signatures. Unknown (None) boxes are
+        ignored; a box that has really moved invalidates the prototype.
+        """
+        if not box:
+            return
+        box = tuple(box)
+        if self.box is not None and box_iou(box, self.box) >= MIN_BOX_IOU:
+            return
+        if self.box is not None:
+            print(f"🚦 Results panel moved to {box}, relearning gate")
+        self.box = box
+        self.prototype = None
+        self.positives = 0
+
+    def should_ocr(self, image):
+        """
+        First stage. Returns (run_ocr, score); score is None while the gate is still learning.
+        """
+        if self.frame_size is not None and image.size != self.frame_size:
+            print(f"🚦 Frame size changed {self.frame_size} -> {image.size}, relearning gate")
+            self.reset()
+        if not self.ready():
+            return True, None
+
+        started = time.perf_counter()
+        score = signature_score(frame_signature(image, self.box), self.prototype)
+        self.gate_ms += (time.perf_counter() - started) * 1000
+        self.frames += 1
+
+        if score >= self.threshold:
+            return True, score
+
+        self.rejected += 1
+        if AUDIT_EVERY and self.rejected % AUDIT_EVERY == 0:
+            return True, score  # Audit: OCR a rejected frame to measure recall
+        return False, score
+
+    def learn(self, image, is_results, score):
+        """Feed back the OCR verdict for a frame that passed (or audited) the gate."""
+        if score is not None:
+            predicted = score >= self.threshold
+            if predicted and is_results:
+                self.tp += 1
+            elif predicted:
+                self.fp += 1
+            elif is_results:
+                self.fn += 1
+                print(f"⚠️ Results gate missed a results frame (score {score:.2f})")
+            else:
+                self.tn += 1
+
+        if not is_results:
+            return
+
+        if self.frame_size is None:
+            self.frame_size = image.size
+        elif image.size != self.frame_size:
+            return  # a frame from before a change of source
+        signature = frame_signature(image, self.box)
+        if self.prototype is None:
+            self.prototype = signature
+        else:
+            weight = min(self.positives, MAX_PROTOTYPE_WEIGHT)
+            self.prototype = (self.prototype * weight + signature) / (weight + 1)
+        self.positives += 1
+        self.save()
+
+    def stats(self):
+        """Gate timing plus precision/recall estimates from OCR'd frames."""
+        tp, fp, fn = self.tp, self.fp, self.fn
+        # Only 1 in AUDIT_EVERY rejected frames is checked, so scale misses up
+        fn_est = fn * AUDIT_EVERY if AUDIT_EVERY else fn
+        return {
+            "ready": self.ready(),
+            "positives": self.positives,
+            "rejected": self.rejected,
+            "gate_ms_avg": round(self.gate_ms / self.frames, 2) if self.frames else 0.0,
+            "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+            "recall_est": round(tp / (tp + fn_est), 3) if tp + fn_est else None,
+        }
+
+
+def evaluate(labelled_dir, box=None, thresholds=(0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)):
+    """
+    Precision/recall of the gate on a labelled frame set.
+    Each positive is scored against a prototype built from the other
+    positives (leave-one-out); negatives against the full prototype.
+    """
+    labelled_dir = Path(labelled_dir)
+
+    def load(folder):
+        images = []
+        for path in sorted((labelled_dir / folder).glob("*.png")):
+            image = Image.open(path)
+            image.load()
+            images.append(image)
+        return images
+
+    pos_images, neg_images = load("results"), load("other")
+    if len(pos_images) < 2:
+        print("Need at least 2 frames in results/ to evaluate")
+        return []
+
+    started = time.perf_counter()
+    positives = [frame_signature(image, box) for image in pos_images]
+    negatives = [frame_signature(image, box) for image in neg_images]
+    total = np.sum(positives, axis=0)
+    pos_scores = [signature_score(sig, (total - sig) / (len(positives) - 1)) for sig in positives]
+    prototype = total / len(positives)
+    neg_scores = [signature_score(sig, prototype) for sig in negatives]
+    per_frame_ms = (time.perf_counter() - started) * 1000 / (len(positives) + len(negatives))
+
+    rows = []
+    for threshold in thresholds:
+        tp = sum(s >= threshold for s in pos_scores)
+        fp = sum(s >= threshold for s in neg_scores)
+        fn = len(pos_scores) - tp
+        rows.append({
+            "threshold": threshold,
+            "precision": tp / (tp + fp) if tp + fp else 0.0,
+            "recall": tp / (tp + fn) if tp + fn else 0.0,
+            "ocr_fraction": (tp + fp) / (len(pos_scores) + len(neg_scores)),
+        })
+
+    print(f"{len(positives)} results frames, {len(negatives)} other frames, "
+          f"{per_frame_ms:.2f} ms/frame gate time")
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7} {'OCR %':>6}")
+    for row in rows:
+        print(f"{row['threshold']:>9.2f} {row['precision']:>9.3f} {row['recall']:>7.3f} {row['ocr_fraction']:>6.1%}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python results_detector.py <labelled_frames_dir> [left,top,right,bottom]")
+        sys.exit(1)
+    crop = tuple(int(v) for v in sys.argv[2].split(',')) if len(sys.argv) == 3 else None
+    evaluate(sys.argv[1], crop)
@@ -0,0 +1,198 @@
+"""
+Results Layout - Parses the results table from tesseract word boxes
+
+parse_race_results() works on flattened text and guesses the table from
+line order and capitalisation. This parser works on image_to_data words
+(see results_region.ocr_words) instead:
+1. A single-pass, precompiled tokenizer cleans and classifies every word
+   (position, runner number, odds, money, word)
+2. Words are grouped into rows by vertical centre, not tesseract's line ids
+3. The horse/jockey column boundary is found from the horizontal gaps
+   shared by all result rows
+4. Each result row becomes a record with per-field confidence; the
+   FORECAST/TRICAST rows yield their combinations and dividends
+
+Records keep the keys parse_race_results() returns (position,
+horse_number, raw_text, full_line) so they can be used interchangeably.
+"""
+
+import re
+from statistics import median
+
+
+# Characters tesseract produces from the overlay's borders and icons
+NOISE_TABLE = str.maketrans({c: None for c in '°|\\/[]{}«»~`=_—'})
+
+# One regex classifies a cleaned token; the named group that matched is its kind
+TOKEN_PATTERN = re.compile(r'''
+    (?P<position>[1-4](?:st|nd|rd|th))$ |
+    (?P<money>£?\d+\.\d{2})$ |
+    (?P<odds>\d{1,3}/\d{1,3}|EVS|EVENS)$ |
+    (?P<combo>\d{1,2}(?:[-x]\d{1,2}){1,2})$ |
+    (?P<number>\d{1,2})$ |
+    (?P<word>[A-Za-z][A-Za-z'.]*)$
+''', re.VERBOSE | re.IGNORECASE)
+
+DIVIDEND_WORDS = {"FORECAST": "forecast", "TRICAST": "tricast"}
+HEADER_WORDS = {"FORM", "RUNNERS", "ODDS", "RAN", "LIVE", "TERMS", "EWTERMS", "FWTERMS", "GARDENS", "GLENVIEW"}
+
+# Rows whose centres are within this fraction of the median word height are merged
+ROW_TOLERANCE = 0.6
+
+
+def tokenize(words):
+    """
+    Clean and classify words in one pass.
+    Returns tokens: dicts with text, kind, conf and box; unclassifiable words are dropped.
+    Odds keep their slash, so they are matched before noise stripping.
+    """
+    tokens = []
+    for word in words:
+        raw = word["text"].strip()
+        match = TOKEN_PATTERN.match(raw)
+        if not match:
+            raw = raw.translate(NOISE_TABLE).strip(".,:;'\"()")
+            match = TOKEN_PATTERN.match(raw) if raw else None
+        if not match:
+            continue
+        tokens.append(dict(word, text=raw, kind=match.lastgroup))
+    return tokens
+
+
+def group_rows(tokens):
+    """Group tokens into rows by vertical centre, each row sorted left to right."""
+    if not tokens:
+        return []
+    tolerance = median(t["bottom"] - t["top"] for t in tokens) * ROW_TOLERANCE
+    rows = []
+    for token in sorted(tokens, key=lambda t: (t["top"] + t["bottom"]) / 2):
+        centre = (token["top"] + token["bottom"]) / 2
+        if rows and abs(centre - rows[-1]["centre"]) <= tolerance:
+            rows[-1]["tokens"].append(token)
+            count = len(rows[-1]["tokens"])
+            rows[-1]["centre"] += (centre - rows[-1]["centre"]) / count
+        else:
+            rows.append({"centre": centre, "tokens": [token]})
+    return [sorted(row["tokens"], key=lambda t: t["left"]) for row in rows]
+
+
+def _number_index(row):
+    """
+    Index of the runner number: the number directly before the first word.
+    Anything earlier (a position, stray digits from the border) is ignored,
+    as in parse_race_results(). Returns None if the row has no such number.
+    """
+    for i, token in enumerate(row):
+        if token["kind"] == "word":
+            return i - 1 if i and row[i - 1]["kind"] == "number" else None
+    return None
+
+
+def _is_result_row(row):
+    """A runner number followed by at least two words, the first mostly uppercase."""
+    index = _number_index(row)
+    if index is None:
+        return False
+    names = [t for t in row[index + 1:] if t["kind"] == "word"]
+    if len(names) < 2:
+        return False
+    if any(t["text"].upper() in HEADER_WORDS or t["text"].upper() in DIVIDEND_WORDS for t in names):
+        return False
+    first = names[0]["text"]
+    return sum(c.isupper() for c in first) >= 2 and len(first) >= 2
+
+
+def _split_x(row):
+    """x where the jockey column starts: the left edge of the word after the widest gap."""
+    names = [t for t in row if t["kind"] == "word"]
+    if len(names) < 2:
+        return None
+    gaps = [(names[i + 1]["left"] - names[i]["right"], names[i + 1]["left"]) for i in range(len(names) - 1)]
+    return max(gaps)[1]
+
+
+def _field(tokens):
+    """Joined text and mean confidence of a column's tokens."""
+    if not tokens:
+        return "", 0.0
+    return " ".join(t["text"] for t in tokens), sum(t["conf"] for t in tokens) / len(tokens)
+
+
+def _parse_dividend(row):
+    """Combination and dividend from a FORECAST/TRICAST row."""
+    combo = [t["text"] for t in row if t["kind"] in ("combo", "number")]
+    money = [t for t in row if t["kind"] == "money"]
+    return {
+        "combination": "-".join(re.split(r'[-x]', "-".join(combo), flags=re.IGNORECASE)) if combo else "",
+        "dividend": money[-1]["text"].lstrip("£") if money else "",
+        "conf": round(sum(t["conf"] for t in row) / len(row), 1),
+    }
+
+
+def parse_results_layout(words, max_positions=4):
+    """
+    Rebuild the results table from image_to_data words.
+    Returns (records, dividends):
+      records   - [{position, horse_number, horse, jockey, odds, raw_text,
+                    full_line, conf, field_conf: {...}}], top max_positions
+      dividends - {"forecast": {...}, "tricast": {...}} for the rows found
+    """
+    rows = group_rows(tokenize(words))
+
+    result_rows, dividends = [], {}
+    for row in rows:
+        for token in row:
+            kind = DIVIDEND_WORDS.get(token["text"].upper())
+            if kind:
+                dividends.setdefault(kind, _parse_dividend(row))
+                break
+        else:
+            if _is_result_row(row):
+                result_rows.append(row)
+
+    # Column boundary shared by all rows: median of each row's widest-gap split
+    splits = [x for x in (_split_x(row) for row in result_rows) if x is not None]
+    jockey_x = median(splits) if splits else None
+
+    records = []
+    for order, row in enumerate(result_rows[:max_positions], 1):
+        index = _number_index(row)
+        position_token = next((t for t in row[:index] if t["kind"] == "position"), None)
+        number_token, rest = row[index], row[index + 1:]
+
+        odds_tokens = [t for t in rest if t["kind"] == "odds"]
+        names = [t for t in rest if t["kind"] == "word"]
+        if jockey_x is not None:
+            horse_tokens = [t for t in names if t["left"] < jockey_x]
+            jockey_tokens = [t for t in names if t["left"] >= jockey_x]
+        else:
+            horse_tokens, jockey_tokens = names, []
+        if not horse_tokens:
+            horse_tokens, jockey_tokens = names[:1], names[1:]
+
+        horse, horse_conf = _field(horse_tokens)
+        jockey, jockey_conf = _field(jockey_tokens)
+        odds, odds_conf = _field(odds_tokens[-1:])
+        position = int(position_token["text"][0]) if position_token else order
+        field_conf = {
+            "position": round(position_token["conf"], 1) if position_token else None,
+            "horse_number": round(number_token["conf"], 1),
+            "horse": round(horse_conf, 1),
+            "jockey": round(jockey_conf, 1),
+            "odds": round(odds_conf, 1) if odds_tokens else None,
+        }
+        known = [c for c in field_conf.values() if c is not None]
+
+        records.append({
+            "position": position,
+            "horse_number": number_token["text"],
+            "horse": horse.upper(),
+            "jockey": jockey,
+            "odds": odds,
+            "raw_text": " ".join(t for t in (horse, jockey) if t),
+            "full_line": " ".join(t["text"] for t in row),
+            "conf": round(sum(known) / len(known), 1),
+            "field_conf": field_conf,
+        })
+
+    return records, dividends
@@ -0,0 +1,229 @@
+"""
+Results Region - Region-of-interest OCR for the results overlay
+
+Running tesseract over the whole 1400x900 frame spends most of its time on the
+video background, player chrome and ads. This module:
+1. Locates the results panel once with a full-frame image_to_data pass, using
+   the FORECAST/TRICAST rows as the anchor (and the "HH:MM GLENVIEW" header
+   as the top edge when it is visible)
+2. Caches the panel bounding box and OCRs only that crop on later frames,
+   cleaned up by an ocr_preprocess preset when one is given
+3. Re-locates the panel when the crop's word confidence drops on a results
+   frame, or after a run of frames where the crop never showed results
+
+Requirements:
+    pip install pytesseract pillow
+"""
+
+import time
+import pytesseract
+from pytesseract import Output
+
+from race_lexicon import user_words_config
+from ocr_preprocess import Preprocessor
+
+
+# Words marking the bottom of the results panel
+ANCHOR_WORDS = ("FORECAST", "TRICAST")
+# Words marking the panel header ("14:00 GLENVIEW GARDENS")
+HEADER_WORDS = ("GLENVIEW", "GLEN")
+
+# Minimum tesseract confidence for a word to count when sizing the panel
+MIN_WORD_CONF = 60
+# Minimum confidence for a FORECAST/TRICAST match to be trusted as an anchor
+MIN_ANCHOR_CONF = 40
+
+# Padding around the detected panel, as a fraction of the frame size
+PANEL_PADDING = 0.02
+# Extra room above the anchors when the header was not found (fraction of frame height)
+HEADER_FALLBACK = 0.35
+
+# Mean word confidence on a results crop below which the panel is re-located
+RELOCATE_CONF = 55
+# Consecutive crop frames without results before a full-frame pass is forced
+RELOCATE_AFTER_MISSES = 12
+
+
+def ocr_words(image, config=""):
+    """
+    Run image_to_data and return the recognised words as dicts with
+    text, conf, box edges and the (block, par, line) they belong to.
+    """
+    data = pytesseract.image_to_data(image, config=config, output_type=Output.DICT)
+    words = []
+    for i, text in enumerate(data["text"]):
+        text = text.strip()
+        if not text:
+            continue
+        conf = float(data["conf"][i])
+        if conf < 0:
+            continue
+        left, top = data["left"][i], data["top"][i]
+        words.append({
+            "text": text,
+            "conf": conf,
+            "left": left,
+            "top": top,
+            "right": left + data["width"][i],
+            "bottom": top + data["height"][i],
+            "line": (data["block_num"][i], data["par_num"][i], data["line_num"][i]),
+        })
+    return words
+
+
+def frame_text(image, preprocessor=None, config=""):
+    """
+    image_to_string over a whole frame (no cached box). A preprocessor
+    (ocr_preprocess.Preprocessor) binarises the frame and puts its config
+    in front of config. The inline and the worker OCR paths both use this.
+    """
+    if preprocessor:
+        image, config = preprocessor.apply(image), f"{preprocessor.config} {config}".strip()
+    else:
+        image = image.convert('L')
+    return pytesseract.image_to_string(image, config=config).strip()
+
+
+def words_to_text(words):
+    """Rebuild image_to_string-style text (one line per tesseract line) from words."""
+    lines = []
+    current = None
+    for word in words:
+        if word["line"] != current:
+            lines.append([])
+            current = word["line"]
+        lines[-1].append(word["text"])
+    return "\n".join(" ".join(line) for line in lines)
+
+
+def _matches(word, targets):
+    upper = word["text"].upper()
+    return any(target in upper for target in targets)
+
+
+def find_anchors(words, min_conf=MIN_ANCHOR_CONF):
+    """FORECAST/TRICAST words with at least min_conf confidence."""
+    return [w for w in words if w["conf"] >= min_conf and _matches(w, ANCHOR_WORDS)]
+
+
+def locate_results_panel(words, size):
+    """
+    Work out the results panel box from full-frame words.
+    Returns ((left, top, right, bottom), confidence) or None when no anchor is visible.
+    """
+    anchors = find_anchors(words)
+    if not anchors:
+        return None
+
+    width, height = size
+    bottom = max(w["bottom"] for w in anchors)
+    anchor_top = min(w["top"] for w in anchors)
+
+    headers = [w for w in words
+               if w["conf"] >= MIN_ANCHOR_CONF and _matches(w, HEADER_WORDS) and w["bottom"] <= anchor_top]
+    if headers:
+        top = min(w["top"] for w in headers)
+    else:
+        top = max(0, anchor_top - int(height * HEADER_FALLBACK))
+
+    # Horizontal extent: confident words between header and anchors
+    panel_words = [w for w in words
+                   if w["conf"] >= MIN_WORD_CONF and w["top"] >= top and w["bottom"] <= bottom]
+    panel_words += anchors + headers
+    left = min(w["left"] for w in panel_words)
+    right = max(w["right"] for w in panel_words)
+
+    pad_x, pad_y = int(width * PANEL_PADDING), int(height * PANEL_PADDING)
+    box = (max(0, left - pad_x), max(0, top - pad_y),
+           min(width, right + pad_x), min(height, bottom + pad_y))
+    confidence = sum(w["conf"] for w in anchors) / len(anchors)
+    return box, confidence
+
+
+class ResultsRegion:
+    """Cached results-panel box plus the OCR path that uses it."""
+
+    def __init__(self, user_words=False, preset=None):
+        self.user_words = user_words  # pass race-card words to tesseract (race_lexicon)
+        self.preprocessor = Preprocessor(preset) if preset else None  # crop passes only
+        self.box = None
+        self.confidence = 0.0
+        self.misses = 0
+
+        # Stats
+        self.full_passes = 0
+        self.crop_passes = 0
+        self.full_ms = 0.0
+        self.crop_ms = 0.0
+
+    def reset(self):
+        """Forget the cached box (e.g. after a browser restart)."""
+        self.box = None
+        self.confidence = 0.0
+        self.misses = 0
+
+    def _config(self, preset=False):
+        parts = [self.preprocessor.config if preset and self.preprocessor else "",
+                 user_words_config() if self.user_words else ""]
+        return " ".join(part for part in parts if part)
+
+    def _full_frame(self, image):
+        started = time.perf_counter()
+        words = ocr_words(image, self._config())
+        self.full_ms += (time.perf_counter() - started) * 1000
+        self.full_passes += 1
+
+        found = locate_results_panel(words, image.size)
+        if found:
+            self.box, self.confidence = found
+            self.misses = 0
+            print(f"🎯 Results panel located at {self.box} (anchor conf {self.confidence:.0f})")
+        return words_to_text(words)
+
+    def ocr(self, image):
+        """
+        OCR a frame, using only the cached panel crop when one is known.
+        Falls back to a full-frame pass (which also re-locates the panel)
+        when there is no box yet, the crop looks wrong, or results have
+        not been seen in the crop for RELOCATE_AFTER_MISSES frames.
+        Returns the extracted text.
+        """
+        image = image.convert('L')
+
+        if self.box is None:
+            return self._full_frame(image)
+
+        started = time.perf_counter()
+        if self.preprocessor:
+            crop = self.preprocessor.apply(image, self.box)
+        else:
+            crop = image.crop(self.box)
+        words = ocr_words(crop, self._config(preset=True))
+        self.crop_ms += (time.perf_counter() - started) * 1000
+        self.crop_passes += 1
+
+        if find_anchors(words):
+            self.misses = 0
+            mean_conf = sum(w["conf"] for w in words) / len(words)
+            if mean_conf >= RELOCATE_CONF:
+                return words_to_text(words)
+            print(f"⚠️ Results crop confidence {mean_conf:.0f} < {RELOCATE_CONF}, re-locating panel")
+            return self._full_frame(image)
+
+        self.misses += 1
+        if self.misses >= RELOCATE_AFTER_MISSES:
+            print(f"⚠️ No results in panel crop for {self.misses} frames, re-locating panel")
+            self.misses = 0
+            return self._full_frame(image)
+        return words_to_text(words)
+
+    def stats(self):
+        """Average OCR milliseconds for full-frame and crop passes."""
+        return {
+            "box": self.box,
+            "full_passes": self.full_passes,
+            "crop_passes": self.crop_passes,
+            "full_ms_avg": round(self.full_ms / self.full_passes, 1) if self.full_passes else 0.0,
+            "crop_ms_avg": round(self.crop_ms / self.crop_passes, 1) if self.crop_passes else 0.0,
+            "preprocess_ms": self.preprocessor.stats() if self.preprocessor else {},
+        }
@@ -0,0 +1,141 @@
+"""
+Results Text - Parsers for OCR'd results-screen text
+
+Pure functions shared by the live scraper (selenium_scraper.py) and the
+offline replay benchmark (replay_bench.py):
+- is_results_screen: does the text show a results overlay
+- extract_race_time_from_ocr: the UK race time from the overlay header
+- parse_race_results: top-4 (position, horse_number, name) from text lines
+"""
+
+import re
+
+
+def is_results_screen(text):
+    """
+    Detect if the current screen shows race results.
+    Look for FORECAST/TRICAST (betting payouts) which indicate results.
+    """
+    # Strong indicators of results screen (betting payouts)
+    strong_indicators = ['forecast', 'tricast']
+    # Also check for position indicators
+    position_indicators = ['1st', '2nd', '3rd', 'winner']
+    
+    text_lower = text.lower()
+    
+    # Check for strong indicators first
+    for indicator in strong_indicators:
+        if indicator in text_lower:
+            return True
+    
+    # Check for position indicators
+    for indicator in position_indicators:
+        if indicator in text_lower:
+            return True
+    
+    return False
+
+
+def extract_race_time_from_ocr(text):
+    """
+    Extract race time from OCR text.
+    Handles various OCR formats:
+    - "14:00 GLENVIEW GARDENS" (normal)
+    - "14 00 GLENVIEW GARDENS" (space instead of colon)
+    - "14  02 GLENVIEW GARDENS" (double space)
+    - "1400 GLENVIEW" (no separator)
+    Returns the time in HH:MM format or empty string if not found.
+    """
+    # Patterns to match time before GLENVIEW (or variations)
+    # Order from most specific to least specific
+    patterns = [
+        r'(\d{1,2})\s*:\s*(\d{2})\s*(?:GLENVIEW|GI\.?ENVIEW|GLEN)',  # 14:00 or 14 : 00
+        r'(\d{1,2})\s+(\d{2})\s+(?:GLENVIEW|GI\.?ENVIEW|GLEN)',       # 14 00 or 14  02 (spaces)
+        r'(\d{2})(\d{2})\s*(?:GLENVIEW|GI\.?ENVIEW|GLEN)',            # 1400 (no separator)
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            hours = int(match.group(1))
+            minutes = int(match.group(2))
+            if 0 <= hours <= 23 and 0 <= minutes <= 59:
+                return f"{hours:02d}:{minutes:02d}"
+    
+    return ""
+
+
+# parse_race_results patterns, compiled once
+# Lines that are clearly not results (race info, headers, etc.)
+SKIP_LINE_PATTERN = re.compile(
+    r'FORECAST|TRICAST|FORM|RUNNERS|EWTERMS|ODDS|RAN|LIVE|GARDENS|FWTERMS|TERMS', re.IGNORECASE)
+# Race time/name lines (e.g., "11:50 GLENVIEW...")
+RACE_TIME_LINE_PATTERN = re.compile(r'^\s*=?\s*\d{1,2}\s*:?\s*\d{2}')
+# Any non-digit/letter chars, then digit(s), then space(s), then name
+HORSE_LINE_PATTERN = re.compile(r'[^A-Za-z0-9]*(\d{1,2})\s+([A-Za-z][A-Za-z\s]+)')
+# OCR artifacts replaced with spaces
+OCR_NOISE_TABLE = str.maketrans({c: ' ' for c in '°|\\/[]{}«»~`'})
+
+
+def parse_race_results(text):
+    """
+    Parse race results from OCR text.
+    
+    The OCR output format shows results as:
+    - Lines with horse number, horse name (CAPS), jockey name (CAPS/mixed)
+    - Example: "6 JONNYS STREET DECIAN BARK" or "/8 4 CHOPSTICKS BRIAN MYERS"
+    
+    Returns a list of result entries.
+    """
+    results = []
+    position = 0  # Track position (1st, 2nd, 3rd, 4th based on order)
+    
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        
+        # Skip lines that are clearly not results (race info, headers, etc.)
+        if SKIP_LINE_PATTERN.search(line):
+            continue
+        
+        # Skip lines that look like race time/name (e.g., "11:50 GLENVIEW...")
+        if RACE_TIME_LINE_PATTERN.match(line):
+            continue
+        
+        # Skip very short lines or lines that are just symbols
+        if len(line) < 5:
+            continue
+        
+        # Clean up OCR noise (one translate pass) and normalize spaces
+        clean_line = ' '.join(line.translate(OCR_NOISE_TABLE).split())
+        
+        # Look for horse entries
+        match = HORSE_LINE_PATTERN.search(clean_line)
+        if match:
+            horse_number = match.group(1)
+            horse_info = match.group(2).strip()
+            
+            # Need at least 2 words (horse name + jockey)
+            words = horse_info.split()
+            if len(words) >= 2:
+                # Validate: horse name must have at least 2 consecutive uppercase letters
+                # (reduced from 3 since some names are short like "JAKE")
+                first_word = words[0]
+                uppercase_count = sum(1 for c in first_word if c.isupper())
+                
+                # Horse name should be mostly uppercase (at least 2 uppercase letters)
+                if uppercase_count >= 2 and len(first_word) >= 2:
+                    position += 1
+                    results.append({
+                        'position': position,
+                        'horse_number': horse_number,
+                        'raw_text': horse_info,
+                        'full_line': line
+                    })
+                    
+                    # Only get top 4 results
+                    if position >= 4:
+                        break
+    
+    return results
@@ -5,15 +5,16 @@ This script:
 1. Opens Firefox browser
 2. Navigates to Paddy Power Virtual Horse Racing
 3. Continuously scrapes race data (runners, jockeys, odds)
-4. Saves to CSV with one race per row
+4. Saves to the API and the local race store (race_store.py)
+
+New races are picked up from a MutationObserver installed in the page,
+so a card is scraped as soon as its tab appears rather than on a poll.
 
 Requirements:
     pip install selenium webdriver-manager
 """
 
 import time
-import csv
-import requests
 import os
 from datetime import datetime
 from selenium import webdriver
@@ -22,21 +23,48 @@ from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException
 from webdriver_manager.firefox import GeckoDriverManager
+from outbox import Outbox, format_stats
+from race_store import RaceStore
+from race_schedule import write_schedule, ist_to_uk
+from race_lexicon import write_race_card
+from feed_capture import install_feed_capture, hook_current_page, drain_feed, parse_feed_responses
+
+
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")   # change if deployed
+
+# Site to scrape; point at fake_site.py (e.g. http://localhost:8800) for offline runs
+BASE_URL = os.environ.get("PADDY_BASE_URL", "https://www.paddypower.com").rstrip("/")
+
+# "dom" scrapes the rendered race card; "network" reads cards from the site's
+# XHR/WebSocket feed and only falls back to the DOM for races the feed missed
+CAPTURE_MODE = "dom"
+
+# Set to a directory to record captured feed responses as offline fixtures
+FEED_RECORD_DIR = None
+
+_outbox = None
+_store = None
 
 
-CSV_FILE = "races.csv"
+def get_outbox():
+    """Races outbox, created and started on first use."""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox("races", BACKEND_URL).start()
+    return _outbox
 
-BACKEND_URL = "http://localhost:5000"   # change if deployed
 
 def save_to_api(race_data):
     """
-    Send race runners data to backend API (Postgres insert).
+    Queue race runners data for the backend API (Postgres insert).
     race_data format is same as your scraper.
+    The payload is journaled to the local outbox and sent in the background.
     """
     try:
         race_time_ist = race_data["race_time"]
-        race_time_uk = convert_ist_to_uk(race_time_ist)
+        race_time_uk = uk_race_time(race_data)
 
         payload = {
             "race_time": race_time_ist,
@@ -60,120 +88,325 @@ def save_to_api(race_data):
                 "odds": runner.get("odds", "N/A")
             })
 
-        res = requests.post(f"{BACKEND_URL}/api/races", json=payload, timeout=15)
-
-        if res.status_code in (200, 201):
-            print("✅ Race inserted into DB successfully")
-        else:
-            print(f"❌ Failed to insert race | Status: {res.status_code} | {res.text}")
+        outbox = get_outbox()
+        outbox.put(payload)
+        print("📬 Race queued for DB insert")
+        print(format_stats(outbox))
 
     except Exception as e:
-        print(f"❌ Error sending race to API: {e}")
+        print(f"❌ Error queueing race for API: {e}")
 
 def convert_ist_to_uk(time_str):
     """
     Convert IST time (HH:MM) to UK time.
-    UK is 5:30 hours behind IST.
+    UK is 5:30 hours behind IST in winter and 4:30 during BST (race_schedule.ist_to_uk).
     """
-    try:
-        # Parse time (assuming HH:MM format)
-        parts = time_str.strip().split(':')
-        if len(parts) != 2:
-            return time_str
-        
-        hours = int(parts[0])
-        minutes = int(parts[1])
-        
-        # Convert to total minutes, subtract 5:30 (330 minutes)
-        total_minutes = hours * 60 + minutes - 330
-        
-        # Handle day wraparound
-        if total_minutes < 0:
-            total_minutes += 24 * 60
-        
-        uk_hours = total_minutes // 60
-        uk_minutes = total_minutes % 60
-        
-        return f"{uk_hours:02d}:{uk_minutes:02d}"
-    except:
-        return time_str
+    return ist_to_uk(time_str)
+
+
+def get_store():
+    """Local race store, opened on first use."""
+    global _store
+    if _store is None:
+        _store = RaceStore()
+    return _store
+
+
+def uk_race_time(race_data):
+    """
+    UK start time of a race. Feed races carry it, converted from the feed's
+    absolute timestamp; DOM races only have the IST tab time. Both follow
+    race_schedule's time convention.
+    """
+    return race_data.get("race_time_uk") or convert_ist_to_uk(race_data["race_time"])
 
 
-def save_to_csv(race_data):
+def save_to_store(race_data):
     """
-    Save race data to CSV with one race per row.
-    Columns are based on runner number: name_1, jockey_1, odds_1, name_2, etc.
+    Save the race card to the local store (races + runners tables).
+    Re-saving the same race updates its runners, so odds moves land in place.
     Includes both IST race_time and UK race_time_uk for result matching.
     """
-    file_exists = os.path.isfile(CSV_FILE)
-    
-    # Convert race time from IST to UK
-    race_time_ist = race_data["race_time"]
-    race_time_uk = convert_ist_to_uk(race_time_ist)
-    
-    # Build the row data using runner numbers as identifiers
-    row = {
-        "race_time": race_time_ist,
-        "race_time_uk": race_time_uk,
-        "scraped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "runner_count": len(race_data["runners"])
+    try:
+        get_store().save_race(race_data["race_time"], uk_race_time(race_data), race_data["runners"])
+        print(f"Data saved to {get_store().path.name} ({len(race_data['runners'])} runners)")
+    except Exception as e:
+        print(f"⚠️ Could not save race to store: {e}")
+
+# Selectors tried in order for each runner field. The first one that matches
+# wins; which one matched is reported back so DOM drift shows up in the logs.
+RUNNER_SELECTORS = {
+    "name": [".racing-runner__selection-name", ".racing-runner__title"],
+    "number": [".racing-runner__number"],
+    "jockey": [".racing-runner__item .label-value__value"],
+    "odds": [".btn-odds__label"],
+}
+
+# Extracts the whole race card in one WebDriver round trip.
+# arguments[0] = RUNNER_SELECTORS
+RACE_CARD_JS = """
+const selectors = arguments[0];
+const started = performance.now();
+const hits = {};
+for (const field of Object.keys(selectors)) {
+  hits[field] = {};
+  for (const sel of selectors[field]) hits[field][sel] = 0;
+  hits[field]["N/A"] = 0;
+}
+const text = (el) => (el.innerText || el.textContent || "").trim();
+const runners = [];
+for (const el of document.querySelectorAll(".racing-runner")) {
+  const runner = {};
+  for (const field of Object.keys(selectors)) {
+    let value = "N/A";
+    let matched = "N/A";
+    for (const sel of selectors[field]) {
+      const node = el.querySelector(sel);
+      if (node) { value = text(node); matched = sel; break; }
     }
+    runner[field] = value;
+    hits[field][matched] += 1;
+  }
+  const extra = {};
+  for (const item of el.querySelectorAll(".label-value")) {
+    const label = item.querySelector(".label-value__label");
+    const value = item.querySelector(".label-value__value");
+    if (label && value) extra[text(label).toLowerCase()] = text(value);
+  }
+  for (const [key, value] of Object.entries(el.dataset || {})) extra[key] = value;
+  const silk = el.querySelector("img");
+  if (silk && silk.getAttribute("src")) extra.silk = silk.getAttribute("src");
+  runner.extra = extra;
+  runners.push(runner);
+}
+return {runners: runners, selector_hits: hits, js_ms: performance.now() - started};
+"""
+
+# Set to False to fall back to the old one-find_element-per-field extraction
+BULK_EXTRACT = True
+
+
+def extract_runners_per_element(driver):
+    """
+    Legacy extraction: one find_element call per runner field.
+    Kept as a fallback for when the injected script fails.
+    """
+    runners_data = []
+    hits = {field: {} for field in RUNNER_SELECTORS}
     
-    # Add each runner's data with their number as the column identifier
-    for runner in race_data["runners"]:
-        num = runner["number"]
-        row[f"name_{num}"] = runner["name"]
-        row[f"jockey_{num}"] = runner["jockey"]
-        row[f"odds_{num}"] = runner["odds"]
-    
-    # Read existing file to get all column names (runners can vary from 9-16)
-    existing_columns = set()
-    if file_exists:
-        with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            existing_columns = set(reader.fieldnames or [])
+    for runner in driver.find_elements(By.CSS_SELECTOR, ".racing-runner"):
+        entry = {"extra": {}}
+        for field, selectors in RUNNER_SELECTORS.items():
+            value, matched = "N/A", "N/A"
+            for sel in selectors:
+                try:
+                    value = runner.find_element(By.CSS_SELECTOR, sel).text
+                    matched = sel
+                    break
+                except:
+                    continue
+            entry[field] = value
+            hits[field][matched] = hits[field].get(matched, 0) + 1
+        runners_data.append(entry)
     
-    # Merge existing columns with new columns
-    all_columns = existing_columns.union(set(row.keys()))
+    return runners_data, hits
+
+
+def extract_race_card(driver, race_time):
+    """
+    Extract every runner on the current race card.
+    Uses a single execute_script call in bulk mode instead of
+    four find_element round trips per runner.
     
-    # Sort columns: race_time first, then runner columns by number (name, jockey, odds order)
-    base_cols = ["race_time", "race_time_uk", "runner_count", "scraped_at"]
+    Returns race_data with "runners", "selector_hits" and "extract_ms".
+    """
+    started = time.perf_counter()
+    card = None
     
-    # Custom sort: first by runner number, then by field type (name first, then jockey, then odds)
-    field_order = {'name': 0, 'jockey': 1, 'odds': 2}
-    runner_cols = sorted(
-        [c for c in all_columns if c not in base_cols],
-        key=lambda x: (
-            int(x.split('_')[-1]) if x.split('_')[-1].isdigit() else 999,
-            field_order.get(x.rsplit('_', 1)[0], 999)
-        )
-    )
-    fieldnames = base_cols + runner_cols
+    if BULK_EXTRACT:
+        try:
+            card = driver.execute_script(RACE_CARD_JS, RUNNER_SELECTORS)
+        except Exception as e:
+            print(f"⚠️ Bulk extraction failed ({e}), falling back to per-element")
     
-    # Read existing data
-    existing_rows = []
-    if file_exists:
-        with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            existing_rows = list(reader)
+    if card:
+        runners, hits = card["runners"], card["selector_hits"]
+    else:
+        runners, hits = extract_runners_per_element(driver)
     
-    # Write all data back with updated columns
-    with open(CSV_FILE, mode='w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        
-        # Write existing rows
-        for existing_row in existing_rows:
-            writer.writerow(existing_row)
-        
-        # Write new row
-        writer.writerow(row)
+    return {
+        "race_time": race_time,
+        "runners": runners,
+        "selector_hits": hits,
+        "extract_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+def report_selector_hits(selector_hits, runner_count):
+    """
+    Print which selectors matched for each runner field.
+    Warns when a field fell through to N/A, which usually means the
+    site's class names changed.
+    """
+    for field, hits in selector_hits.items():
+        matched = ", ".join(f"{sel}={n}" for sel, n in hits.items() if n and sel != "N/A")
+        missed = hits.get("N/A", 0)
+        line = f"   {field}: {matched or 'no selector matched'}"
+        if missed:
+            line += f" | ⚠️ {missed}/{runner_count} missing"
+        print(line)
+
+
+# Page-side watcher: a MutationObserver that queues tab-list and runner-list
+# changes and hands them to a pending execute_async_script callback.
+# Idempotent, so it is safe to call again after a refresh. Returns the
+# title of the last (latest) race tab.
+RACE_WATCH_JS = """
+const lastTab = () => {
+  const titles = document.querySelectorAll(".virtuals-sport__tabs .abc-tab .tab__title");
+  return titles.length ? titles[titles.length - 1].textContent.trim() : null;
+};
+if (!window.__raceWatch) {
+  const state = {events: [], waiter: null, lastTab: lastTab(), lastRunnerChange: 0};
+  const push = (kind) => {
+    state.events.push({kind: kind, last_tab: state.lastTab, at: Date.now()});
+    if (state.events.length > 200) state.events.shift();
+    if (state.waiter) {
+      const waiter = state.waiter;
+      state.waiter = null;
+      waiter(state.events.splice(0));
+    }
+  };
+  const hasRunner = (node) => node.nodeType === 1 &&
+    (node.matches(".racing-runner") || node.querySelector(".racing-runner"));
+  state.observer = new MutationObserver((mutations) => {
+    let runners = false;
+    for (const m of mutations) {
+      const target = m.target.nodeType === 1 ? m.target : m.target.parentElement;
+      if (target && target.closest(".racing-runner")) { runners = true; break; }
+      if ([...m.addedNodes, ...m.removedNodes].some(hasRunner)) { runners = true; break; }
+    }
+    const tab = lastTab();
+    if (tab !== state.lastTab) {
+      state.lastTab = tab;
+      push("tabs");
+    }
+    if (runners) {
+      state.lastRunnerChange = performance.now();
+      push("runners");
+    }
+  });
+  state.observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+  window.__raceWatch = state;
+}
+return lastTab();
+"""
+
+# Resolves with the queued watcher events, [] on timeout, or null when the
+# watcher is gone (page navigated) and needs reinstalling.
+# arguments[0] = timeout in ms
+WAIT_RACE_EVENTS_JS = """
+const done = arguments[arguments.length - 1];
+const state = window.__raceWatch;
+if (!state) { done(null); return; }
+if (state.events.length) { done(state.events.splice(0)); return; }
+const timer = setTimeout(() => { state.waiter = null; done([]); }, arguments[0]);
+state.waiter = (events) => { clearTimeout(timer); done(events); };
+"""
+
+# True once runners are on the page and the runner list has been quiet for
+# arguments[1] ms after arguments[0] (a performance.now() taken before the click).
+RUNNERS_READY_JS = """
+const since = arguments[0], settle = arguments[1];
+if (!document.querySelector(".racing-runner")) return false;
+const state = window.__raceWatch;
+if (!state) return true;
+const now = performance.now();
+const changed = state.lastRunnerChange >= since || now - since > 1500;
+return changed && now - state.lastRunnerChange >= settle;
+"""
+
+# How long to block waiting for a page change before re-checking timeouts (seconds)
+WATCH_TIMEOUT = 30
+
+# Runner list must be quiet this long before it is read (milliseconds)
+RUNNERS_SETTLE_MS = 300
+
+# Minimum gap between re-submitting the same race on odds changes (seconds)
+ODDS_RESUBMIT_INTERVAL = 10
+
+
+def install_race_watcher(driver):
+    """Install the page MutationObserver (if needed) and return the latest tab title."""
+    return driver.execute_script(RACE_WATCH_JS)
+
+
+def wait_for_race_events(driver, timeout=WATCH_TIMEOUT):
+    """
+    Block until the page watcher reports a tab or runner change.
+    Returns a list of events, [] on timeout, or None if the watcher is missing.
+    """
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(WAIT_RACE_EVENTS_JS, int(timeout * 1000))
+
+
+def click_latest_tab(driver, wait):
+    """Click the last race tab and wait until its runner card has settled."""
+    tabs = driver.find_elements(By.CSS_SELECTOR, ".virtuals-sport__tabs .abc-tab")
+    if not tabs:
+        return False
     
-    print(f"Data saved to {CSV_FILE} (1 row with {len(race_data['runners'])} runners)")
+    since = driver.execute_script("return performance.now();")
+    tabs[-1].click()
+    wait.until(lambda d: d.execute_script(RUNNERS_READY_JS, since, RUNNERS_SETTLE_MS))
+    return True
+
+
+TAB_TIMES_JS = """
+return [...document.querySelectorAll(".virtuals-sport__tabs .abc-tab .tab__title")]
+  .map((el) => el.textContent.trim());
+"""
+
+
+def publish_schedule(driver):
+    """Write every race tab's UK start time to race_schedule.json for the results scraper."""
+    try:
+        tab_times = driver.execute_script(TAB_TIMES_JS)
+        write_schedule([convert_ist_to_uk(t) for t in tab_times if t])
+    except Exception as e:
+        print(f"⚠️ Could not publish race schedule: {e}")
+
+
+def publish_race_card(race_data):
+    """Write the card to race_cards.json so the results scraper can check OCR'd names against it."""
+    try:
+        write_race_card(uk_race_time(race_data), race_data["runners"])
+    except Exception as e:
+        print(f"⚠️ Could not publish race card: {e}")
+
+
+def odds_snapshot(race_data):
+    """Number -> odds mapping used to spot late odds moves on the current card."""
+    return {r.get("number"): r.get("odds") for r in race_data["runners"]}
+
 
 # Configuration for auto-restart
 RESTART_TIMEOUT = 240  # 4 minutes - restart if no new data for this long
 
+# After a loop error: wait this long before trying again, doubling up to ERROR_BACKOFF_MAX
+ERROR_BACKOFF = 5
+ERROR_BACKOFF_MAX = 60
+
+# Wait before looking again when the page shows no race tabs
+NO_TABS_WAIT = 5
+
+
+def navigate(driver, url):
+    """driver.get() that puts the feed hook back in the new page in network mode."""
+    driver.get(url)
+    if CAPTURE_MODE == "network":
+        hook_current_page(driver)
+
 
 def run_scraper_session():
     """
@@ -187,6 +420,8 @@ def run_scraper_session():
     firefox_options = Options()
     firefox_options.add_argument("--width=1400")
     firefox_options.add_argument("--height=900")
+    if CAPTURE_MODE == "network":
+        firefox_options.set_capability("webSocketUrl", True)  # Enable BiDi
     
     # Initialize Firefox driver
     print("Starting Firefox browser...")
@@ -194,12 +429,16 @@ def run_scraper_session():
     driver = webdriver.Firefox(service=service, options=firefox_options)
     driver.set_window_size(1400, 900)
     
-    target_url = "https://www.paddypower.com/horse-racing?tab=virtuals"
+    target_url = f"{BASE_URL}/horse-racing?tab=virtuals"
+    feed_races = {}  # race_time -> race_data captured from the network feed
     
     try:
+        if CAPTURE_MODE == "network":
+            install_feed_capture(driver)
+        
         # Navigate to home page first to initialize session
         print("Navigating to home page first to initialize session...")
-        driver.get("https://www.paddypower.com/")
+        navigate(driver, f"{BASE_URL}/")
         time.sleep(5)
         
         # Handle cookie consent if it appears
@@ -216,7 +455,7 @@ def run_scraper_session():
         max_retries = 3
         for attempt in range(max_retries):
             print(f"Navigating to target: {target_url} (attempt {attempt + 1}/{max_retries})...")
-            driver.get(target_url)
+            navigate(driver, target_url)
             time.sleep(5)
             
             current_url = driver.current_url
@@ -226,20 +465,24 @@ def run_scraper_session():
                 print("Successfully navigated to virtuals page!")
                 break
             
-            if current_url.endswith("/bet") or current_url == "https://www.paddypower.com/":
+            if current_url.endswith("/bet") or current_url == f"{BASE_URL}/":
                 print("Redirected to bet/home page, retrying...")
             else:
                 print(f"On unexpected page: {current_url}")
                 time.sleep(2)
         
-        # Wait a bit more for page to fully load
-        time.sleep(5)
+        # Wait for the race tabs instead of a fixed delay
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, ".virtuals-sport__tabs")))
         
         print(f"\n⚠️ Auto-refresh if no new data for {RESTART_TIMEOUT // 60} minutes")
         print(f"   Browser restart after 2 consecutive refreshes without data")
         
         refresh_count = 0  # Track consecutive refreshes without new data
         MAX_REFRESHES = 2  # Restart browser after this many refreshes without data
+        last_odds = {}  # Odds last submitted for the current race
+        last_submit = 0
+        error_backoff = ERROR_BACKOFF
         
         # Main scraping loop
         while True:
@@ -255,15 +498,13 @@ def run_scraper_session():
                 
                 try:
                     # First try to navigate to the target URL
-                    driver.get(target_url)
-                    time.sleep(5)
+                    navigate(driver, target_url)
                     
                     # Verify we're on the right page
                     current_url = driver.current_url
                     if "virtuals" not in current_url:
                         print(f"Not on virtuals page ({current_url}). Navigating...")
-                        driver.get(target_url)
-                        time.sleep(5)
+                        navigate(driver, target_url)
                     
                     print("✅ Page refreshed, continuing...")
                     last_data_time = time.time()  # Reset timeout for next refresh check
@@ -272,85 +513,92 @@ def run_scraper_session():
                     return True  # Signal to restart browser
             
             try:
-                print("\nChecking for latest race...")
-                
                 # Wait for tabs to be visible
                 wait = WebDriverWait(driver, 30)
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".virtuals-sport__tabs")))
                 
-                # Get all tabs
-                tabs = driver.find_elements(By.CSS_SELECTOR, ".virtuals-sport__tabs .abc-tab")
+                # (Re)install the page watcher; it survives until the next navigation
+                race_time = install_race_watcher(driver)
+                error_backoff = ERROR_BACKOFF  # The page is alive again
+                
+                if CAPTURE_MODE == "network":
+                    feed_races.update(parse_feed_responses(drain_feed(driver, FEED_RECORD_DIR)))
+                    for stale in list(feed_races)[:-50]:
+                        del feed_races[stale]
                 
-                if len(tabs) > 0:
-                    # Click the last tab to get the latest race
-                    last_tab = tabs[-1]
-                    race_time_elem = last_tab.find_element(By.CSS_SELECTOR, ".tab__title")
-                    race_time = race_time_elem.text.strip()
+                if race_time and race_time != last_race_time:
+                    print(f"\nFound new race at: {race_time}")
+                    publish_schedule(driver)
                     
-                    if race_time == last_race_time:
-                        print(f"Race at {race_time} already scraped. Waiting for new race...")
+                    if race_time in feed_races:
+                        race_data = feed_races.pop(race_time)
+                        print(f"Found {len(race_data['runners'])} runners in network feed.")
                     else:
-                        print(f"Found new race at: {race_time}")
-                        last_tab.click()
-                        time.sleep(3)
+                        # DOM scraping fallback
+                        if not click_latest_tab(driver, wait):
+                            print(f"No race tabs found, retrying in {NO_TABS_WAIT}s...")
+                            time.sleep(NO_TABS_WAIT)
+                            continue
                         
-                        # Wait for runners to appear
-                        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".racing-runner")))
-                        time.sleep(2)
-                        
-                        race_data = {"race_time": race_time, "runners": []}
-                        
-                        runners = driver.find_elements(By.CSS_SELECTOR, ".racing-runner")
-                        print(f"Found {len(runners)} runners.")
-                        
-                        for runner in runners:
-                            try:
-                                name = runner.find_element(By.CSS_SELECTOR, ".racing-runner__selection-name").text
-                            except:
-                                try:
-                                    name = runner.find_element(By.CSS_SELECTOR, ".racing-runner__title").text
-                                except:
-                                    name = "N/A"
-                            try:
-                                number = runner.find_element(By.CSS_SELECTOR, ".racing-runner__number").text
-                            except:
-                                number = "N/A"
-                            try:
-                                jockey = runner.find_element(By.CSS_SELECTOR, ".racing-runner__item .label-value__value").text
-                            except:
-                                jockey = "N/A"
-                            try:
-                                odds = runner.find_element(By.CSS_SELECTOR, ".btn-odds__label").text
-                            except:
-                                odds = "N/A"
-                            
-                            race_data["runners"].append({
-                                "number": number,
-                                "name": name,
-                                "jockey": jockey,
-                                "odds": odds
-                            })
-
-                        # Save to API
-                        save_to_api(race_data)
-                        last_race_time = race_time
-                        last_data_time = time.time()  # Reset timeout counter
-                        refresh_count = 0  # Reset refresh counter on new data
-                else:
+                        race_data = extract_race_card(driver, race_time)
+                        print(f"Found {len(race_data['runners'])} runners "
+                              f"in {race_data['extract_ms']:.1f} ms.")
+                        report_selector_hits(race_data["selector_hits"], len(race_data["runners"]))
+                    
+                    # Save to API
+                    save_to_api(race_data)
+                    save_to_store(race_data)
+                    publish_race_card(race_data)
+                    last_race_time = race_time
+                    last_odds = odds_snapshot(race_data)
+                    last_submit = time.time()
+                    last_data_time = time.time()  # Reset timeout counter
+                    refresh_count = 0  # Reset refresh counter on new data
+                    continue
+                
+                if not race_time:
                     print("No race tabs found.")
+                
+                # Block until the page reports a change instead of polling
+                events = wait_for_race_events(driver)
+                if events is None:
+                    print("Page watcher lost (page reloaded?), reinstalling...")
+                    continue
+                
+                # Runner-only changes on the current card: pick up late odds moves
+                kinds = {e["kind"] for e in events}
+                if kinds == {"runners"} and last_race_time and \
+                        time.time() - last_submit >= ODDS_RESUBMIT_INTERVAL:
+                    wait.until(lambda d: d.execute_script(RUNNERS_READY_JS, 0, RUNNERS_SETTLE_MS))
+                    race_data = extract_race_card(driver, last_race_time)
+                    odds = odds_snapshot(race_data)
+                    if race_data["runners"] and odds != last_odds:
+                        print(f"Odds changed for race {last_race_time}, re-submitting...")
+                        save_to_api(race_data)
+                        save_to_store(race_data)
+                        last_odds = odds
+                        last_submit = time.time()
                     
+            except (InvalidSessionIdException, NoSuchWindowException) as e:
+                print(f"❌ Browser session lost ({e.__class__.__name__}). Restarting browser...")
+                return True  # Signal to restart browser
+            
             except Exception as e:
                 print(f"Error during loop: {e}")
                 try:
                     print("Reloading page...")
                     driver.refresh()
-                    time.sleep(5)
+                    WebDriverWait(driver, 30).until(
+                        EC.presence_of_element_located((By.CSS_SELECTOR, ".virtuals-sport__tabs")))
+                except (InvalidSessionIdException, NoSuchWindowException):
+                    print("❌ Browser session lost. Restarting browser...")
+                    return True  # Signal to restart browser
                 except:
                     pass
-            
-            # Wait before next check
-            print("Sleeping for 60 seconds...")
-            time.sleep(60)
+                # Don't spin on a page that keeps failing
+                print(f"Retrying in {error_backoff}s...")
+                time.sleep(error_backoff)
+                error_backoff = min(error_backoff * 2, ERROR_BACKOFF_MAX)
             
     except KeyboardInterrupt:
         print("\n\nStopping scraper...")
@@ -387,6 +635,9 @@ def scrape_continuous():
         restart_count += 1
         print(f"\nRestarting scraper (attempt #{restart_count + 1})...")
     
+    if _outbox is not None:
+        _outbox.stop()
+        print(format_stats(_outbox))
     print("Scraper stopped.")
 
 
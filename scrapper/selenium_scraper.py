@@ -4,19 +4,19 @@ Uses Firefox for better video codec support
 
 This script:
 1. Opens the Paddy Power virtuals page in Firefox
-2. Takes screenshots at intervals
+2. Takes screenshots at intervals (decoded in memory, never written to disk
+   unless SAVE_FRAMES asks for it)
 3. Uses OCR (pytesseract) to extract race results text
-4. Saves results to a CSV file
+4. Saves results to the API and the local race store (race_store.py)
 
 Requirements:
-    pip install selenium webdriver-manager pytesseract pillow
+    pip install selenium webdriver-manager pytesseract pillow numpy
     # Firefox and geckodriver are auto-managed by webdriver-manager
 """
 
 import os
+import io
 import time
-import csv
-import requests
 from datetime import datetime
 from pathlib import Path
 from selenium import webdriver
@@ -26,17 +26,49 @@ from selenium.webdriver.common.by import By
 from webdriver_manager.firefox import GeckoDriverManager
 import pytesseract
 from PIL import Image
-import re
 import platform
-
-BACKEND_URL = "http://localhost:5000"   # change if deployed
-
-def save_results_to_api(results, race_time, video_race_time=""):
+from outbox import Outbox, format_stats
+from results_region import ResultsRegion, frame_text
+from ocr_workers import OcrPool
+from frame_hash import FrameDeduper
+from results_detector import ResultsGate
+from race_schedule import CaptureScheduler
+from ocr_consensus import capture_burst, read_frames, vote, MIN_CONFIDENCE
+from race_lexicon import RaceCards, find_mismatches, user_words_config
+from video_capture import VideoGrabber
+from ocr_preprocess import Preprocessor
+from race_store import RaceStore, DB_FILE
+from results_text import is_results_screen, extract_race_time_from_ocr, parse_race_results
+
+BACKEND_URL = os.environ.get("BACKEND_URL", "http://localhost:5000")   # change if deployed
+
+# Stream player host; point at fake_site.py (e.g. http://localhost:8800) for offline runs
+STREAM_BASE_URL = os.environ.get("STREAM_BASE_URL", "https://paddypower.streamamg.com").rstrip("/")
+
+_outbox = None
+_store = None
+
+
+def get_outbox():
+    """Results outbox, created and started on first use."""
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox("results", BACKEND_URL).start()
+    return _outbox
+
+
+def save_results_to_api(results, race_time, video_race_time="", confidence=None, disagreements=None,
+                        dividends=None, mismatches=None):
     """
-    Send OCR results to backend API (Postgres insert).
+    Queue OCR results for the backend API (Postgres insert).
+    The payload is journaled to the local outbox and sent in the background.
     results = list from parse_race_results()
     race_time = timestamp string (your screenshot time)
     video_race_time = extracted UK time from OCR
+    confidence = multi-frame consensus confidence (0..1), if known
+    disagreements = {position: {horse_number: weight}} where frames disagreed
+    dividends = {"forecast": {...}, "tricast": {...}} from the layout parser
+    mismatches = positions where the OCR'd number and the race-card name disagreed
     """
     try:
         payload = {
@@ -45,6 +77,15 @@ def save_results_to_api(results, race_time, video_race_time=""):
             "scraped_at": datetime.now().isoformat(),
             "results": []
         }
+        if confidence is not None:
+            payload["confidence"] = confidence
+            payload["flagged"] = confidence < MIN_CONFIDENCE
+            payload["disagreements"] = {str(k): v for k, v in (disagreements or {}).items()}
+        if dividends:
+            payload["dividends"] = dividends
+        if mismatches:
+            payload["lexicon_mismatches"] = mismatches
+            payload["flagged"] = True
 
         for r in results:
             # horse_number might not always be valid
@@ -58,18 +99,21 @@ def save_results_to_api(results, race_time, video_race_time=""):
                 "position": int(r.get("position", 0)),
                 "horse_number": horse_num,
                 "raw_text": r.get("raw_text", ""),
-                "full_line": r.get("full_line", "")
+                "full_line": r.get("full_line", ""),
+                "confidence": r.get("confidence"),
+                "horse": r.get("horse"),
+                "jockey": r.get("jockey"),
+                "odds": r.get("odds"),
+                "ocr_horse_number": r.get("ocr_horse_number")
             })
 
-        res = requests.post(f"{BACKEND_URL}/api/results", json=payload, timeout=15)
-
-        if res.status_code in (200, 201):
-            print(f"✅ Results inserted into DB successfully (video time: {video_race_time})")
-        else:
-            print(f"❌ Failed to insert results | Status: {res.status_code} | {res.text}")
+        outbox = get_outbox()
+        outbox.put(payload)
+        print(f"📬 Results queued for DB insert (video time: {video_race_time})")
+        print(format_stats(outbox))
 
     except Exception as e:
-        print(f"❌ Error sending results to API: {e}")
+        print(f"❌ Error queueing results for API: {e}")
 
 
 # Windows: Set tesseract path if not in PATH
@@ -81,11 +125,61 @@ if platform.system() == 'Windows':
 
 # Configuration
 SCREENSHOT_DIR = Path(__file__).parent / "screenshots"
-RESULTS_CSV = Path(__file__).parent / "race_results.csv"
 
 # How often to take a screenshot (seconds)
 SCREENSHOT_INTERVAL = 10
 
+# When to persist frames to SCREENSHOT_DIR:
+#   "never"      - frames stay in memory only
+#   "on_failure" - keep frames where a results screen was seen but not parsed
+#   "always"     - keep every frame (debugging)
+SAVE_FRAMES = "on_failure"
+
+# Where frames come from:
+#   "video"      - draw the player's <video> into a canvas in the page and pull
+#                  downscaled grayscale bytes (screenshots once it gives up after
+#                  video_capture.MAX_FAILURES unreadable frames in a row)
+#   "screenshot" - viewport screenshots
+CAPTURE_SOURCE = "video"
+# Seconds to wait before retrying a video frame that could not be read (stall)
+VIDEO_STALL_RETRY = 1
+
+# OCR only the cached results-panel crop instead of the whole frame
+ROI_OCR = True
+
+# ocr_preprocess preset applied before OCR ("raw", "fast", "overlay"; None to disable).
+# Off until a preset matches plain grayscale on recorded frames:
+#   python replay_bench.py --corpus replay_frames/ [--preset overlay]
+OCR_PRESET = None
+
+# OCR worker processes (0 = OCR inline in the capture loop)
+OCR_WORKERS = 2
+# Frames allowed to wait for OCR before new captures are dropped
+OCR_MAX_PENDING = 4
+
+# Skip OCR on frames perceptually identical to the previous one (see frame_hash.py)
+DEDUP_FRAMES = True
+
+# Fast learned results-overlay check before OCR (see results_detector.py)
+RESULTS_GATE = True
+
+# Follow the race schedule published by scraper.py: slow mid-race, bursts around
+# each expected result. Falls back to SCREENSHOT_INTERVAL without a schedule.
+# SCHEDULE_AWARE=0 turns it off (accelerated fake_site.py runs)
+SCHEDULE_AWARE = os.environ.get("SCHEDULE_AWARE", "1") != "0"
+
+# Grab a short burst of frames next to each likely results frame (results gate
+# score or schedule window; inline OCR: the OCR verdict), OCR them as one group
+# and vote on each position
+CONSENSUS = True
+
+# Snap OCR'd names to the race card, cross-check horse numbers and pass the
+# card's words to tesseract (race cards are published by scraper.py)
+LEXICON = True
+
+# Pause after a saved result to avoid capturing the same results twice (seconds)
+POST_RESULT_WAIT = 25
+
 # Window size for better OCR
 WINDOW_WIDTH = 1400
 WINDOW_HEIGHT = 900
@@ -93,203 +187,200 @@ WINDOW_HEIGHT = 900
 
 def setup_directories():
     """Create necessary directories."""
-    SCREENSHOT_DIR.mkdir(exist_ok=True)
+    if SAVE_FRAMES != "never":
+        SCREENSHOT_DIR.mkdir(exist_ok=True)
 
 
-def take_screenshot(driver, filename):
-    """Take a screenshot."""
-    screenshot_path = SCREENSHOT_DIR / filename
-    driver.save_screenshot(str(screenshot_path))
-    return screenshot_path
+def capture_frame(driver):
+    """
+    Grab the viewport straight into a PIL image.
+    The PNG from geckodriver is decoded in memory; nothing touches the disk.
+    """
+    png = driver.get_screenshot_as_png()
+    image = Image.open(io.BytesIO(png))
+    image.load()
+    return image
 
 
-def extract_text_from_image(image_path):
+def grab_frame(driver, grabber=None):
+    """
+    Next frame and its source. While the grabber is enabled frames come from
+    the video element, and one it cannot read right now (buffering,
+    readyState < 2) is (None, "video"): the caller skips it rather than
+    switching source. Viewport screenshots are used once the grabber gives up.
+    """
+    if grabber is not None and grabber.enabled:
+        frame = grabber.grab()
+        if frame is not None or grabber.enabled:
+            return frame, "video"
+    return capture_frame(driver), "screenshot"
+
+
+def save_frame(image, filename, reason):
+    """Persist a captured frame if SAVE_FRAMES allows it for this reason."""
+    if SAVE_FRAMES == "never" or (SAVE_FRAMES == "on_failure" and reason != "failure"):
+        return None
+    SCREENSHOT_DIR.mkdir(exist_ok=True)
+    path = SCREENSHOT_DIR / filename
+    image.save(path)
+    print(f"💾 Frame saved: {path}")
+    return path
+
+
+def extract_text_from_image(image, preprocessor=None):
     """
     Use OCR to extract text from a screenshot.
+    Accepts a PIL image or a path to an image file.
+    A preprocessor (ocr_preprocess.Preprocessor) binarises the frame and
+    supplies the tesseract config; race-card words are passed with LEXICON,
+    as in the OCR workers (results_region.frame_text).
     Returns the extracted text.
     """
     try:
-        image = Image.open(image_path)
-        
-        # Convert to grayscale for better OCR
-        image = image.convert('L')
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
         
-        # Use pytesseract to extract text
-        text = pytesseract.image_to_string(image)
-        
-        return text.strip()
+        return frame_text(image, preprocessor, user_words_config() if LEXICON else "")
     except Exception as e:
         print(f"Error extracting text: {e}")
         return ""
 
 
-def extract_race_time_from_ocr(text):
-    """
-    Extract race time from OCR text.
-    Handles various OCR formats:
-    - "14:00 GLENVIEW GARDENS" (normal)
-    - "14 00 GLENVIEW GARDENS" (space instead of colon)
-    - "14  02 GLENVIEW GARDENS" (double space)
-    - "1400 GLENVIEW" (no separator)
-    Returns the time in HH:MM format or empty string if not found.
-    """
-    import re
-    
-    # Patterns to match time before GLENVIEW (or variations)
-    # Order from most specific to least specific
-    patterns = [
-        r'(\d{1,2})\s*:\s*(\d{2})\s*(?:GLENVIEW|GI\.?ENVIEW|GLEN)',  # 14:00 or 14 : 00
-        r'(\d{1,2})\s+(\d{2})\s+(?:GLENVIEW|GI\.?ENVIEW|GLEN)',       # 14 00 or 14  02 (spaces)
-        r'(\d{2})(\d{2})\s*(?:GLENVIEW|GI\.?ENVIEW|GLEN)',            # 1400 (no separator)
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            hours = int(match.group(1))
-            minutes = int(match.group(2))
-            if 0 <= hours <= 23 and 0 <= minutes <= 59:
-                return f"{hours:02d}:{minutes:02d}"
-    
-    return ""
+def get_store():
+    """Local race store, opened on first use."""
+    global _store
+    if _store is None:
+        _store = RaceStore()
+    return _store
+
+
+def save_results_to_store(results, race_time, video_race_time="", confidence=None, dividends=None):
+    """Save parsed results (and dividends) to the local store with video_race_time for matching."""
+    try:
+        get_store().save_results(
+            [dict(result, confidence=confidence) for result in results], race_time, video_race_time,
+            dividends=dividends)
+        print(f"Saved {len(results)} results to {get_store().path.name} (video time: {video_race_time})")
+    except Exception as e:
+        print(f"⚠️ Could not save results to store: {e}")
 
 
-def parse_race_results(text):
+# Configuration for auto-restart
+RESTART_TIMEOUT = 240  # 4 minutes - restart if no results for this long
+
+
+def read_group(frames, box, cards=None):
+    """Word-box readings of a results frame (plus its burst), inline (ocr_consensus.read_frames)."""
+    config = user_words_config() if cards else ""
+    preprocessor = Preprocessor(OCR_PRESET) if OCR_PRESET and box else None
+    return read_frames(frames, parse_race_results, box, config, preprocessor)
+
+
+def handle_ocr_text(state, text, frame, meta, scheduler=None, cards=None):
     """
-    Parse race results from OCR text.
-    
-    The OCR output format shows results as:
-    - Lines with horse number, horse name (CAPS), jockey name (CAPS/mixed)
-    - Example: "6 JONNYS STREET DECIAN BARK" or "/8 4 CHOPSTICKS BRIAN MYERS"
-    
-    Returns a list of result entries.
+    Act on the OCR text of one frame: detect results, assign the video race
+    time and queue the results for the API.
+    state carries last_results_text, last_video_race_time, last_result_time
+    and last_result_capture between frames; frames must arrive in capture order.
+    With a scheduler, an unreadable race time is taken from the schedule.
+    meta["readings"] holds the word-box (layout parser) readings of a results
+    frame: one reading is used as is, more (the frame and the burst captured
+    right after it) are combined by confidence-weighted voting. Without them
+    the results come from the text.
+    With cards (race_lexicon.RaceCards), names are snapped to the race card
+    and horse numbers cross-checked before voting.
+    Returns True if results were saved.
     """
-    results = []
-    lines = text.split('\n')
+    timestamp = meta["timestamp"]
+    print(f"\n--- Screenshot {meta['count']} ({timestamp}) ---")
     
-    # Pattern to match: optional prefix chars, number, then horse name (letters/spaces)
-    # More flexible pattern to handle OCR variations
-    horse_pattern = re.compile(r'[^A-Za-z0-9]*(\d+)\s+([A-Za-z][A-Za-z\s]+)')
+    if not text:
+        print("No text detected in screenshot")
+        return False
     
-    position = 0  # Track position (1st, 2nd, 3rd, 4th based on order)
+    print(f"Extracted text preview:\n{text[:500]}")
     
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        
-        # Skip lines that are clearly not results (race info, headers, etc.)
-        skip_patterns = ['FORECAST', 'TRICAST', 'FORM', 'RUNNERS', 'EWTERMS', 'ODDS', 'RAN', 'LIVE', 'GARDENS', 'FWTERMS', 'TERMS']
-        if any(skip in line.upper() for skip in skip_patterns):
-            continue
-        
-        # Skip lines that look like race time/name (e.g., "11:50 GLENVIEW...")
-        if re.match(r'^\s*=?\s*\d{1,2}\s*:?\s*\d{2}', line):
-            continue
-        
-        # Skip very short lines or lines that are just symbols
-        if len(line) < 5:
-            continue
-        
-        # Clean up OCR noise: replace common OCR artifacts with spaces
-        clean_line = line
-        for char in ['°', '|', '\\', '/', '[', ']', '{', '}', '«', '»', '~', '`']:
-            clean_line = clean_line.replace(char, ' ')
-        
-        # Normalize multiple spaces to single space
-        clean_line = ' '.join(clean_line.split())
-        
-        # More flexible pattern: find any digit followed by uppercase word
-        # Pattern: any non-digit/letter chars, then digit(s), then space(s), then name
-        horse_pattern = re.compile(r'[^A-Za-z0-9]*(\d{1,2})\s+([A-Za-z][A-Za-z\s]+)')
-        
-        # Look for horse entries
-        match = horse_pattern.search(clean_line)
-        if match:
-            horse_number = match.group(1)
-            horse_info = match.group(2).strip()
-            
-            # Need at least 2 words (horse name + jockey)
-            words = horse_info.split()
-            if len(words) >= 2:
-                # Validate: horse name must have at least 2 consecutive uppercase letters
-                # (reduced from 3 since some names are short like "JAKE")
-                first_word = words[0]
-                uppercase_count = sum(1 for c in first_word if c.isupper())
-                
-                # Horse name should be mostly uppercase (at least 2 uppercase letters)
-                if uppercase_count >= 2 and len(first_word) >= 2:
-                    position += 1
-                    results.append({
-                        'position': position,
-                        'horse_number': horse_number,
-                        'raw_text': horse_info,
-                        'full_line': line
-                    })
-                    
-                    # Only get top 4 results
-                    if position >= 4:
-                        break
+    # Check if this is a results screen
+    if not is_results_screen(text) or text == state["last_results_text"]:
+        return False
     
-    return results
-
-
-def save_results_to_csv(results, race_time, video_race_time=""):
-    """Save parsed results to CSV file with video_race_time for matching."""
-    file_exists = RESULTS_CSV.exists()
+    # Frames captured in the wait window after a saved result show the same results
+    if meta["captured_at"] - state["last_result_capture"] < POST_RESULT_WAIT:
+        print("Results already saved for this screen, skipping")
+        return False
     
-    with open(RESULTS_CSV, 'a', newline='', encoding='utf-8') as f:
-        fieldnames = ['race_time', 'video_race_time', 'position', 'horse_number', 'raw_text', 'full_line', 'scraped_at']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        scraped_at = datetime.now().isoformat()
-        for result in results:
-            row = {
-                'race_time': race_time,
-                'video_race_time': video_race_time,  # The UK time from video OCR
-                'position': result['position'],
-                'horse_number': result.get('horse_number', ''),
-                'raw_text': result['raw_text'],
-                'full_line': result['full_line'],
-                'scraped_at': scraped_at
-            }
-            writer.writerow(row)
+    print("\n🏇 RACE RESULTS DETECTED!")
     
-    print(f"Saved {len(results)} results to {RESULTS_CSV} (video time: {video_race_time})")
-
-
-def is_results_screen(text):
-    """
-    Detect if the current screen shows race results.
-    Look for FORECAST/TRICAST (betting payouts) which indicate results.
-    """
-    # Strong indicators of results screen (betting payouts)
-    strong_indicators = ['forecast', 'tricast']
-    # Also check for position indicators
-    position_indicators = ['1st', '2nd', '3rd', 'winner']
+    # Extract video race time from OCR (UK time)
+    video_race_time = extract_race_time_from_ocr(text)
     
-    text_lower = text.lower()
+    scheduled_time = scheduler.expected_race(meta["captured_at"]) if scheduler else ""
     
-    # Check for strong indicators first
-    for indicator in strong_indicators:
-        if indicator in text_lower:
-            return True
+    if video_race_time:
+        print(f"📍 Video race time (UK): {video_race_time}")
+        state["last_video_race_time"] = video_race_time
+    elif scheduled_time:
+        video_race_time = scheduled_time
+        state["last_video_race_time"] = video_race_time
+        print(f"📍 Video race time (from schedule): {video_race_time}")
+    elif state["last_video_race_time"]:
+        try:
+            parts = state["last_video_race_time"].split(':')
+            prev_minutes = int(parts[0]) * 60 + int(parts[1])
+            new_minutes = prev_minutes + 2
+            new_hours = new_minutes // 60
+            new_mins = new_minutes % 60
+            video_race_time = f"{new_hours:02d}:{new_mins:02d}"
+            state["last_video_race_time"] = video_race_time
+            print(f"📍 Video race time (estimated): {video_race_time} (prev + 2min)")
+        except:
+            pass
     
-    # Check for position indicators
-    for indicator in position_indicators:
-        if indicator in text_lower:
-            return True
+    # Parse and save results: the layout reading of the frame when there is one
+    readings = meta.get("readings") or []
+    results = readings[0] if len(readings) == 1 and readings[0] else parse_race_results(text)
+    if results:
+        confidence, disagreements, dividends, mismatches = None, None, meta.get("dividends"), []
+        if cards:
+            results, mismatches = cards.correct_results(video_race_time, results)
+        if len(readings) > 1:
+            if cards:
+                readings = [cards.correct_results(video_race_time, reading)[0] for reading in readings]
+            voted, confidence, disagreements = vote(readings)
+            if voted:
+                results = voted
+                print(f"🗳️ Consensus over {len(readings)} frames: confidence {confidence:.2f}")
+                if disagreements:
+                    print(f"   Frames disagreed on positions: {disagreements}")
+                if confidence < MIN_CONFIDENCE:
+                    print(f"⚠️ LOW CONFIDENCE results for {video_race_time} - flagged for review")
+                if cards:
+                    mismatches = find_mismatches(results)
+            else:
+                confidence = None
+        
+        if mismatches:
+            print(f"⚠️ Horse number and race-card name disagree: {mismatches}")
+        race_time = timestamp
+        if dividends:
+            print(f"💷 Dividends: {dividends}")
+        save_results_to_api(results, race_time, video_race_time, confidence, disagreements, dividends, mismatches)
+        save_results_to_store(results, race_time, video_race_time, confidence, dividends)
+        print(f"Found {len(results)} results")
+        
+        # Reset the timeout counter
+        state["last_result_time"] = time.time()
+        state["last_result_capture"] = meta["captured_at"]
+        if scheduler and video_race_time:
+            scheduler.mark_done(video_race_time)
+        return True
     
+    print("⚠️ Results screen detected but no parseable results")
+    save_frame(frame, meta["filename"], "failure")
+    state["last_results_text"] = text
     return False
 
 
-# Configuration for auto-restart
-RESTART_TIMEOUT = 240  # 4 minutes - restart if no results for this long
-
-
 def run_scraper_session():
     """
     Run a single scraper session.
@@ -298,8 +389,8 @@ def run_scraper_session():
     setup_directories()
     
     print("Starting Selenium Firefox Race Results Scraper...")
-    print(f"Screenshots will be saved to: {SCREENSHOT_DIR}")
-    print(f"Results will be saved to: {RESULTS_CSV}")
+    print(f"Frames saved to: {SCREENSHOT_DIR} ({SAVE_FRAMES})")
+    print(f"Results will be saved to: {DB_FILE}")
     
     # Setup Firefox options
     firefox_options = Options()
@@ -312,14 +403,34 @@ def run_scraper_session():
     driver = webdriver.Firefox(service=service, options=firefox_options)
     
     screenshot_count = 0
-    last_results_text = ""
-    last_video_race_time = ""
-    last_result_time = time.time()  # Track when we last found a result
+    region = ResultsRegion(LEXICON, OCR_PRESET)
+    pool = OcrPool(OCR_WORKERS, OCR_MAX_PENDING, ROI_OCR, LEXICON, OCR_PRESET) if OCR_WORKERS else None
+    preprocessor = Preprocessor(OCR_PRESET) if OCR_PRESET else None
+    deduper = FrameDeduper() if DEDUP_FRAMES else None
+    gate = ResultsGate() if RESULTS_GATE else None
+    scheduler = CaptureScheduler(SCREENSHOT_INTERVAL) if SCHEDULE_AWARE else None
+    cards = RaceCards() if LEXICON else None
+    grabber = VideoGrabber(driver) if CAPTURE_SOURCE == "video" else None
+
+    def grab_same_source():
+        """Burst frame from the trigger frame's source, or None (stall or source change)."""
+        frame, source = grab_frame(driver, grabber)
+        return frame if source == last_source else None
+
+    burst = (lambda: capture_burst(grab_same_source)) if CONSENSUS else None
+    burst_frames = 0
+    frames = {}  # screenshot count -> frame, kept until its OCR text is handled
+    state = {
+        "last_results_text": "",
+        "last_video_race_time": "",
+        "last_result_time": time.time(),  # Track when we last found a result
+        "last_result_capture": 0,
+    }
     
     try:
         driver.set_window_size(WINDOW_WIDTH, WINDOW_HEIGHT)
         
-        STREAMAMG_URL = "https://paddypower.streamamg.com/horsesflats.html"
+        STREAMAMG_URL = f"{STREAM_BASE_URL}/horsesflats.html"
         print(f"Navigating to: {STREAMAMG_URL}")
         driver.get(STREAMAMG_URL)
         
@@ -328,86 +439,142 @@ def run_scraper_session():
         
         print("✅ Starting OCR capture immediately!")
         print(f"Taking screenshots every {SCREENSHOT_INTERVAL} seconds")
+        if pool:
+            print(f"OCR runs in {OCR_WORKERS} worker processes (max {OCR_MAX_PENDING} queued frames)")
         print(f"⚠️ Auto-restart if no results for {RESTART_TIMEOUT // 60} minutes")
         print("Press Ctrl+C to stop\n")
         
+        next_capture = time.time()
+        last_interval = None
+        last_source = None
+        stalled = False
+        panel_box = None  # results-panel box reported by the OCR workers (pool mode)
+        last_dedup_box = None
+        
         while True:
             # Check if we need to restart (no results for too long)
-            time_since_result = time.time() - last_result_time
+            time_since_result = time.time() - state["last_result_time"]
             if time_since_result > RESTART_TIMEOUT:
                 print(f"\n⚠️ No results for {RESTART_TIMEOUT // 60} minutes. Restarting...")
                 return True  # Signal to restart
             
-            # Take a screenshot
+            # Take a screenshot (in memory)
+            captured_at = time.time()
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"screenshot_{timestamp}.png"
-            screenshot_path = take_screenshot(driver, filename)
+            frame, source = grab_frame(driver, grabber)
+            if frame is None:
+                # Video stalled but the grabber has not given up: keep the learned
+                # boxes, gate and hashes, and try again shortly
+                if not stalled:
+                    print(f"⏸️ Video frame unreadable ({grabber.last_error}), retrying...")
+                    stalled = True
+                time.sleep(VIDEO_STALL_RETRY)
+                continue
+            stalled = False
+            if source != last_source:
+                # Video frames and screenshots have different geometry: forget cached boxes/hashes
+                if last_source is not None:
+                    print(f"📷 Frame source changed: {last_source} -> {source}")
+                    region.reset()
+                    panel_box = None
+                    if pool:
+                        pool.reset_regions()
+                    if gate:
+                        gate.reset()
+                    if deduper:
+                        deduper.reset()
+                last_source = source
             screenshot_count += 1
+            save_frame(frame, filename, "always")
+            meta = {"count": screenshot_count, "timestamp": timestamp,
+                    "filename": filename, "captured_at": captured_at, "source": source}
+            
+            # Cheap fingerprint first: a frame unchanged since the previous one never reaches OCR
+            duplicate = False
+            if deduper:
+                dedup_box = (region.box if not pool else panel_box) if ROI_OCR else None
+                if dedup_box != last_dedup_box:
+                    deduper.reset()
+                    last_dedup_box = dedup_box
+                duplicate, changed = deduper.check(frame.crop(dedup_box) if dedup_box else frame)
+                if duplicate:
+                    print(f"🔁 Screenshot {screenshot_count} unchanged ({changed} cells) - OCR skipped "
+                          f"| skipped {deduper.skipped}/{deduper.frames} ({deduper.skip_ratio():.0%})")
             
-            # Extract text using OCR
-            text = extract_text_from_image(screenshot_path)
+            # Stage 1: fast overlay check; only likely results frames reach OCR
+            if gate and not duplicate:
+                run_ocr, score = gate.should_ocr(frame)
+                meta["gate_score"] = score
+                if not run_ocr:
+                    duplicate = True
+                    print(f"🚦 Screenshot {screenshot_count} rejected by results gate (score {score:.2f})")
             
-            print(f"\n--- Screenshot {screenshot_count} ({timestamp}) ---")
+            # Consensus burst: grabbed next to a frame that probably shows results,
+            # while the overlay is still up, and OCR'd together with it
+            group = []
+            recently_saved = captured_at - state["last_result_capture"] < POST_RESULT_WAIT
+            if burst and not duplicate and not recently_saved:
+                gate_says = gate is not None and gate.ready() and (meta.get("gate_score") or 0) >= gate.threshold
+                if gate_says or (scheduler and scheduler.expected_race(captured_at)):
+                    group = burst()
+                    burst_frames += len(group)
             
-            if text:
-                print(f"Extracted text preview:\n{text[:500]}")
-                
-                # Check if this is a results screen
-                if is_results_screen(text) and text != last_results_text:
-                    print("\n🏇 RACE RESULTS DETECTED!")
-                    
-                    # Extract video race time from OCR (UK time)
-                    video_race_time = extract_race_time_from_ocr(text)
-                    
-                    if video_race_time:
-                        print(f"📍 Video race time (UK): {video_race_time}")
-                        last_video_race_time = video_race_time
-                    elif last_video_race_time:
-                        try:
-                            parts = last_video_race_time.split(':')
-                            prev_minutes = int(parts[0]) * 60 + int(parts[1])
-                            new_minutes = prev_minutes + 2
-                            new_hours = new_minutes // 60
-                            new_mins = new_minutes % 60
-                            video_race_time = f"{new_hours:02d}:{new_mins:02d}"
-                            last_video_race_time = video_race_time
-                            print(f"📍 Video race time (estimated): {video_race_time} (prev + 2min)")
-                        except:
-                            pass
-                    
-                    # Parse and save results
-                    results = parse_race_results(text)
-                    if results:
-                        race_time = timestamp
-                        save_results_to_api(results, race_time, video_race_time)
-                        print(f"Found {len(results)} results")
-                        
-                        # Delete screenshot after saving results (save storage)
-                        os.remove(screenshot_path)
-                        print(f"🗑️ Screenshot deleted (results saved to API)")
-
-                        # Reset the timeout counter
-                        last_result_time = time.time()
-                        
-                        # Wait longer after finding results to avoid duplicate captures
-                        print("⏳ Waiting 25 seconds before next screenshot (to avoid duplicates)...")
-                        time.sleep(25)
-                        continue
-                    else:
-                        os.remove(screenshot_path)
-                        print(f"🗑️ Screenshot deleted (no parseable results)")
-                    
-                    last_results_text = text
+            if pool:
+                # Hand the frame (and its burst) to the workers and handle whatever has finished
+                if duplicate:
+                    pass
+                elif pool.submit(frame, meta, group):
+                    frames[screenshot_count] = frame
                 else:
-                    os.remove(screenshot_path)
-                    print(f"🗑️ Screenshot deleted (no results)")
+                    print(f"⚠️ OCR backlog full, dropped screenshot {screenshot_count}")
+                completed = pool.completed()
+            elif duplicate:
+                completed = []
+            else:
+                # Extract text using OCR (results-panel crop once it is located)
+                if ROI_OCR:
+                    text = region.ocr(frame)
+                else:
+                    text = extract_text_from_image(frame, preprocessor)
+                frames[screenshot_count] = frame
+                meta["roi_box"] = region.box if ROI_OCR else None
+                if is_results_screen(text) and not recently_saved:
+                    # Word-box reading of the results; OCR just ran inline, so a
+                    # burst grabbed now is still next to the frame
+                    if burst and not group:
+                        group = burst()
+                        burst_frames += len(group)
+                    meta["readings"], meta["dividends"] = read_group([frame] + group, meta["roi_box"], cards)
+                completed = [(meta, text, 0.0)]
+            
+            saved = False
+            for done_meta, text, ocr_ms in completed:
+                done_frame = frames.pop(done_meta["count"], None)
+                if done_meta.get("roi_box"):
+                    panel_box = tuple(done_meta["roi_box"])
+                # Frames from before a change of source would teach the gate the old geometry
+                if gate and done_frame is not None and done_meta.get("source") == last_source:
+                    gate.set_box(done_meta.get("roi_box", region.box))
+                    gate.learn(done_frame, is_results_screen(text), done_meta.get("gate_score"))
+                saved = handle_ocr_text(state, text, done_frame, done_meta, scheduler, cards) or saved
+            
+            if scheduler and scheduler.has_schedule():
+                # Schedule-driven cadence; a saved result ends its race's burst
+                interval, reason = scheduler.next_interval()
+                if interval != last_interval:
+                    print(f"⏱️ Capturing every {interval}s ({reason})")
+                    last_interval = interval
+                next_capture = max(next_capture + interval, time.time())
+            elif saved:
+                # Wait longer after finding results to avoid duplicate captures
+                print(f"⏳ Waiting {POST_RESULT_WAIT} seconds before next screenshot (to avoid duplicates)...")
+                next_capture = time.time() + POST_RESULT_WAIT
             else:
-                print("No text detected in screenshot")
-                os.remove(screenshot_path)
-                print(f"🗑️ Screenshot deleted (no text)")
+                # Fixed capture cadence, independent of how long OCR took
+                next_capture = max(next_capture + SCREENSHOT_INTERVAL, time.time())
             
-            # Wait before next screenshot (normal interval)
-            time.sleep(SCREENSHOT_INTERVAL)
+            time.sleep(max(0, next_capture - time.time()))
             
     except KeyboardInterrupt:
         print("\n\nStopping scraper...")
@@ -425,8 +592,24 @@ def run_scraper_session():
         except:
             pass
         print(f"\nTotal screenshots taken: {screenshot_count}")
-        print(f"Results saved to: {RESULTS_CSV}")
-        print(f"Check {SCREENSHOT_DIR} for saved screenshots")
+        if grabber:
+            print(f"Video capture stats: {grabber.stats()}")
+        if gate:
+            print(f"Results gate stats: {gate.stats()}")
+        if cards:
+            print(f"Race-card correction stats: {cards.stats()}")
+        if burst:
+            print(f"Consensus burst frames captured: {burst_frames}")
+        if deduper:
+            print(f"Frames skipped by hash: {deduper.skipped}/{deduper.frames} ({deduper.skip_ratio():.0%})")
+        if pool:
+            print(f"OCR pool stats: {pool.stats()}")
+            pool.shutdown()
+        elif ROI_OCR:
+            print(f"OCR stats: {region.stats()}")
+        print(f"Results saved to: {DB_FILE}")
+        if SAVE_FRAMES != "never":
+            print(f"Check {SCREENSHOT_DIR} for saved frames")
 
 
 def main():
@@ -447,6 +630,9 @@ def main():
         restart_count += 1
         print(f"\nRestarting scraper (attempt #{restart_count + 1})...")
     
+    if _outbox is not None:
+        _outbox.stop()
+        print(format_stats(_outbox))
     print("Scraper stopped.")
 
 
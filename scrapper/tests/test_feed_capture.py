@@ -0,0 +1,111 @@
+"""
+Parse test for feed_capture over responses recorded with FEED_RECORD_DIR.
+
+    python -m pytest scrapper/tests
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from race_schedule import ist_to_uk, now_uk_seconds
+from feed_capture import (install_feed_capture, hook_current_page, load_recorded_responses,
+                          parse_feed_payload, parse_feed_responses, parse_race_time,
+                          FEED_HOOK_JS, UK)
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "feed"
+
+
+def test_recorded_feed_parses_into_race_cards():
+    races = parse_feed_responses(load_recorded_responses(FIXTURES))
+
+    # 13:05Z in July is 14:05 BST and 18:35 IST; the market's "Win 12:00" is not a time
+    summer = races["18:35"]
+    assert summer["race_time_uk"] == "14:05"
+    assert summer["source"] == "network"
+    # The later push update wins
+    assert [(r["number"], r["name"], r["jockey"], r["odds"]) for r in summer["runners"]] == [
+        ("1", "Bold Venture", "P. Dolan", "2/1"),
+        ("2", "Lucky Strike", "R. Hale", "7/2"),
+        ("3", "Silver Arrow", "M. Quinn", "EVS"),
+    ]
+
+    # Epoch milliseconds in January: 14:05 GMT, 19:35 IST
+    winter = races["19:35"]
+    assert winter["race_time_uk"] == "14:05"
+    assert [(r["number"], r["jockey"], r["odds"]) for r in winter["runners"]] == [
+        ("4", "J. Carr", "9/4"),
+        ("5", "T. Byrne", "11/4"),
+    ]
+
+    # The betslip response carries no card
+    assert set(races) == {"18:35", "19:35"}
+
+
+def test_race_time_conversion():
+    assert parse_race_time("2026-07-14T13:05:00Z") == "18:35"
+    assert parse_race_time("2026-07-14T13:05:00Z", UK) == "14:05"
+    assert parse_race_time("2026-01-14T14:05:00+00:00", UK) == "14:05"
+    assert parse_race_time(1768399500) == "19:35"
+    # Naive and free-text times are taken as already in tab time
+    assert parse_race_time("2026-07-14T13:05:00") == "13:05"
+    assert parse_race_time("Off 9:45") == "09:45"
+    assert parse_race_time(42) == ""
+
+
+def test_dom_and_feed_races_share_one_uk_clock():
+    # A DOM race only has its IST tab time; it must get the feed's race_time_uk
+    races = parse_feed_responses(load_recorded_responses(FIXTURES))
+    summer, winter = 1784034300, 1768399500  # 2026-07-14 13:05Z, 2026-01-14 14:05Z
+    assert ist_to_uk("18:35", summer) == races["18:35"]["race_time_uk"] == "14:05"
+    assert ist_to_uk("19:35", winter) == races["19:35"]["race_time_uk"] == "14:05"
+    assert now_uk_seconds(summer) == (14 * 60 + 5) * 60
+    assert ist_to_uk("n/a") == "n/a"
+
+
+def test_names_are_not_race_times():
+    body = '{"name": "18:00 Portman Park", "runners": [' \
+           '{"name": "A", "number": 1}, {"name": "B", "number": 2}]}'
+    assert parse_feed_payload(body) == []
+
+
+class FakeScript:
+    """The BiDi script module as Selenium 4.40 exposes it: pin/unpin only."""
+
+    def __init__(self):
+        self.pinned = []
+
+    def pin(self, script):
+        self.pinned.append(script)
+        return f"preload-{len(self.pinned)}"
+
+    def unpin(self, script_id):
+        pass
+
+
+class FakeDriver:
+    def __init__(self, bidi=True):
+        if bidi:
+            self.script = FakeScript()
+        self.executed = []
+
+    def execute_script(self, script, *args):
+        self.executed.append((script, args))
+
+
+def test_install_pins_the_hook_as_a_preload_script():
+    driver = FakeDriver()
+    assert install_feed_capture(driver) == "preload-1"
+    assert len(driver.script.pinned) == 1
+    declaration = driver.script.pinned[0]
+    assert declaration.startswith("() => (") and FEED_HOOK_JS in declaration
+    # Nothing is injected into the blank page the session starts on
+    assert driver.executed == []
+
+    hook_current_page(driver)
+    assert len(driver.executed) == 1 and FEED_HOOK_JS in driver.executed[0][0]
+
+
+def test_install_without_bidi_returns_none():
+    assert install_feed_capture(FakeDriver(bidi=False)) is None
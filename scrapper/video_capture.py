@@ -0,0 +1,161 @@
+"""
+Video Capture - Grabs frames straight from the player's <video> element
+
+A viewport screenshot makes Firefox composite and PNG-encode the whole
+1400x900 page, although only the video matters. This module instead:
+1. Draws the largest playing <video> (main document or same-origin iframes)
+   into a reused offscreen canvas, cropped and downscaled in the page
+2. Converts it to 8-bit grayscale in the page and returns the raw bytes
+   base64-encoded (or a grayscale PNG of the crop when FORMAT is "png")
+3. Rebuilds a PIL 'L' image in Python, with no PNG decode for raw frames
+
+If the video cannot be read (no video yet, cross-origin/DRM-tainted canvas)
+grab() returns None and the caller falls back to a screenshot; a tainted
+canvas, or MAX_FAILURES consecutive failures, disables the grabber.
+
+Requirements:
+    pip install selenium pillow
+"""
+
+import io
+import base64
+import time
+
+from PIL import Image
+
+
+# Output width in pixels (height keeps the video's aspect ratio); None keeps the native size
+CAPTURE_WIDTH = 960
+
+# Part of the video to keep, as fractions (left, top, right, bottom); None keeps all of it
+CROP = None
+
+# "gray" - raw 8-bit grayscale bytes; "png" - grayscale PNG encoded in the page
+FORMAT = "gray"
+
+# Consecutive failed grabs before falling back to screenshots for good
+MAX_FAILURES = 5
+
+
+VIDEO_GRAB_JS = """
+const [width, crop, format] = arguments;
+const started = performance.now();
+
+// Largest video with a decoded frame, including same-origin iframes
+const videos = [...document.querySelectorAll("video")];
+for (const frame of document.querySelectorAll("iframe")) {
+  try { videos.push(...frame.contentDocument.querySelectorAll("video")); } catch (e) {}
+}
+const video = videos
+  .filter((v) => v.readyState >= 2 && v.videoWidth)
+  .sort((a, b) => b.videoWidth * b.videoHeight - a.videoWidth * a.videoHeight)[0];
+if (!video) return {error: "no playing video"};
+
+const [cl, ct, cr, cb] = crop || [0, 0, 1, 1];
+const sx = Math.round(cl * video.videoWidth), sy = Math.round(ct * video.videoHeight);
+const sw = Math.round((cr - cl) * video.videoWidth), sh = Math.round((cb - ct) * video.videoHeight);
+const scale = width ? Math.min(1, width / sw) : 1;
+const w = Math.round(sw * scale), h = Math.round(sh * scale);
+
+const grab = window.__videoGrab || (window.__videoGrab = {canvas: document.createElement("canvas")});
+const canvas = grab.canvas;
+if (canvas.width !== w || canvas.height !== h) { canvas.width = w; canvas.height = h; }
+const ctx = grab.ctx || (grab.ctx = canvas.getContext("2d", {willReadFrequently: true}));
+ctx.drawImage(video, sx, sy, sw, sh, 0, 0, w, h);
+
+let pixels;
+try {
+  pixels = ctx.getImageData(0, 0, w, h);
+} catch (e) {
+  return {error: "canvas tainted: " + e.name};
+}
+
+// In-place luma (BT.601); the PNG path keeps RGBA with r = g = b
+const rgba = pixels.data;
+const gray = new Uint8Array(w * h);
+for (let i = 0, j = 0; j < gray.length; i += 4, j++) {
+  gray[j] = (rgba[i] * 77 + rgba[i + 1] * 150 + rgba[i + 2] * 29) >> 8;
+}
+
+let data;
+if (format === "png") {
+  for (let i = 0, j = 0; j < gray.length; i += 4, j++) {
+    rgba[i] = rgba[i + 1] = rgba[i + 2] = gray[j];
+  }
+  ctx.putImageData(pixels, 0, 0);
+  data = canvas.toDataURL("image/png").split(",")[1];
+} else {
+  let binary = "";
+  for (let i = 0; i < gray.length; i += 0x8000) {
+    binary += String.fromCharCode.apply(null, gray.subarray(i, i + 0x8000));
+  }
+  data = btoa(binary);
+}
+
+return {width: w, height: h, format: format, data: data,
+        video_width: video.videoWidth, video_height: video.videoHeight,
+        ms: performance.now() - started};
+"""
+
+
+class VideoGrabber:
+    """Frame source reading the <video> element through a canvas, with transfer accounting."""
+
+    def __init__(self, driver, width=CAPTURE_WIDTH, crop=CROP, fmt=FORMAT):
+        self.driver = driver
+        self.width = width
+        self.crop = list(crop) if crop else None
+        self.fmt = fmt
+        self.enabled = True
+        self.failures = 0
+        self.last_error = None
+
+        # Stats
+        self.frames = 0
+        self.bytes = 0
+        self.page_ms = 0.0
+        self.total_ms = 0.0
+
+    def grab(self):
+        """Current video frame as a grayscale PIL image, or None if it cannot be read."""
+        if not self.enabled:
+            return None
+
+        started = time.perf_counter()
+        try:
+            reply = self.driver.execute_script(VIDEO_GRAB_JS, self.width, self.crop, self.fmt)
+        except Exception as e:
+            reply = {"error": str(e)}
+
+        if not reply or reply.get("error"):
+            self.last_error = (reply or {}).get("error", "no reply")
+            self.failures += 1
+            # A tainted canvas never becomes readable; a missing video may still start
+            if self.failures >= MAX_FAILURES or self.last_error.startswith("canvas tainted"):
+                self.enabled = False
+                print(f"⚠️ Video capture disabled after {self.failures} failures ({self.last_error})")
+            return None
+
+        raw = base64.b64decode(reply["data"])
+        if reply["format"] == "png":
+            image = Image.open(io.BytesIO(raw)).convert('L')
+        else:
+            image = Image.frombytes('L', (reply["width"], reply["height"]), raw)
+
+        self.failures = 0
+        self.frames += 1
+        self.bytes += len(reply["data"])
+        self.page_ms += reply.get("ms", 0.0)
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return image
+
+    def stats(self):
+        """Average transfer size and time per grabbed frame."""
+        return {
+            "enabled": self.enabled,
+            "frames": self.frames,
+            "kb_per_frame": round(self.bytes / self.frames / 1024, 1) if self.frames else 0.0,
+            "page_ms_avg": round(self.page_ms / self.frames, 1) if self.frames else 0.0,
+            "total_ms_avg": round(self.total_ms / self.frames, 1) if self.frames else 0.0,
+            "last_error": self.last_error,
+        }